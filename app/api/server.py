@@ -1,17 +1,35 @@
-from fastapi import FastAPI, HTTPException, Body
+from fastapi import FastAPI, HTTPException, Body, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional, Dict, Any
-from datetime import datetime
+from datetime import date, datetime
+import asyncio
+import contextvars
+import functools
+import os
 
 from app.storage.storage_service import StorageService
+from app.storage.async_database import AsyncDatabase
+from app.storage.async_storage_service import AsyncStorageService
+from app.storage.effective_skill import effective_skill_scope
+from app.storage.unit_of_work import unit_of_work
 from app.services.planner_service import PlannerService
 from app.services.skill_tracking_service import SkillTrackingService
 from app.services.quiz_service import QuizService
 from app.services.study_session_service import StudySessionService
+from app.services.exam_simulation_service import ExamSimulationService
 from app.models.models import Course, Topic, StudySession, TopicPriority, SkillHistory, Quiz, QuizQuestion, QuizAttempt
 from pydantic import BaseModel
 
-app = FastAPI(title="Skill-Aware Study Planner API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Write out any buffered decision logs before the process exits
+    planner.decision_service.sink.flush()
+    await async_storage.db.dispose()
+
+app = FastAPI(title="Skill-Aware Study Planner API", lifespan=lifespan)
 
 # Allow all origins for development
 app.add_middleware(
@@ -28,6 +46,32 @@ planner = PlannerService(storage)
 skill_tracking = SkillTrackingService(storage.db)
 quiz_service = QuizService(storage.db)
 study_session_service = StudySessionService(storage.db)
+exam_simulation = ExamSimulationService(storage.db)
+# Cheap course/topic reads run on the event loop instead of queueing behind analytics.
+# Writes go through `storage` so they join the request's unit of work (one commit, rolled back on errors)
+async_storage = AsyncStorageService(AsyncDatabase(storage.db))
+
+# CPU-heavy analytics share a small fixed pool, so they cannot occupy every worker thread
+analytics_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("STUDY_PLANNER_ANALYTICS_WORKERS", "2")),
+    thread_name_prefix="analytics"
+)
+
+async def run_analytics(func, *args, **kwargs):
+    """Run `func` on the analytics pool, inside the request's context (e.g. its effective-skill scope)."""
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        analytics_executor, functools.partial(context.run, func, *args, **kwargs)
+    )
+
+@app.middleware("http")
+async def request_scope(request, call_next):
+    # One session and commit per request; effective (decayed) skills computed at most once per topic
+    with unit_of_work(storage.db) as work, effective_skill_scope(storage.db, skill_tracking.decay_policy):
+        response = await call_next(request)
+        if response.status_code >= 400:
+            work.rollback()
+        return response
 
 # --- Response Models ---
 class AllocatedTopic(BaseModel):
@@ -50,8 +94,8 @@ class WeakTopic(BaseModel):
 # --- Endpoints ---
 
 @app.get("/courses", response_model=List[Course])
-def get_courses():
-    return storage.get_all_courses()
+async def get_courses():
+    return await async_storage.get_all_courses()
 
 @app.post("/courses", response_model=Course)
 def create_course(course: Course):
@@ -61,8 +105,8 @@ def create_course(course: Course):
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/courses/{course_id}/topics", response_model=List[Topic])
-def get_course_topics(course_id: int):
-    return storage.get_topics_by_course(course_id)
+async def get_course_topics(course_id: int):
+    return await async_storage.get_topics_by_course(course_id)
 
 @app.post("/topics", response_model=Topic)
 def create_topic(topic: Topic):
@@ -77,8 +121,8 @@ def create_topic(topic: Topic):
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/topics/{topic_id}", response_model=Topic)
-def get_topic(topic_id: int):
-    topic = storage.get_topic(topic_id)
+async def get_topic(topic_id: int):
+    topic = await async_storage.get_topic(topic_id)
     if not topic:
         raise HTTPException(status_code=404, detail="Topic not found")
     return topic
@@ -88,19 +132,17 @@ def get_topic_history(topic_id: int):
     return skill_tracking.get_skill_history(topic_id, limit=30)
 
 @app.post("/plan", response_model=StudyPlanResponse)
-def generate_plan(hours: float = Body(..., embed=True), adaptive: bool = Body(False, embed=True)):
+async def generate_plan(hours: float = Body(..., embed=True), adaptive: bool = Body(False, embed=True)):
     try:
-        plan = planner.generate_daily_plan(hours, adaptive=adaptive)
-        return {
-            "daily_hours": plan.daily_hours,
-            "allocated_topics": plan.allocated_topics
-        }
+        plan = await run_analytics(planner.generate_daily_plan, hours, adaptive=adaptive)
+        # Already in StudyPlanResponse's shape; response_model still documents it
+        return Response(content=plan.to_json(), media_type="application/json")
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/analytics/weak-topics", response_model=List[WeakTopic])
-def get_weak_topics():
-    weak_topics = planner.detect_weak_topics()
+async def get_weak_topics():
+    weak_topics = await run_analytics(planner.detect_weak_topics)
     result = []
     for item in weak_topics:
         result.append({
@@ -112,12 +154,37 @@ def get_weak_topics():
     return result
 
 @app.get("/analytics/expected-scores")
-def get_expected_scores():
-    return planner.get_expected_scores()
+async def get_expected_scores():
+    return await run_analytics(planner.get_expected_scores)
 
 @app.get("/analytics/risks")
-def get_risks():
-    return planner.identify_risks()
+async def get_risks():
+    return await run_analytics(planner.identify_risks)
+
+@app.get("/analytics/exam-simulation")
+async def simulate_all_exams():
+    return await run_analytics(exam_simulation.simulate_all_exams)
+
+@app.get("/analytics/exam-simulation/{course_id}")
+async def simulate_exam_distribution(course_id: int, samples: int = 100000, seed: Optional[int] = None):
+    try:
+        result = await run_analytics(exam_simulation.simulate_exam_distribution, course_id, samples, seed)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result.get('error') == 'Course not found':
+        raise HTTPException(status_code=404, detail="Course not found")
+    return result
+
+@app.get("/analytics/reality-dashboard/{course_id}")
+async def get_reality_dashboard(course_id: int, days: int = 30,
+                                start: Optional[datetime] = None, end: Optional[datetime] = None):
+    try:
+        result = await run_analytics(exam_simulation.get_motivation_vs_reality_dashboard, course_id, days, end, start)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result.get('error') == 'Course not found':
+        raise HTTPException(status_code=404, detail="Course not found")
+    return result
 
 @app.delete("/courses/{course_id}")
 def delete_course(course_id: int):
@@ -160,6 +227,11 @@ def update_topic(topic_id: int, topic: Topic):
         
         topic.id = topic_id
         updated = storage.update_topic(topic)
+        
+        # Without a history row the edit would read back as decayed from the last activity
+        if topic.skill_level != existing.skill_level:
+            skill_tracking.log_skill_change(topic_id, existing.skill_level, topic.skill_level, "Manual update")
+        
         return updated
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -190,8 +262,8 @@ def update_topic_skill(topic_id: int, skill_level: float = Body(..., embed=True)
         topic.skill_level = skill_level
         updated = storage.update_topic(topic)
         
-        # Record in history
-        skill_tracking.record_skill_change(topic_id, old_skill, skill_level, "Manual update")
+        # Record in history (record_skill_change would re-apply the daily cap and decay)
+        skill_tracking.log_skill_change(topic_id, old_skill, skill_level, "Manual update")
         
         return updated
     except Exception as e:
@@ -325,6 +397,14 @@ def get_study_sessions(limit: int = 50):
 def get_study_statistics():
     return study_session_service.get_statistics()
 
+@app.get("/study-sessions/time-series")
+def get_study_time_series(start: date, end: date, granularity: str = "day",
+                          topic_id: Optional[List[int]] = Query(None)):
+    try:
+        return study_session_service.get_study_time_series(start, end, granularity, topic_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.get("/topics/{topic_id}/sessions", response_model=List[StudySession])
 def get_topic_sessions(topic_id: int):
     topic = storage.get_topic(topic_id)
@@ -349,8 +429,8 @@ def manual_skill_assessment(topic_id: int, skill_level: float = Body(..., embed=
         topic.skill_level = skill_level
         updated = storage.update_topic(topic)
         
-        # Record in history
-        skill_tracking.record_skill_change(topic_id, old_skill, skill_level, reason)
+        # Record in history (record_skill_change would re-apply the daily cap and decay)
+        skill_tracking.log_skill_change(topic_id, old_skill, skill_level, reason)
         
         return {
             "topic": updated,
@@ -480,10 +560,24 @@ def simulate_scenario(request: ScenarioRequest):
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+class ScenarioSweepRequest(BaseModel):
+    hours: List[float]
+    days_shifts: List[int] = [0]
+    course_id: Optional[int] = None
+
+@app.post("/scenarios/sweep")
+def sweep_scenarios(request: ScenarioSweepRequest):
+    try:
+        return planner.simulate_sweep(request.hours, request.days_shifts, request.course_id)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.post("/scenarios/compare-strategies")
-def compare_strategies(available_hours: float = Body(..., embed=True)):
+def compare_strategies(available_hours: float = Body(..., embed=True),
+                       strategies: Optional[List[str]] = Body(None, embed=True)):
     try:
-        result = planner.simulate_scenario('compare_strategies', available_hours=available_hours)
+        result = planner.simulate_scenario('compare_strategies', available_hours=available_hours,
+                                           strategies=strategies)
         return result
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -525,7 +619,7 @@ def get_decision_log(log_id: int):
             "decision_type": log.decision_type,
             "topic_id": log.topic_id,
             "explanation": log.explanation,
-            "metadata": json.loads(log.metadata) if log.metadata else None
+            "metadata": json.loads(log.meta_data) if log.meta_data else None
         }
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -551,5 +645,8 @@ def get_topic_decisions(topic_id: int, limit: int = 10):
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/health")
-def health_check():
-    return {"status": "ok"}
+async def health_check():
+    return {
+        "status": "ok",
+        "decision_log_sink": planner.decision_service.sink.stats()
+    }
@@ -1,5 +1,6 @@
 from datetime import datetime
-from typing import List
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
 from app.models.models import Course, Topic, TopicPriority
 
 
@@ -23,6 +24,19 @@ class PriorityCalculator:
         else:
             return 3.0
     
+    @staticmethod
+    def urgency_from_days(days_until_exam: np.ndarray) -> np.ndarray:
+        """Vectorized form of calculate_urgency for an array of whole days until exam."""
+        days_until_exam = np.asarray(days_until_exam)
+        return np.where(days_until_exam > 30, 1.0, np.where(days_until_exam >= 7, 2.0, 3.0))
+    
+    @staticmethod
+    def days_until(exam_dates: Sequence[datetime], now: Optional[datetime] = None) -> np.ndarray:
+        """Whole days from `now` to each exam date, floored like timedelta.days."""
+        now = now or datetime.now()
+        exam = np.asarray(exam_dates, dtype='datetime64[us]')
+        return (exam - np.datetime64(now, 'us')) // np.timedelta64(1, 'D')
+    
     @staticmethod
     def calculate_priority(topic: Topic, course: Course) -> TopicPriority:
         """
@@ -41,6 +55,74 @@ class PriorityCalculator:
             urgency_factor=urgency
         )
     
+    @staticmethod
+    def rank_priorities(weights: np.ndarray, skills: np.ndarray, course_index: np.ndarray,
+                        exam_dates: Sequence[datetime], multipliers: Optional[np.ndarray] = None,
+                        top_k: Optional[int] = None,
+                        now: Optional[datetime] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Score every topic in one vectorized pass and rank them.
+        
+        `weights`, `skills`, `course_index` and `multipliers` are per-topic columns;
+        `course_index[i]` points into the per-course `exam_dates`. Returns the row
+        indices of the top `top_k` topics (all topics when None) in descending
+        priority order, together with their priority scores and urgency factors.
+        Ties keep their input order, matching sort_by_priority.
+        """
+        weights = np.asarray(weights, dtype=np.float64)
+        skills = np.asarray(skills, dtype=np.float64)
+        course_index = np.asarray(course_index, dtype=np.intp)
+        
+        if len(weights) == 0:
+            empty = np.empty(0)
+            return np.empty(0, dtype=np.intp), empty, empty
+        
+        course_urgency = PriorityCalculator.urgency_from_days(
+            PriorityCalculator.days_until(exam_dates, now)
+        )
+        urgency = course_urgency[course_index]
+        scores = weights * (1 - skills / 100) * urgency
+        if multipliers is not None:
+            scores = scores * np.asarray(multipliers, dtype=np.float64)
+        
+        if top_k is None or top_k >= len(scores):
+            rows = np.argsort(-scores, kind='stable')
+        elif top_k <= 0:
+            rows = np.empty(0, dtype=np.intp)
+        else:
+            candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+            rows = candidates[np.lexsort((candidates, -scores[candidates]))]
+        
+        return rows, scores[rows], urgency[rows]
+    
+    @staticmethod
+    def calculate_priorities_batch(topics: Sequence[Topic], courses: Sequence[Course],
+                                   course_index: np.ndarray, weights: np.ndarray,
+                                   skills: np.ndarray, multipliers: Optional[np.ndarray] = None,
+                                   top_k: Optional[int] = None,
+                                   now: Optional[datetime] = None) -> List[TopicPriority]:
+        """
+        Batch equivalent of calculate_priority + sort_by_priority.
+        
+        Column arrays are aligned with `topics`; exam dates are taken once per course.
+        TopicPriority objects are only built for the rows that are returned.
+        """
+        course_index = np.asarray(course_index, dtype=np.intp)
+        rows, scores, urgency = PriorityCalculator.rank_priorities(
+            weights, skills, course_index,
+            [course.exam_date for course in courses],
+            multipliers, top_k, now
+        )
+        
+        return [
+            TopicPriority.model_construct(
+                topic=topics[row],
+                course=courses[course_index[row]],
+                priority_score=float(score),
+                urgency_factor=float(factor)
+            ) for row, score, factor in zip(rows.tolist(), scores.tolist(), urgency.tolist())
+        ]
+    
     @staticmethod
     def sort_by_priority(priorities: List[TopicPriority]) -> List[TopicPriority]:
         """Sort topics by priority score in descending order."""
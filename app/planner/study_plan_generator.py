@@ -1,23 +1,84 @@
-from typing import List, Dict
-from app.models.models import TopicPriority
+from typing import List, Dict, Iterator
+from app.models.models import Topic, Course, TopicPriority
+
+
+class PlanEntry:
+    """One allocated topic. Topics and courses live once in the plan's lookups, keyed by id."""
+    
+    __slots__ = ('topic_id', 'course_id', 'priority_score', 'urgency_factor', 'allocated_hours')
+    
+    def __init__(self, topic_id: int, course_id: int, priority_score: float,
+                 urgency_factor: float, allocated_hours: float):
+        self.topic_id = topic_id
+        self.course_id = course_id
+        # Plain floats (not numpy scalars), so to_json can write them with float.__repr__
+        self.priority_score = float(priority_score)
+        self.urgency_factor = float(urgency_factor)
+        self.allocated_hours = float(allocated_hours)
 
 
 class StudyPlan:
     def __init__(self, daily_hours: float):
         self.daily_hours = daily_hours
-        self.allocated_topics: List[Dict] = []
+        self.entries: List[PlanEntry] = []
+        self.topics: Dict[int, Topic] = {}
+        self.courses: Dict[int, Course] = {}
     
     def add_topic(self, topic_priority: TopicPriority, hours: float):
-        self.allocated_topics.append({
-            'topic': topic_priority.topic,
-            'course': topic_priority.course,
-            'priority_score': topic_priority.priority_score,
-            'urgency_factor': topic_priority.urgency_factor,
-            'allocated_hours': hours
-        })
+        topic = topic_priority.topic
+        course = topic_priority.course
+        self.topics[topic.id] = topic
+        self.courses[course.id] = course
+        self.entries.append(PlanEntry(
+            topic.id, course.id, topic_priority.priority_score, topic_priority.urgency_factor, hours
+        ))
+    
+    def __len__(self) -> int:
+        return len(self.entries)
+    
+    def __iter__(self) -> Iterator[PlanEntry]:
+        return iter(self.entries)
+    
+    @property
+    def allocated_topics(self) -> List[Dict]:
+        """The entries as {'topic', 'course', 'priority_score', 'urgency_factor', 'allocated_hours'} dicts."""
+        return [
+            {
+                'topic': self.topics[entry.topic_id],
+                'course': self.courses[entry.course_id],
+                'priority_score': entry.priority_score,
+                'urgency_factor': entry.urgency_factor,
+                'allocated_hours': entry.allocated_hours
+            } for entry in self.entries
+        ]
     
     def get_total_allocated_hours(self) -> float:
-        return sum(item['allocated_hours'] for item in self.allocated_topics)
+        return sum(entry.allocated_hours for entry in self.entries)
+    
+    def to_json(self) -> str:
+        """
+        The plan in the API's StudyPlanResponse shape, written straight to a JSON string.
+        
+        Each topic and course is serialized once, however many entries refer to it.
+        """
+        topics = {topic_id: topic.model_dump_json() for topic_id, topic in self.topics.items()}
+        courses = {course_id: course.model_dump_json() for course_id, course in self.courses.items()}
+        allocated = ','.join(
+            f'{{"topic":{topics[entry.topic_id]},"course":{courses[entry.course_id]},'
+            f'"priority_score":{_number(entry.priority_score)},'
+            f'"urgency_factor":{_number(entry.urgency_factor)},'
+            f'"allocated_hours":{_number(entry.allocated_hours)}}}'
+            for entry in self.entries
+        )
+        return f'{{"daily_hours":{_number(float(self.daily_hours))},"allocated_topics":[{allocated}]}}'
+
+
+def _number(value: float) -> str:
+    # Values as pydantic writes them: shortest round-trip repr, null for inf/nan (where x - x != 0)
+    return _repr(value) if value - value == 0 else 'null'
+
+
+_repr = float.__repr__
 
 
 class StudyPlanGenerator:
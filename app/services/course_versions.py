@@ -0,0 +1,123 @@
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+from datetime import date
+import threading
+from app.storage.database import (
+    Database, RowChange, CourseDB, TopicDB, StudySessionDB, SkillHistoryDB, QuizDB, QuizAttemptDB
+)
+
+
+class CourseVersions:
+    """
+    Monotonically increasing per-course state versions, bumped by committed writes.
+    
+    Any change to a course, its topics, or their sessions, skill history, quizzes or
+    quiz attempts bumps that course's version; changes that cannot be attributed to a
+    course bump every course. `memoize` caches derived results per (course, version,
+    day) so repeated reads between writes are dictionary lookups. Use
+    CourseVersions.for_database() to share one instance between all services bound to
+    the same Database.
+    """
+    
+    def __init__(self, db: Database):
+        self.db = db
+        self._lock = threading.RLock()
+        self._global_version = 0
+        self._course_versions: Dict[int, int] = {}
+        self._topic_courses: Optional[Dict[int, int]] = None
+        self._quiz_topics: Dict[int, int] = {}
+        self._memo: Dict[Tuple[Hashable, int], Tuple[int, date, Any]] = {}
+        db.add_change_listener(self._apply_changes)
+    
+    @classmethod
+    def for_database(cls, db: Database) -> 'CourseVersions':
+        return db.shared(cls)
+    
+    def version(self, course_id: Optional[int]) -> int:
+        """The course's version; None gives a version that changes with any course."""
+        with self._lock:
+            self._ensure_loaded()
+            if course_id is None:
+                return self._global_version + sum(self._course_versions.values())
+            return self._global_version + self._course_versions.get(course_id, 0)
+    
+    def memoize(self, key: Hashable, course_id: Optional[int], compute: Callable[[], Any], day: Optional[date] = None) -> Any:
+        """
+        Return `compute()`'s result cached under `key` for the course's current
+        version and `day` (default: today). Only the latest result per key is kept.
+        """
+        day = day or date.today()
+        version = self.version(course_id)
+        with self._lock:
+            cached = self._memo.get((key, course_id))
+            if cached is not None and cached[0] == version and cached[1] == day:
+                return cached[2]
+        
+        result = compute()
+        with self._lock:
+            # A write during compute() bumped the version; the result may be stale
+            if self.version(course_id) == version:
+                self._memo[(key, course_id)] = (version, day, result)
+        return result
+    
+    def _ensure_loaded(self):
+        if self._topic_courses is not None:
+            return
+        session = self.db.get_session()
+        try:
+            self._topic_courses = dict(session.query(TopicDB.id, TopicDB.course_id).all())
+            self._quiz_topics = dict(session.query(QuizDB.id, QuizDB.topic_id).all())
+        finally:
+            session.close()
+    
+    def _apply_changes(self, changes: List[RowChange]):
+        # Decision logs, dependencies and rollups do not affect course state
+        changes = [change for change in changes if change.table in _TRACKED_TABLES]
+        if not changes:
+            return
+        
+        with self._lock:
+            if self._topic_courses is None:
+                # Nothing has been versioned yet; the maps load with current data on first use
+                self._global_version += 1
+                return
+            
+            courses = {self._course_of(change) for change in changes}
+            
+            if None in courses:
+                self._global_version += 1
+            else:
+                for course_id in courses:
+                    self._course_versions[course_id] = self._course_versions.get(course_id, 0) + 1
+    
+    def _course_of(self, change: RowChange) -> Optional[int]:
+        values = change.values
+        if change.table == CourseDB.__tablename__:
+            return values.get('id')
+        
+        if change.table == TopicDB.__tablename__:
+            previous = self._topic_courses.get(values.get('id'))
+            course_id = values.get('course_id', previous)
+            if change.op == 'delete':
+                self._topic_courses.pop(values.get('id'), None)
+            elif course_id is not None:
+                self._topic_courses[values['id']] = course_id
+            # Moving a topic changes both courses
+            return None if previous is not None and previous != course_id else course_id
+        
+        if change.table == QuizDB.__tablename__:
+            if change.op == 'delete':
+                self._quiz_topics.pop(values.get('id'), None)
+            elif values.get('topic_id') is not None:
+                self._quiz_topics[values['id']] = values['topic_id']
+            return self._topic_courses.get(values.get('topic_id'))
+        
+        if change.table == QuizAttemptDB.__tablename__:
+            return self._topic_courses.get(self._quiz_topics.get(values.get('quiz_id')))
+        
+        return self._topic_courses.get(values.get('topic_id'))
+
+
+_TRACKED_TABLES = {
+    CourseDB.__tablename__, TopicDB.__tablename__, StudySessionDB.__tablename__,
+    SkillHistoryDB.__tablename__, QuizDB.__tablename__, QuizAttemptDB.__tablename__
+}
@@ -1,31 +1,183 @@
 from typing import Optional, List, Dict
 from datetime import datetime
+from collections import deque
+from contextlib import contextmanager
+import atexit
 import json
+import logging
+import threading
+import time
+import weakref
+from sqlalchemy import insert
 from app.storage.database import DecisionLogDB
 
+logger = logging.getLogger(__name__)
+
+
+class DecisionLogSink:
+    """
+    Write-behind buffer for decision_logs rows.
+    
+    Rows are held in memory and written with a single executemany INSERT in one
+    transaction when the buffer reaches `flush_size`, when the oldest buffered row
+    is older than `flush_interval` seconds, or when flush() is called (end of a
+    planning request, process shutdown). At most `max_queue` rows are held; rows
+    offered beyond that, e.g. while the database is failing, are dropped and counted.
+    
+    For file databases a timer thread enforces `flush_interval` through quiet
+    periods; an in-memory database is private to the thread that created it, so
+    there the interval is only checked when rows are added.
+    """
+    
+    _instances: 'weakref.WeakSet[DecisionLogSink]' = weakref.WeakSet()
+    
+    def __init__(self, db, flush_size: int = 500, flush_interval: float = 5.0, max_queue: int = 10000):
+        self.db = db
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.dropped = 0
+        self.flushed = 0
+        self._buffer = deque()
+        self._oldest_at: Optional[float] = None
+        self._timer: Optional[threading.Timer] = None
+        self._timed = db.engine.url.database not in (None, '', ':memory:')
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        DecisionLogSink._instances.add(self)
+    
+    def add(self, row: Dict) -> bool:
+        """Buffer a row; returns False if it was dropped because the queue is full."""
+        with self._lock:
+            if len(self._buffer) >= self.max_queue:
+                self.dropped += 1
+                return False
+            if not self._buffer:
+                self._oldest_at = time.monotonic()
+                self._schedule_flush()
+            self._buffer.append(row)
+            should_flush = (
+                len(self._buffer) >= self.flush_size or
+                time.monotonic() - self._oldest_at >= self.flush_interval
+            )
+        
+        if should_flush:
+            self.flush()
+        return True
+    
+    def flush(self) -> int:
+        """Write all buffered rows in one transaction. Returns the number of rows written."""
+        with self._flush_lock:
+            with self._lock:
+                rows = list(self._buffer)
+                self._buffer.clear()
+                self._oldest_at = None
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            
+            if not rows:
+                return 0
+            
+            # Its own connection and transaction: the buffer holds rows from other requests,
+            # so it must not join (and roll back with) the caller's unit of work
+            try:
+                with self.db.engine.begin() as connection:
+                    connection.execute(insert(DecisionLogDB), rows)
+            except Exception:
+                self._requeue(rows)
+                raise
+            
+            with self._lock:
+                self.flushed += len(rows)
+            return len(rows)
+    
+    def _requeue(self, rows: List[Dict]):
+        with self._lock:
+            room = max(0, self.max_queue - len(self._buffer))
+            kept = rows[:room]
+            self.dropped += len(rows) - len(kept)
+            self._buffer.extendleft(reversed(kept))
+            if self._buffer:
+                self._oldest_at = time.monotonic()
+                self._schedule_flush()
+    
+    def _schedule_flush(self):
+        """Arm the flush_interval timer for the oldest buffered row (caller holds _lock)."""
+        if self._timed and self._timer is None:
+            self._timer = threading.Timer(self.flush_interval, self._flush_on_timer)
+            self._timer.daemon = True
+            self._timer.start()
+    
+    def _flush_on_timer(self):
+        with self._lock:
+            if self._timer is threading.current_thread():
+                self._timer = None
+        try:
+            self.flush()
+        except Exception:
+            # Requeued rows re-arm the timer
+            logger.exception("Flushing decision logs failed; rows stay queued")
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'pending': len(self._buffer),
+                'flushed': self.flushed,
+                'dropped': self.dropped
+            }
+    
+    @classmethod
+    def flush_all(cls):
+        """Shutdown hook: flush every live sink, ignoring failures."""
+        for sink in list(cls._instances):
+            try:
+                sink.flush()
+            except Exception:
+                pass
+
+
+atexit.register(DecisionLogSink.flush_all)
+
 
 class DecisionService:
-    def __init__(self, db):
+    def __init__(self, db, sink: Optional[DecisionLogSink] = None):
         self.db = db
+        self.sink = sink or DecisionLogSink(db)
+        self._batch_state = threading.local()
+    
+    @contextmanager
+    def batch(self):
+        """
+        Buffer decisions logged in this block (per thread) and flush them in one
+        transaction when the outermost batch exits.
+        """
+        depth = getattr(self._batch_state, 'depth', 0)
+        self._batch_state.depth = depth + 1
+        try:
+            yield self.sink
+        finally:
+            self._batch_state.depth = depth
+            if depth == 0:
+                # Failed rows are requeued for the next flush; don't fail (or mask an error from) the block
+                try:
+                    self.sink.flush()
+                except Exception:
+                    logger.exception("Flushing decision logs failed; rows stay queued")
     
     def log_decision(self, decision_type: str, explanation: str, 
                     topic_id: Optional[int] = None, metadata: Optional[Dict] = None):
         """Log a planning decision with explanation."""
-        session = self.db.get_session()
-        try:
-            log = DecisionLogDB(
-                timestamp=datetime.now(),
-                decision_type=decision_type,
-                topic_id=topic_id,
-                explanation=explanation,
-                metadata=json.dumps(metadata) if metadata else None
-            )
-            session.add(log)
-            session.commit()
-            session.refresh(log)
-            return log
-        finally:
-            session.close()
+        self.sink.add({
+            'timestamp': datetime.now(),
+            'decision_type': decision_type,
+            'topic_id': topic_id,
+            'explanation': explanation,
+            'meta_data': json.dumps(metadata) if metadata else None
+        })
+        
+        if not getattr(self._batch_state, 'depth', 0):
+            self.sink.flush()
     
     def get_recent_decisions(self, limit: int = 20) -> List[Dict]:
         """Get recent planning decisions."""
@@ -43,7 +195,7 @@ class DecisionService:
                     'decision_type': log.decision_type,
                     'topic_id': log.topic_id,
                     'explanation': log.explanation,
-                    'metadata': json.loads(log.metadata) if log.metadata else None
+                    'metadata': json.loads(log.meta_data) if log.meta_data else None
                 })
             
             return result
@@ -65,7 +217,7 @@ class DecisionService:
                     'timestamp': log.timestamp,
                     'topic_id': log.topic_id,
                     'explanation': log.explanation,
-                    'metadata': json.loads(log.metadata) if log.metadata else None
+                    'metadata': json.loads(log.meta_data) if log.meta_data else None
                 })
             
             return result
@@ -87,7 +239,7 @@ class DecisionService:
                     'timestamp': log.timestamp,
                     'decision_type': log.decision_type,
                     'explanation': log.explanation,
-                    'metadata': json.loads(log.metadata) if log.metadata else None
+                    'metadata': json.loads(log.meta_data) if log.meta_data else None
                 })
             
             return result
@@ -0,0 +1,197 @@
+from typing import List, Dict, Optional, Tuple
+from collections import namedtuple
+import threading
+from app.storage.database import Database, RowChange, TopicDependencyDB, TopicDB
+
+
+DependencyEdge = namedtuple('DependencyEdge', ['id', 'prerequisite_id', 'dependent_id', 'threshold'])
+
+
+class DependencyGraph:
+    """
+    Process-level, in-memory view of topic_dependencies and topic skill levels.
+    
+    Built lazily with two queries, then kept current from committed row changes
+    (see Database.add_change_listener), so cycle checks, prerequisite lookups and
+    learning paths never touch the database. Use DependencyGraph.for_database()
+    to share one graph between all services bound to the same Database.
+    """
+    
+    def __init__(self, db: Database):
+        self.db = db
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._edges: Dict[int, DependencyEdge] = {}
+        self._prerequisites: Dict[int, Dict[int, DependencyEdge]] = {}
+        self._dependents: Dict[int, Dict[int, DependencyEdge]] = {}
+        self._topics: Dict[int, Tuple[str, float]] = {}
+        db.add_change_listener(self._apply_changes)
+    
+    @classmethod
+    def for_database(cls, db: Database) -> 'DependencyGraph':
+        return db.shared(cls)
+    
+    def invalidate(self):
+        """Drop the cached graph; it is rebuilt on next use."""
+        with self._lock:
+            self._loaded = False
+            self._edges.clear()
+            self._prerequisites.clear()
+            self._dependents.clear()
+            self._topics.clear()
+    
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            session = self.db.get_session()
+            try:
+                topics = session.query(TopicDB.id, TopicDB.name, TopicDB.skill_level).order_by(TopicDB.id).all()
+                deps = session.query(TopicDependencyDB).order_by(TopicDependencyDB.id).all()
+                
+                self._topics = {topic_id: (name, skill) for topic_id, name, skill in topics}
+                for dep in deps:
+                    self._add_edge(DependencyEdge(
+                        dep.id, dep.prerequisite_topic_id, dep.dependent_topic_id, dep.min_skill_threshold
+                    ))
+                self._loaded = True
+            finally:
+                session.close()
+    
+    def _add_edge(self, edge: DependencyEdge):
+        self._remove_edge(edge.id)
+        self._edges[edge.id] = edge
+        self._prerequisites.setdefault(edge.dependent_id, {})[edge.id] = edge
+        self._dependents.setdefault(edge.prerequisite_id, {})[edge.id] = edge
+    
+    def _remove_edge(self, dependency_id: int):
+        edge = self._edges.pop(dependency_id, None)
+        if edge:
+            self._prerequisites.get(edge.dependent_id, {}).pop(edge.id, None)
+            self._dependents.get(edge.prerequisite_id, {}).pop(edge.id, None)
+    
+    def _apply_changes(self, changes: List[RowChange]):
+        with self._lock:
+            if not self._loaded:
+                return
+            for change in changes:
+                values = change.values
+                if change.table == TopicDB.__tablename__:
+                    if change.op == 'delete':
+                        self._topics.pop(values.get('id'), None)
+                    elif {'id', 'name', 'skill_level'} <= values.keys():
+                        self._topics[values['id']] = (values['name'], values['skill_level'])
+                    elif change.op == 'update' and values.keys() == {'id', 'skill_level'} \
+                            and values['id'] in self._topics:
+                        self._topics[values['id']] = (self._topics[values['id']][0], values['skill_level'])
+                    else:
+                        # Partial row (e.g. bulk update): fall back to a rebuild
+                        self.invalidate()
+                        return
+                elif change.table == TopicDependencyDB.__tablename__:
+                    if change.op == 'delete':
+                        self._remove_edge(values.get('id'))
+                    else:
+                        self._add_edge(DependencyEdge(
+                            values['id'], values['prerequisite_topic_id'],
+                            values['dependent_topic_id'], values.get('min_skill_threshold', 70.0)
+                        ))
+    
+    def get_prerequisites(self, topic_id: int) -> List[Dict]:
+        self._ensure_loaded()
+        with self._lock:
+            result = []
+            for edge in self._prerequisites.get(topic_id, {}).values():
+                prereq = self._topics.get(edge.prerequisite_id)
+                if prereq is None:
+                    continue
+                name, skill = prereq
+                result.append({
+                    'dependency_id': edge.id,
+                    'prerequisite_id': edge.prerequisite_id,
+                    'prerequisite_name': name,
+                    'current_skill': skill,
+                    'required_skill': edge.threshold,
+                    'is_satisfied': skill >= edge.threshold
+                })
+            return result
+    
+    def get_dependents(self, topic_id: int) -> List[Dict]:
+        self._ensure_loaded()
+        with self._lock:
+            result = []
+            for edge in self._dependents.get(topic_id, {}).values():
+                dependent = self._topics.get(edge.dependent_id)
+                if dependent is None:
+                    continue
+                result.append({
+                    'dependency_id': edge.id,
+                    'dependent_id': edge.dependent_id,
+                    'dependent_name': dependent[0],
+                    'required_skill': edge.threshold
+                })
+            return result
+    
+    def has_edge(self, prerequisite_id: int, dependent_id: int) -> bool:
+        self._ensure_loaded()
+        with self._lock:
+            return any(
+                edge.prerequisite_id == prerequisite_id
+                for edge in self._prerequisites.get(dependent_id, {}).values()
+            )
+    
+    def has_path(self, start: int, end: int) -> bool:
+        """Iterative DFS along prerequisite -> dependent edges; O(V+E)."""
+        self._ensure_loaded()
+        with self._lock:
+            visited = set()
+            stack = [start]
+            while stack:
+                node = stack.pop()
+                if node == end:
+                    return True
+                if node in visited:
+                    continue
+                visited.add(node)
+                stack.extend(edge.dependent_id for edge in self._dependents.get(node, {}).values())
+            return False
+    
+    def get_learning_path(self, target_topic_id: int) -> List[int]:
+        """Prerequisites first (post-order DFS over prerequisite edges), target last."""
+        self._ensure_loaded()
+        with self._lock:
+            visited = set()
+            path = []
+            stack = [(target_topic_id, False)]
+            while stack:
+                topic_id, expanded = stack.pop()
+                if expanded:
+                    path.append(topic_id)
+                    continue
+                if topic_id in visited:
+                    continue
+                visited.add(topic_id)
+                stack.append((topic_id, True))
+                prerequisites = [
+                    edge.prerequisite_id for edge in self._prerequisites.get(topic_id, {}).values()
+                    if edge.prerequisite_id in self._topics
+                ]
+                # Reversed so prerequisites are visited in insertion order, like the recursive DFS
+                stack.extend((prereq_id, False) for prereq_id in reversed(prerequisites))
+            return path
+    
+    def to_dict(self) -> Dict:
+        self._ensure_loaded()
+        with self._lock:
+            return {
+                'nodes': [
+                    {'id': topic_id, 'name': name, 'skill_level': skill}
+                    for topic_id, (name, skill) in self._topics.items()
+                ],
+                'edges': [
+                    {'from': edge.prerequisite_id, 'to': edge.dependent_id, 'threshold': edge.threshold}
+                    for edge in self._edges.values()
+                ]
+            }
@@ -1,7 +1,103 @@
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
-from app.storage.database import Database, TopicDB, CourseDB, QuizAttemptDB, QuizDB
+import copy
+import math
+import numpy as np
 from sqlalchemy import func
+from app.storage.database import (
+    Database, CourseDB, TopicDB, StudySessionDB, SkillHistoryDB, QuizDB, QuizAttemptDB
+)
+from app.storage.effective_skill import decay_policy, effective_skills, load_skill_states
+from app.services.feature_store import TopicFeatureStore
+from app.services.course_versions import CourseVersions
+
+SCORE_PERCENTILES = (5, 25, 50, 75, 95)
+# Upper bound on samples x topics per simulation, which keeps one course in the tens of
+# milliseconds; courses with more than 40 topics get proportionally fewer samples
+MAX_SAMPLE_CELLS = 4_000_000
+
+
+def clipped_normal_moments(mean: float, std: float, low: float = 0.0, high: float = 100.0) -> Tuple[float, float]:
+    """Mean and variance of a normal(mean, std) score clipped to [low, high]."""
+    if std <= 0:
+        value = min(high, max(low, mean))
+        return value, 0.0
+    
+    alpha, beta = (low - mean) / std, (high - mean) / std
+    cdf_alpha, cdf_beta = _normal_cdf(alpha), _normal_cdf(beta)
+    pdf_alpha, pdf_beta = _normal_pdf(alpha), _normal_pdf(beta)
+    inside = cdf_beta - cdf_alpha
+    
+    first = low * cdf_alpha + high * (1 - cdf_beta) + mean * inside + std * (pdf_alpha - pdf_beta)
+    second = (low ** 2 * cdf_alpha + high ** 2 * (1 - cdf_beta) + mean ** 2 * inside
+              + 2 * mean * std * (pdf_alpha - pdf_beta)
+              + std ** 2 * (inside + alpha * pdf_alpha - beta * pdf_beta))
+    return first, max(0.0, second - first ** 2)
+
+
+def _normal_cdf(x: float) -> float:
+    return 0.5 * (1 + math.erf(x / math.sqrt(2)))
+
+
+def _normal_pdf(x: float) -> float:
+    return math.exp(-0.5 * x * x) / math.sqrt(2 * math.pi)
+
+
+def sample_exam_scores(means: np.ndarray, stds: np.ndarray, weights: np.ndarray,
+                       threshold: float, samples: int, rng: np.random.Generator,
+                       improvement: float = 10.0) -> Dict:
+    """
+    Monte Carlo course scores from independent normal topic scores clipped to [0, 100].
+    
+    Draws all topic scores as one (samples x topics) float32 matrix, using antithetic
+    pairs (z, -z) so only half the normals are generated. Per topic, `variance_share`
+    is its (exact) share of the course score variance and `pass_probability_gain` is
+    the change in pass probability if that topic scored `improvement` points higher;
+    only samples within reach of the threshold are re-scored for the latter.
+    """
+    count = len(means)
+    means = np.asarray(means, dtype=np.float32)
+    stds = np.asarray(stds, dtype=np.float32)
+    shares = (np.asarray(weights, dtype=np.float64) / np.sum(weights)).astype(np.float32)
+    
+    half = (samples + 1) // 2
+    normals = rng.standard_normal((half, count), dtype=np.float32)
+    normals *= stds
+    scores = np.empty((2 * half, count), dtype=np.float32)
+    np.add(means, normals, out=scores[:half])
+    np.subtract(means, normals, out=scores[half:])
+    scores = scores[:samples]
+    np.clip(scores, 0, 100, out=scores)
+    totals = scores @ shares
+    
+    passed = totals >= threshold
+    pass_rate = float(np.mean(passed))
+    
+    # Only failing samples within one improvement of the threshold can flip
+    reachable = ~passed & (totals >= threshold - improvement * float(shares.max()))
+    near_scores = scores[reachable]
+    gains = np.minimum(improvement, 100 - near_scores)
+    gains *= shares
+    gains += totals[reachable][:, None]
+    flipped = np.count_nonzero(gains >= threshold, axis=0)
+    
+    contribution_variance = np.array([
+        clipped_normal_moments(float(m), float(s))[1] for m, s in zip(means, stds)
+    ]) * shares.astype(np.float64) ** 2
+    total_variance = float(contribution_variance.sum())
+    
+    return {
+        'samples': samples,
+        'mean_score': float(totals.mean()),
+        'std_score': float(totals.std()),
+        'percentiles': {
+            p: float(v) for p, v in zip(SCORE_PERCENTILES, np.percentile(totals, SCORE_PERCENTILES))
+        },
+        'pass_probability': pass_rate * 100,
+        'variance_share': (contribution_variance / total_variance if total_variance > 0
+                           else np.zeros(count)).tolist(),
+        'pass_probability_gain': (flipped / samples * 100).tolist()
+    }
 
 
 class ExamSimulationService:
@@ -13,9 +109,16 @@ class ExamSimulationService:
     
     def __init__(self, db: Database):
         self.db = db
+        self.feature_store = TopicFeatureStore.for_database(db)
+        self.course_versions = CourseVersions.for_database(db)
         self.passing_threshold = 60.0
+        # Topic score spread for the Monte Carlo simulation
+        self.untested_score_std = 20.0
+        self.single_attempt_score_std = 10.0
+        self.min_score_std = 5.0
+        self.score_std_attempts = 5
     
-    def simulate_exam_today(self, course_id: int) -> Dict:
+    def simulate_exam_today(self, course_id: int, as_of: Optional[datetime] = None) -> Dict:
         """
         TICKET-406: Simulate exam outcome if exam were today.
         
@@ -30,101 +133,238 @@ class ExamSimulationService:
             if not course:
                 return {'error': 'Course not found'}
             
-            topics = session.query(TopicDB).filter(TopicDB.course_id == course_id).all()
-            
-            if not topics:
-                return {
-                    'course_id': course_id,
-                    'course_name': course.name,
-                    'estimated_score': 0,
-                    'pass_probability': 0,
-                    'will_pass': False,
-                    'topics_analyzed': 0,
-                    'error': 'No topics found'
-                }
+            as_of = as_of or datetime.now()
+            frame = self.feature_store.frame(course_id, as_of)
+            # Decay since last activity counts even if it has not been written yet
+            return self._exam_result(
+                course, frame.topics, frame.effective_skill.tolist(),
+                frame.recent_quiz_average(3).tolist(), as_of
+            )
+        finally:
+            session.close()
+    
+    def simulate_all_exams(self, as_of: Optional[datetime] = None) -> List[Dict]:
+        """
+        simulate_exam_today for every course, ordered by course id.
+        
+        Courses, topics, effective skills and the latest three quiz attempts per topic
+        are loaded in four queries, independent of the number of courses and topics.
+        Results are cached until the next write that touches any course's topics,
+        sessions, quizzes or skills (or the day changes).
+        """
+        if as_of is not None:
+            return self._simulate_all_exams(as_of)
+        # Callers get their own copy so the cached results stay intact
+        return copy.deepcopy(self.course_versions.memoize(
+            ('simulate_all_exams', self.passing_threshold), None,
+            lambda: self._simulate_all_exams(datetime.now())
+        ))
+    
+    def _simulate_all_exams(self, as_of: datetime) -> List[Dict]:
+        session = self.db.get_session()
+        try:
+            courses = session.query(CourseDB).order_by(CourseDB.id).all()
+            topics = session.query(
+                TopicDB.id, TopicDB.course_id, TopicDB.name, TopicDB.weight, TopicDB.skill_level
+            ).order_by(TopicDB.id).all()
+            states = load_skill_states(session, self.feature_store.policy, as_of)
             
-            # Calculate weighted score
-            total_weight = sum(t.weight for t in topics)
-            weighted_score = 0
-            weak_topics = []
-            critical_gaps = []
+            ranked = session.query(
+                QuizDB.topic_id.label('topic_id'),
+                QuizAttemptDB.score.label('score'),
+                func.row_number().over(
+                    partition_by=QuizDB.topic_id,
+                    order_by=(QuizAttemptDB.attempted_at.desc(), QuizAttemptDB.id.desc())
+                ).label('rn')
+            ).join(QuizAttemptDB, QuizAttemptDB.quiz_id == QuizDB.id).subquery()
+            recent_scores: Dict[int, List[float]] = {}
+            for topic_id, score in session.query(ranked.c.topic_id, ranked.c.score).filter(
+                ranked.c.rn <= 3
+            ).order_by(ranked.c.topic_id, ranked.c.rn):
+                recent_scores.setdefault(topic_id, []).append(score)
             
+            topics_by_course: Dict[int, List] = {}
             for topic in topics:
-                # Use quiz performance if available, otherwise skill level
-                quizzes = session.query(QuizDB).filter(QuizDB.topic_id == topic.id).all()
-                quiz_ids = [q.id for q in quizzes]
-                
-                recent_attempts = session.query(QuizAttemptDB).filter(
-                    QuizAttemptDB.quiz_id.in_(quiz_ids) if quiz_ids else False
-                ).order_by(QuizAttemptDB.attempted_at.desc()).limit(3).all()
-                
-                if recent_attempts:
-                    avg_quiz = sum(a.score for a in recent_attempts) / len(recent_attempts)
-                    # Weight quiz performance higher than self-assessment
-                    topic_score = (avg_quiz * 0.7 + topic.skill_level * 0.3)
-                else:
-                    # Penalize if no quiz taken
-                    topic_score = topic.skill_level * 0.6
-                
-                weighted_score += topic_score * (topic.weight / total_weight)
-                
-                # Identify weak topics
-                if topic_score < 50:
-                    weak_topics.append({
-                        'name': topic.name,
-                        'score': topic_score,
-                        'weight': topic.weight,
-                        'impact': topic.weight * (50 - topic_score)
-                    })
-                
-                # Critical gaps (high weight, low score)
-                if topic.weight > 0.2 and topic_score < 60:
-                    critical_gaps.append({
-                        'name': topic.name,
-                        'score': topic_score,
-                        'weight': topic.weight,
-                        'gap': 60 - topic_score
-                    })
-            
-            # Sort by impact
-            weak_topics.sort(key=lambda x: x['impact'], reverse=True)
-            critical_gaps.sort(key=lambda x: x['gap'] * x['weight'], reverse=True)
-            
-            # Calculate pass probability based on distance from threshold
-            distance_from_pass = weighted_score - self.passing_threshold
-            if distance_from_pass >= 20:
-                pass_probability = 95
-            elif distance_from_pass >= 10:
-                pass_probability = 85
-            elif distance_from_pass >= 5:
-                pass_probability = 70
-            elif distance_from_pass >= 0:
-                pass_probability = 55
-            elif distance_from_pass >= -5:
-                pass_probability = 35
-            elif distance_from_pass >= -10:
-                pass_probability = 15
-            else:
-                pass_probability = 5
-            
-            days_until_exam = (course.exam_date - datetime.now()).days
+                topics_by_course.setdefault(topic.course_id, []).append(topic)
             
+            results = []
+            for course in courses:
+                course_topics = topics_by_course.get(course.id, [])
+                skills = [
+                    states[t.id].effective_skill if t.id in states else t.skill_level for t in course_topics
+                ]
+                recent_quiz = [
+                    sum(recent_scores[t.id]) / len(recent_scores[t.id]) if t.id in recent_scores else math.nan
+                    for t in course_topics
+                ]
+                results.append(self._exam_result(course, course_topics, skills, recent_quiz, as_of))
+            return results
+        finally:
+            session.close()
+    
+    def _exam_result(self, course: CourseDB, topics: List, skills: List[float],
+                     recent_quiz: List[float], as_of: datetime) -> Dict:
+        """Point-estimate exam outcome from per-topic effective skills and recent quiz averages (NaN if none)."""
+        if not topics:
             return {
-                'course_id': course_id,
+                'course_id': course.id,
                 'course_name': course.name,
-                'exam_date': course.exam_date.isoformat(),
-                'days_remaining': days_until_exam,
-                'estimated_score': round(weighted_score, 2),
-                'passing_threshold': self.passing_threshold,
-                'pass_probability': pass_probability,
-                'will_pass': weighted_score >= self.passing_threshold,
-                'topics_analyzed': len(topics),
-                'weakest_topics': weak_topics[:5],
-                'critical_gaps': critical_gaps[:3],
-                'risk_level': self._calculate_risk_level(weighted_score, days_until_exam)
+                'estimated_score': 0,
+                'pass_probability': 0,
+                'will_pass': False,
+                'topics_analyzed': 0,
+                'error': 'No topics found'
             }
+        
+        # Calculate weighted score
+        total_weight = sum(t.weight for t in topics)
+        weighted_score = 0
+        weak_topics = []
+        critical_gaps = []
+        
+        for topic, skill_level, avg_quiz in zip(topics, skills, recent_quiz):
+            topic_score = self._topic_score(skill_level, avg_quiz)
+            
+            weighted_score += topic_score * (topic.weight / total_weight)
+            
+            # Identify weak topics
+            if topic_score < 50:
+                weak_topics.append({
+                    'name': topic.name,
+                    'score': topic_score,
+                    'weight': topic.weight,
+                    'impact': topic.weight * (50 - topic_score)
+                })
+            
+            # Critical gaps (high weight, low score)
+            if topic.weight > 0.2 and topic_score < 60:
+                critical_gaps.append({
+                    'name': topic.name,
+                    'score': topic_score,
+                    'weight': topic.weight,
+                    'gap': 60 - topic_score
+                })
+        
+        # Sort by impact
+        weak_topics.sort(key=lambda x: x['impact'], reverse=True)
+        critical_gaps.sort(key=lambda x: x['gap'] * x['weight'], reverse=True)
+        
+        # Calculate pass probability based on distance from threshold
+        distance_from_pass = weighted_score - self.passing_threshold
+        if distance_from_pass >= 20:
+            pass_probability = 95
+        elif distance_from_pass >= 10:
+            pass_probability = 85
+        elif distance_from_pass >= 5:
+            pass_probability = 70
+        elif distance_from_pass >= 0:
+            pass_probability = 55
+        elif distance_from_pass >= -5:
+            pass_probability = 35
+        elif distance_from_pass >= -10:
+            pass_probability = 15
+        else:
+            pass_probability = 5
+        
+        days_until_exam = (course.exam_date - as_of).days
+        
+        return {
+            'course_id': course.id,
+            'course_name': course.name,
+            'exam_date': course.exam_date.isoformat(),
+            'days_remaining': days_until_exam,
+            'estimated_score': round(weighted_score, 2),
+            'passing_threshold': self.passing_threshold,
+            'pass_probability': pass_probability,
+            'will_pass': weighted_score >= self.passing_threshold,
+            'topics_analyzed': len(topics),
+            'weakest_topics': weak_topics[:5],
+            'critical_gaps': critical_gaps[:3],
+            'risk_level': self._calculate_risk_level(weighted_score, days_until_exam)
+        }
+    
+    def simulate_exam_distribution(self, course_id: int, samples: int = 100_000,
+                                   seed: Optional[int] = None, as_of: Optional[datetime] = None) -> Dict:
+        """
+        Monte Carlo version of simulate_exam_today.
+        
+        Each topic's score is normal around the same point estimate, with the spread
+        of its recent quiz scores (a wider prior with one or no attempts), clipped to
+        [0, 100]. Returns the course score distribution, pass probability and per-topic
+        sensitivity, most sensitive topics first.
+        """
+        if samples < 1:
+            raise ValueError("samples must be positive")
+        
+        session = self.db.get_session()
+        try:
+            course_name = session.query(CourseDB.name).filter(CourseDB.id == course_id).scalar()
+            if course_name is None:
+                return {'error': 'Course not found'}
         finally:
             session.close()
+        
+        frame = self.feature_store.frame(course_id, as_of or datetime.now())
+        if not frame.topics:
+            return {'course_id': course_id, 'course_name': course_name, 'topics_analyzed': 0,
+                    'error': 'No topics found'}
+        
+        recent_quiz = frame.recent_quiz_average(3).tolist()
+        means = np.array([
+            self._topic_score(skill_level, avg_quiz)
+            for skill_level, avg_quiz in zip(frame.effective_skill.tolist(), recent_quiz)
+        ])
+        stds = np.array([self._topic_score_std(frame.activity(t.id)) for t in frame.topics])
+        
+        samples = min(samples, max(1, MAX_SAMPLE_CELLS // len(frame.topics)))
+        result = sample_exam_scores(
+            means, stds, frame.weights, self.passing_threshold, samples, np.random.default_rng(seed)
+        )
+        
+        sensitivity = sorted((
+            {
+                'topic_id': topic.id,
+                'name': topic.name,
+                'weight': topic.weight,
+                'expected_score': float(mean),
+                'score_std': float(std),
+                'variance_share': share,
+                'pass_probability_gain': gain
+            }
+            for topic, mean, std, share, gain in zip(
+                frame.topics, means, stds, result['variance_share'], result['pass_probability_gain']
+            )
+        ), key=lambda t: (t['pass_probability_gain'], t['variance_share']), reverse=True)
+        
+        return {
+            'course_id': course_id,
+            'course_name': course_name,
+            'passing_threshold': self.passing_threshold,
+            'topics_analyzed': len(frame.topics),
+            'samples': result['samples'],
+            'mean_score': round(result['mean_score'], 2),
+            'std_score': round(result['std_score'], 2),
+            'percentiles': {p: round(v, 2) for p, v in result['percentiles'].items()},
+            'pass_probability': round(result['pass_probability'], 2),
+            'topic_sensitivity': sensitivity
+        }
+    
+    def _topic_score(self, skill_level: float, avg_quiz: float) -> float:
+        # Use quiz performance if available (NaN when untested), otherwise skill level
+        if not math.isnan(avg_quiz):
+            # Weight quiz performance higher than self-assessment
+            return avg_quiz * 0.7 + skill_level * 0.3
+        # Penalize if no quiz taken
+        return skill_level * 0.6
+    
+    def _topic_score_std(self, activity) -> float:
+        scores = [a.score for a in activity.quiz_attempts[::-1][:self.score_std_attempts]]
+        if not scores:
+            return self.untested_score_std
+        if len(scores) == 1:
+            return self.single_attempt_score_std
+        # Quiz scores make up 70% of a tested topic's score
+        return max(self.min_score_std, 0.7 * float(np.std(scores, ddof=1)))
     
     def _calculate_risk_level(self, score: float, days_remaining: int) -> str:
         """Calculate overall risk level"""
@@ -139,7 +379,9 @@ class ExamSimulationService:
         else:
             return "CRITICAL"
     
-    def get_motivation_vs_reality_dashboard(self, course_id: int, days: int = 30) -> Dict:
+    def get_motivation_vs_reality_dashboard(self, course_id: int, days: int = 30,
+                                            as_of: Optional[datetime] = None,
+                                            start: Optional[datetime] = None) -> Dict:
         """
         TICKET-407: Motivation vs Reality Dashboard
         Compare perceived effort vs actual progress.
@@ -148,60 +390,41 @@ class ExamSimulationService:
         - Time spent vs skill gained
         - Honest score per topic
         - Trend indicators
+        
+        The window is [start, as_of]; `start` defaults to `days` before `as_of` (default: now).
         """
         session = self.db.get_session()
         try:
-            from app.storage.database import StudySessionDB, SkillHistoryDB
-            
             course = session.query(CourseDB).filter(CourseDB.id == course_id).first()
             if not course:
                 return {'error': 'Course not found'}
             
-            topics = session.query(TopicDB).filter(TopicDB.course_id == course_id).all()
-            cutoff_date = datetime.now() - timedelta(days=days)
+            end = as_of or datetime.now()
+            if start is None:
+                start = end - timedelta(days=days)
+            elif start > end:
+                raise ValueError("Window start must not be after its end")
+            else:
+                days = (end - start).days
+            
+            topics, time_spent_by_topic, skill_gain_by_topic, quiz_average_by_topic = \
+                self._load_window_progress(session, course_id, start, end)
+            skills = effective_skills(self.db, decay_policy(self.db)).get_many([topic.id for topic in topics])
             
             topic_analysis = []
             total_time = 0
             total_skill_gain = 0
             
-            for topic in topics:
-                # Get study time
-                sessions = session.query(StudySessionDB).filter(
-                    StudySessionDB.topic_id == topic.id,
-                    StudySessionDB.start_time >= cutoff_date,
-                    StudySessionDB.end_time.isnot(None)
-                ).all()
-                
-                time_spent = sum(s.duration_minutes for s in sessions)
+            for topic, time_spent, skill_gain, avg_quiz in zip(
+                topics, time_spent_by_topic, skill_gain_by_topic, quiz_average_by_topic
+            ):
                 total_time += time_spent
-                
-                # Get skill changes
-                skill_changes = session.query(SkillHistoryDB).filter(
-                    SkillHistoryDB.topic_id == topic.id,
-                    SkillHistoryDB.timestamp >= cutoff_date
-                ).order_by(SkillHistoryDB.timestamp).all()
-                
-                skill_gain = 0
-                if skill_changes:
-                    skill_gain = skill_changes[-1].new_skill - skill_changes[0].previous_skill
-                    total_skill_gain += skill_gain
+                total_skill_gain += skill_gain
+                current_skill = skills.get(topic.id, topic.skill_level)
                 
                 # Calculate efficiency
                 efficiency = skill_gain / (time_spent / 60) if time_spent > 0 else 0
                 
-                # Get quiz reality check
-                quizzes = session.query(QuizDB).filter(QuizDB.topic_id == topic.id).all()
-                quiz_ids = [q.id for q in quizzes]
-                
-                quiz_attempts = session.query(QuizAttemptDB).filter(
-                    QuizAttemptDB.quiz_id.in_(quiz_ids) if quiz_ids else False,
-                    QuizAttemptDB.attempted_at >= cutoff_date
-                ).all()
-                
-                avg_quiz = None
-                if quiz_attempts:
-                    avg_quiz = sum(a.score for a in quiz_attempts) / len(quiz_attempts)
-                
                 # Determine trend
                 if skill_gain > 10:
                     trend = "📈 Improving"
@@ -215,19 +438,19 @@ class ExamSimulationService:
                 # Reality check
                 reality_gap = None
                 if avg_quiz is not None:
-                    reality_gap = topic.skill_level - avg_quiz
+                    reality_gap = current_skill - avg_quiz
                 
                 topic_analysis.append({
                     'topic_name': topic.name,
                     'weight': topic.weight,
                     'time_spent_hours': round(time_spent / 60, 2),
                     'skill_gain': round(skill_gain, 2),
-                    'current_skill': topic.skill_level,
+                    'current_skill': current_skill,
                     'avg_quiz_score': round(avg_quiz, 2) if avg_quiz else None,
                     'reality_gap': round(reality_gap, 2) if reality_gap else None,
                     'efficiency': round(efficiency, 2),
                     'trend': trend,
-                    'honest_assessment': self._get_honest_assessment(time_spent, skill_gain, avg_quiz, topic.skill_level)
+                    'honest_assessment': self._get_honest_assessment(time_spent, skill_gain, avg_quiz, current_skill)
                 })
             
             # Sort by efficiency (or lack thereof)
@@ -240,6 +463,8 @@ class ExamSimulationService:
                 'course_id': course_id,
                 'course_name': course.name,
                 'days_analyzed': days,
+                'window_start': start.isoformat(),
+                'window_end': end.isoformat(),
                 'total_time_hours': round(total_time / 60, 2),
                 'total_skill_gain': round(total_skill_gain, 2),
                 'average_efficiency': round(avg_efficiency, 2),
@@ -249,6 +474,64 @@ class ExamSimulationService:
         finally:
             session.close()
     
+    def _load_window_progress(self, session, course_id: int, start: datetime,
+                              end: datetime) -> Tuple[List, List[float], List[float], List[Optional[float]]]:
+        """
+        Per-topic study minutes, net skill change and quiz average within [start, end].
+        
+        Two statements for the whole course: session and attempt aggregates joined onto
+        the topics, and the first and last skill values of the window.
+        """
+        minutes = session.query(
+            StudySessionDB.topic_id.label('topic_id'),
+            func.sum(StudySessionDB.duration_minutes).label('minutes')
+        ).join(TopicDB, TopicDB.id == StudySessionDB.topic_id).filter(
+            TopicDB.course_id == course_id,
+            StudySessionDB.end_time.isnot(None),
+            StudySessionDB.start_time.between(start, end)
+        ).group_by(StudySessionDB.topic_id).subquery('minutes')
+        
+        quiz_average = session.query(
+            QuizDB.topic_id.label('topic_id'),
+            func.avg(QuizAttemptDB.score).label('average')
+        ).join(QuizAttemptDB, QuizAttemptDB.quiz_id == QuizDB.id).join(
+            TopicDB, TopicDB.id == QuizDB.topic_id
+        ).filter(
+            TopicDB.course_id == course_id,
+            QuizAttemptDB.attempted_at.between(start, end)
+        ).group_by(QuizDB.topic_id).subquery('quiz_average')
+        
+        rows = session.query(
+            TopicDB.id, TopicDB.name, TopicDB.weight, TopicDB.skill_level,
+            minutes.c.minutes, quiz_average.c.average
+        ).outerjoin(
+            minutes, minutes.c.topic_id == TopicDB.id
+        ).outerjoin(
+            quiz_average, quiz_average.c.topic_id == TopicDB.id
+        ).filter(TopicDB.course_id == course_id).order_by(TopicDB.id).all()
+        
+        # Ties on timestamp are broken by id, as everywhere skill history is replayed
+        order = (SkillHistoryDB.timestamp, SkillHistoryDB.id)
+        whole_partition = (None, None)
+        net_change = dict(session.query(
+            SkillHistoryDB.topic_id,
+            func.last_value(SkillHistoryDB.new_skill).over(
+                partition_by=SkillHistoryDB.topic_id, order_by=order, rows=whole_partition
+            ) - func.first_value(SkillHistoryDB.previous_skill).over(
+                partition_by=SkillHistoryDB.topic_id, order_by=order, rows=whole_partition
+            )
+        ).join(TopicDB, TopicDB.id == SkillHistoryDB.topic_id).filter(
+            TopicDB.course_id == course_id,
+            SkillHistoryDB.timestamp.between(start, end)
+        ).distinct().all())
+        
+        return (
+            rows,
+            [row.minutes or 0 for row in rows],
+            [net_change.get(row.id, 0) for row in rows],
+            [row.average for row in rows]
+        )
+    
     def _get_honest_assessment(self, time_spent: float, skill_gain: float, avg_quiz: Optional[float], current_skill: float) -> str:
         """Generate honest assessment of topic performance"""
         if time_spent > 120 and skill_gain < 5:
@@ -0,0 +1,266 @@
+from typing import List, Dict, Optional, Tuple
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import threading
+import numpy as np
+from sqlalchemy import or_
+from app.storage.database import (
+    Database, RowChange, TopicDB, StudySessionDB, SkillHistoryDB, QuizDB, QuizAttemptDB
+)
+from app.storage.effective_skill import DecayPolicy, decay_policy, load_skill_states
+from app.services.course_versions import CourseVersions
+
+
+class TopicActivity:
+    """A topic's study sessions, skill changes and quiz attempts, each in chronological order."""
+    
+    def __init__(self):
+        self.sessions: List = []
+        self.skill_changes: List = []
+        self.quiz_attempts: List = []
+
+
+EMPTY_ACTIVITY = TopicActivity()
+
+
+def load_topic_activities(session, topic_ids: Optional[List[int]], since: datetime) -> Dict[int, TopicActivity]:
+    """
+    Sessions, skill changes and quiz attempts grouped by topic (all topics when `topic_ids` is None).
+    
+    Sessions and skill changes are limited to `since`, except self-assessments, which
+    are kept regardless of age; quiz attempts are loaded in full. Ties are broken by id
+    so every caller sees the same order.
+    """
+    activities: Dict[int, TopicActivity] = {}
+    if topic_ids is not None:
+        for topic_id in topic_ids:
+            activities[topic_id] = TopicActivity()
+    
+    def activity_for(topic_id):
+        if topic_id not in activities:
+            activities[topic_id] = TopicActivity()
+        return activities[topic_id]
+    
+    sessions = session.query(
+        StudySessionDB.id, StudySessionDB.topic_id, StudySessionDB.start_time,
+        StudySessionDB.end_time, StudySessionDB.duration_minutes
+    ).filter(
+        StudySessionDB.start_time >= since,
+        StudySessionDB.end_time.isnot(None)
+    )
+    skill_changes = session.query(
+        SkillHistoryDB.id, SkillHistoryDB.topic_id, SkillHistoryDB.timestamp,
+        SkillHistoryDB.previous_skill, SkillHistoryDB.new_skill, SkillHistoryDB.reason
+    ).filter(
+        or_(SkillHistoryDB.timestamp >= since, SkillHistoryDB.reason == 'self-assessment')
+    )
+    attempts = session.query(
+        QuizAttemptDB.id, QuizDB.topic_id, QuizAttemptDB.attempted_at, QuizAttemptDB.score
+    ).join(QuizDB, QuizDB.id == QuizAttemptDB.quiz_id)
+    
+    if topic_ids is not None:
+        sessions = sessions.filter(StudySessionDB.topic_id.in_(topic_ids))
+        skill_changes = skill_changes.filter(SkillHistoryDB.topic_id.in_(topic_ids))
+        attempts = attempts.filter(QuizDB.topic_id.in_(topic_ids))
+    
+    for row in sessions.order_by(StudySessionDB.start_time, StudySessionDB.id):
+        activity_for(row.topic_id).sessions.append(row)
+    for row in skill_changes.order_by(SkillHistoryDB.timestamp, SkillHistoryDB.id):
+        activity_for(row.topic_id).skill_changes.append(row)
+    for row in attempts.order_by(QuizAttemptDB.attempted_at, QuizAttemptDB.id):
+        activity_for(row.topic_id).quiz_attempts.append(row)
+    
+    return activities
+
+
+class TopicFeatureFrame:
+    """
+    Per-topic features of one course (or all topics) as of a point in time.
+    
+    `topics` holds the (id, course_id, name, weight, skill_level) rows ordered by id
+    and the static columns are numpy arrays aligned with them. Windowed features are
+    computed from the grouped activity on first use and memoized; windows may not
+    reach further back than `history_days`. NaN marks "no quiz attempts".
+    """
+    
+    def __init__(self, course_id: Optional[int], as_of: datetime, history_days: int,
+                 topics: List, effective: Dict[int, float], activities: Dict[int, TopicActivity]):
+        self.course_id = course_id
+        self.as_of = as_of
+        self.history_days = history_days
+        self.topics = topics
+        self.topic_ids = np.array([t.id for t in topics], dtype=np.int64)
+        self.course_ids = np.array([t.course_id for t in topics], dtype=np.int64)
+        self.names = [t.name for t in topics]
+        self.weights = np.array([t.weight for t in topics], dtype=np.float64)
+        self.stored_skill = np.array([t.skill_level for t in topics], dtype=np.float64)
+        self.effective_skill = np.array(
+            [effective.get(t.id, t.skill_level) for t in topics], dtype=np.float64
+        )
+        self.activities = activities
+        self._positions = {t.id: index for index, t in enumerate(topics)}
+        self._windows: Dict[Tuple[str, int], np.ndarray] = {}
+    
+    def __len__(self) -> int:
+        return len(self.names)
+    
+    def __contains__(self, topic_id: int) -> bool:
+        return topic_id in self._positions
+    
+    def position(self, topic_id: int) -> int:
+        return self._positions[topic_id]
+    
+    def activity(self, topic_id: int) -> TopicActivity:
+        return self.activities.get(topic_id, EMPTY_ACTIVITY)
+    
+    def recent_quiz_average(self, limit: int = 3) -> np.ndarray:
+        """Mean score of each topic's `limit` most recent quiz attempts (any age)."""
+        return self._memoized('recent_quiz_average', limit, lambda activity, _cutoff: _mean(
+            [a.score for a in activity.quiz_attempts[::-1][:limit]]
+        ))
+    
+    def quiz_average(self, days: int) -> np.ndarray:
+        return self._window('quiz_average', days, lambda activity, cutoff: _mean(
+            [a.score for a in activity.quiz_attempts if a.attempted_at >= cutoff]
+        ))
+    
+    def study_minutes(self, days: int) -> np.ndarray:
+        return self._window('study_minutes', days, lambda activity, cutoff: sum(
+            s.duration_minutes for s in activity.sessions if s.start_time >= cutoff
+        ))
+    
+    def session_counts(self, days: int) -> np.ndarray:
+        return self._window('session_counts', days, lambda activity, cutoff: sum(
+            1 for s in activity.sessions if s.start_time >= cutoff
+        ))
+    
+    def net_skill_change(self, days: int) -> np.ndarray:
+        """Newest skill minus the skill before the oldest change in the window (0 without changes)."""
+        def net(activity, cutoff):
+            changes = [h for h in activity.skill_changes if h.timestamp >= cutoff]
+            return changes[-1].new_skill - changes[0].previous_skill if changes else 0
+        return self._window('net_skill_change', days, net)
+    
+    def _window(self, name: str, days: int, compute) -> np.ndarray:
+        if days > self.history_days:
+            raise ValueError(f"Window of {days} days exceeds the frame's {self.history_days} days of history")
+        return self._memoized(name, days, compute, self.as_of - timedelta(days=days))
+    
+    def _memoized(self, name: str, key: int, compute, cutoff: Optional[datetime] = None) -> np.ndarray:
+        values = self._windows.get((name, key))
+        if values is None:
+            values = np.fromiter(
+                (compute(self.activity(int(topic_id)), cutoff) for topic_id in self.topic_ids),
+                dtype=np.float64, count=len(self.topic_ids)
+            )
+            self._windows[(name, key)] = values
+        return values
+
+
+def _mean(values: List[float]) -> float:
+    return sum(values) / len(values) if values else np.nan
+
+
+class TopicFeatureStore:
+    """
+    Process-level cache of TopicFeatureFrames, the latest per (course, history, decay policy).
+    
+    A frame is reused while the course's version is unchanged and the requested
+    `as_of` is within MAX_AS_OF_DRIFT of the one it was built with (its windows and
+    effective skills are measured from that time); callers that need features from
+    several services in one request pass the same `as_of`. Committed writes to topics, sessions, skill history and quizzes drop the
+    affected frames, and a frame whose course changed while it was being built is
+    not cached. Use TopicFeatureStore.for_database() to share one store between all
+    services bound to the same Database.
+    """
+    
+    DEFAULT_HISTORY_DAYS = 30
+    MAX_FRAMES = 16
+    MAX_AS_OF_DRIFT = timedelta(seconds=60)
+    
+    def __init__(self, db: Database, policy: Optional[DecayPolicy] = None):
+        self.db = db
+        self._policy = policy
+        self._lock = threading.Lock()
+        self._frames: 'OrderedDict[Tuple, Tuple[int, TopicFeatureFrame]]' = OrderedDict()
+        self.course_versions = CourseVersions.for_database(db)
+        db.add_change_listener(self._apply_changes)
+    
+    @classmethod
+    def for_database(cls, db: Database) -> 'TopicFeatureStore':
+        return db.shared(cls)
+    
+    @property
+    def policy(self) -> DecayPolicy:
+        """The policy given at construction, or the database's decay policy."""
+        return self._policy or decay_policy(self.db)
+    
+    def frame(self, course_id: Optional[int], as_of: Optional[datetime] = None,
+              history_days: Optional[int] = None) -> TopicFeatureFrame:
+        """Features of `course_id`'s topics (all topics when None) as of `as_of` (default: now)."""
+        as_of = as_of or datetime.now()
+        history_days = max(history_days or 0, self.DEFAULT_HISTORY_DAYS)
+        policy = self.policy
+        key = (course_id, history_days, policy)
+        version = self.course_versions.version(course_id)
+        
+        with self._lock:
+            cached = self._frames.get(key)
+            if (cached is not None and cached[0] == version
+                    and abs(cached[1].as_of - as_of) <= self.MAX_AS_OF_DRIFT):
+                self._frames.move_to_end(key)
+                return cached[1]
+        
+        frame = self._build(course_id, as_of, history_days, policy)
+        with self._lock:
+            # A write during _build() bumped the version; the frame may be stale
+            if self.course_versions.version(course_id) == version:
+                self._frames[key] = (version, frame)
+                self._frames.move_to_end(key)
+                while len(self._frames) > self.MAX_FRAMES:
+                    self._frames.popitem(last=False)
+        return frame
+    
+    def invalidate(self):
+        with self._lock:
+            self._frames.clear()
+    
+    def _build(self, course_id: Optional[int], as_of: datetime, history_days: int,
+               policy: DecayPolicy) -> TopicFeatureFrame:
+        session = self.db.get_session()
+        try:
+            query = session.query(TopicDB.id, TopicDB.course_id, TopicDB.name, TopicDB.weight, TopicDB.skill_level)
+            if course_id is not None:
+                query = query.filter(TopicDB.course_id == course_id)
+            topics = query.order_by(TopicDB.id).all()
+            
+            topic_ids = [t.id for t in topics] if course_id is not None else None
+            states = load_skill_states(session, policy, as_of, topic_ids)
+            activities = load_topic_activities(session, topic_ids, as_of - timedelta(days=history_days))
+            
+            return TopicFeatureFrame(
+                course_id, as_of, history_days, topics,
+                {topic_id: state.effective_skill for topic_id, state in states.items()},
+                activities
+            )
+        finally:
+            session.close()
+    
+    def _apply_changes(self, changes: List[RowChange]):
+        with self._lock:
+            if not self._frames:
+                return
+            for key, (_version, frame) in list(self._frames.items()):
+                if any(_affects(frame, change) for change in changes):
+                    del self._frames[key]
+
+
+def _affects(frame: TopicFeatureFrame, change: RowChange) -> bool:
+    if change.table == TopicDB.__tablename__:
+        # Partial updates (e.g. materialized decay) only carry id and skill_level
+        return (frame.course_id is None or change.values.get('id') in frame
+                or change.values.get('course_id') == frame.course_id)
+    if change.table in (StudySessionDB.__tablename__, SkillHistoryDB.__tablename__, QuizDB.__tablename__):
+        return frame.course_id is None or change.values.get('topic_id') in frame
+    # Attempts reference quizzes, not topics
+    return change.table == QuizAttemptDB.__tablename__
@@ -1,19 +1,212 @@
 from typing import List, Dict, Tuple, Optional
 from datetime import datetime
+from contextlib import contextmanager
+import threading
 from app.models.models import TopicPriority, Topic, Course
+from app.planner.study_plan_generator import StudyPlan
 from app.services.dependency_service import DependencyService
 from app.services.decision_service import DecisionService
 
 
+class SkillOverlay:
+    """
+    Simulated skill levels for the topics a scenario touches, keyed by topic id.
+    
+    Topics that are not in the overlay keep their own skill_level, so the base topic
+    list never has to be copied.
+    """
+    
+    SKILL_GAIN_PER_HOUR = 8
+    
+    def __init__(self, skills: Optional[Dict[int, float]] = None):
+        self.skills: Dict[int, float] = dict(skills or {})
+    
+    @classmethod
+    def from_allocation(cls, allocation: StudyPlan) -> 'SkillOverlay':
+        """Simulate skill improvement from a time allocation."""
+        overlay = cls()
+        for entry in allocation:
+            overlay.add_hours(allocation.topics[entry.topic_id], entry.allocated_hours)
+        return overlay
+    
+    def add_hours(self, topic: Topic, hours: float):
+        skill = self.skill_of(topic)
+        skill_gain = min(hours * self.SKILL_GAIN_PER_HOUR, 100 - skill)
+        self.skills[topic.id] = min(100, skill + skill_gain)
+    
+    def skill_of(self, topic: Topic) -> float:
+        return self.skills.get(topic.id, topic.skill_level)
+    
+    def __len__(self) -> int:
+        return len(self.skills)
+    
+    def __contains__(self, topic_id: int) -> bool:
+        return topic_id in self.skills
+
+
+def allocate_time(priorities: List[TopicPriority], available_hours: float,
+                  exam_proximity_weight: float = 1.0) -> Tuple[StudyPlan, List[Tuple]]:
+    """
+    Greedy time allocation without side effects.
+    
+    Returns the plan and the (decision_type, explanation, topic_id, metadata)
+    decisions the allocation made, in order.
+    """
+    allocated = StudyPlan(available_hours)
+    if available_hours <= 0:
+        return allocated, []
+    
+    decisions = []
+    remaining_time = available_hours
+    
+    for priority in priorities:
+        if remaining_time <= 0:
+            decisions.append((
+                'topic_dropped',
+                f"Topic '{priority.topic.name}' dropped: no time remaining",
+                priority.topic.id,
+                {'available_hours': available_hours}
+            ))
+            continue
+        
+        skill_gap = 100 - priority.topic.skill_level
+        estimated_time = (skill_gap / 100) * priority.topic.weight * 5
+        estimated_time = max(0.5, min(estimated_time, 3.0))
+        estimated_time *= priority.urgency_factor * exam_proximity_weight
+        
+        allocated_time = min(estimated_time, remaining_time)
+        
+        if allocated_time >= 0.25:
+            allocated.add_topic(priority, round(allocated_time, 2))
+            remaining_time -= allocated_time
+            
+            decisions.append((
+                'time_allocated',
+                f"Allocated {allocated_time:.1f}h to '{priority.topic.name}': "
+                f"priority={priority.priority_score:.3f}, weight={priority.topic.weight:.2f}",
+                priority.topic.id,
+                {
+                    'allocated_hours': allocated_time,
+                    'skill_level': priority.topic.skill_level,
+                    'weight': priority.topic.weight
+                }
+            ))
+    
+    return allocated, decisions
+
+
+def estimate_course_scores(topics: List[Topic], courses: List[Course],
+                           dependency_status: Dict[int, Dict],
+                           overlay: Optional[SkillOverlay] = None) -> Dict:
+    """
+    Expected exam score per course without touching the database.
+    
+    `dependency_status` maps topic id to check_dependencies_satisfied output.
+    """
+    course_scores = {}
+    skill_of = overlay.skill_of if overlay is not None else (lambda t: t.skill_level)
+    
+    topics_by_course: Dict[int, List[Topic]] = {}
+    for topic in topics:
+        topics_by_course.setdefault(topic.course_id, []).append(topic)
+    
+    for course in courses:
+        course_topics = topics_by_course.get(course.id)
+        
+        if not course_topics:
+            continue
+        
+        weighted_sum = sum(skill_of(t) * t.weight for t in course_topics)
+        total_weight = sum(t.weight for t in course_topics)
+        
+        if total_weight > 0:
+            base_score = (weighted_sum / total_weight)
+        else:
+            base_score = 0
+        
+        dependency_penalty = 0
+        high_risk_topics = []
+        
+        for topic in course_topics:
+            dep_status = dependency_status[topic.id]
+            
+            if not dep_status['all_satisfied']:
+                penalty = topic.weight * 10
+                dependency_penalty += penalty
+                high_risk_topics.append({
+                    'topic': topic.name,
+                    'weight': topic.weight,
+                    'blocking_prerequisites': len(dep_status['blocking_prerequisites'])
+                })
+            
+            skill_level = skill_of(topic)
+            if skill_level < 50 and topic.weight > 0.15:
+                high_risk_topics.append({
+                    'topic': topic.name,
+                    'weight': topic.weight,
+                    'skill_level': skill_level
+                })
+        
+        adjusted_score = max(0, base_score - dependency_penalty)
+        uncertainty = 5 if total_weight >= 0.95 else 10
+        
+        course_scores[course.id] = {
+            'course_name': course.name,
+            'estimated_score': round(adjusted_score, 1),
+            'score_range': (
+                round(max(0, adjusted_score - uncertainty), 1),
+                round(min(100, adjusted_score + uncertainty), 1)
+            ),
+            'dependency_penalty': round(dependency_penalty, 1),
+            'high_risk_topics': high_risk_topics,
+            'total_weight_coverage': round(total_weight, 2)
+        }
+    
+    return course_scores
+
+
 class OptimizationEngine:
     def __init__(self, dependency_service: DependencyService, 
                  decision_service: Optional[DecisionService] = None):
         self.dependency_service = dependency_service
         self.decision_service = decision_service
+        self._dry_run_state = threading.local()
+    
+    @contextmanager
+    def dry_run(self):
+        """
+        Run the engine without side effects (per thread).
+        
+        Decisions that would be logged inside the block are captured in the yielded
+        list instead of being written to decision_logs.
+        """
+        captured: List[Dict] = []
+        stack = getattr(self._dry_run_state, 'stack', None)
+        if stack is None:
+            stack = self._dry_run_state.stack = []
+        stack.append(captured)
+        try:
+            yield captured
+        finally:
+            stack.pop()
+    
+    def _log_decision(self, decision_type: str, explanation: str,
+                      topic_id: Optional[int] = None, metadata: Optional[Dict] = None):
+        stack = getattr(self._dry_run_state, 'stack', None)
+        if stack:
+            stack[-1].append({
+                'decision_type': decision_type,
+                'topic_id': topic_id,
+                'explanation': explanation,
+                'metadata': metadata
+            })
+        elif self.decision_service:
+            self.decision_service.log_decision(decision_type, explanation, topic_id, metadata)
     
     def adjust_priorities_for_dependencies(self, priorities: List[TopicPriority]) -> List[TopicPriority]:
         """Adjust topic priorities based on dependency constraints."""
         adjusted = []
+        adjusted_by_topic: Dict[int, TopicPriority] = {}
         
         for priority in priorities:
             topic = priority.topic
@@ -26,151 +219,67 @@ class OptimizationEngine:
                     skill_gap = prereq['required_skill'] - prereq['current_skill']
                     if skill_gap > 30:
                         priority.priority_score *= 0.3
-                        if self.decision_service:
-                            self.decision_service.log_decision(
-                                'dependency_block',
-                                f"Topic '{topic.name}' priority reduced: prerequisite "
-                                f"'{prereq['prerequisite_name']}' has skill gap of {skill_gap:.1f}%",
-                                topic.id,
-                                {'blocking_prerequisites': blocking}
-                            )
+                        self._log_decision(
+                            'dependency_block',
+                            f"Topic '{topic.name}' priority reduced: prerequisite "
+                            f"'{prereq['prerequisite_name']}' has skill gap of {skill_gap:.1f}%",
+                            topic.id,
+                            {'blocking_prerequisites': blocking}
+                        )
                         break
                     elif skill_gap > 15:
                         priority.priority_score *= 0.6
                 
                 for prereq in blocking:
-                    prereq_found = False
-                    for p in adjusted:
-                        if p.topic.id == prereq['prerequisite_id']:
-                            p.priority_score *= 1.5
-                            prereq_found = True
-                            if self.decision_service:
-                                self.decision_service.log_decision(
-                                    'prerequisite_boost',
-                                    f"Prerequisite '{prereq['prerequisite_name']}' boosted "
-                                    f"to unlock '{topic.name}'",
-                                    p.topic.id,
-                                    {'dependent_topic': topic.name}
-                                )
-                            break
+                    p = adjusted_by_topic.get(prereq['prerequisite_id'])
+                    if p is not None:
+                        p.priority_score *= 1.5
+                        self._log_decision(
+                            'prerequisite_boost',
+                            f"Prerequisite '{prereq['prerequisite_name']}' boosted "
+                            f"to unlock '{topic.name}'",
+                            p.topic.id,
+                            {'dependent_topic': topic.name}
+                        )
             
             adjusted.append(priority)
+            adjusted_by_topic.setdefault(topic.id, priority)
         
         adjusted.sort(key=lambda x: x.priority_score, reverse=True)
         return adjusted
     
     def optimize_time_allocation(self, priorities: List[TopicPriority], 
                                  available_hours: float,
-                                 exam_proximity_weight: float = 1.0) -> List[Dict]:
+                                 exam_proximity_weight: float = 1.0) -> StudyPlan:
         """
         Optimize study time allocation using a greedy algorithm.
-        Returns topics with allocated time.
+        Returns a plan of the topics with allocated time.
         """
-        if available_hours <= 0:
-            return []
-        
-        allocated = []
-        remaining_time = available_hours
-        
-        for priority in priorities:
-            if remaining_time <= 0:
-                if self.decision_service:
-                    self.decision_service.log_decision(
-                        'topic_dropped',
-                        f"Topic '{priority.topic.name}' dropped: no time remaining",
-                        priority.topic.id,
-                        {'available_hours': available_hours}
-                    )
-                continue
-            
-            skill_gap = 100 - priority.topic.skill_level
-            estimated_time = (skill_gap / 100) * priority.topic.weight * 5
-            estimated_time = max(0.5, min(estimated_time, 3.0))
-            estimated_time *= priority.urgency_factor * exam_proximity_weight
-            
-            allocated_time = min(estimated_time, remaining_time)
-            
-            if allocated_time >= 0.25:
-                allocated.append({
-                    'topic': priority.topic,
-                    'course': priority.course,
-                    'priority_score': priority.priority_score,
-                    'urgency_factor': priority.urgency_factor,
-                    'allocated_hours': round(allocated_time, 2)
-                })
-                remaining_time -= allocated_time
-                
-                if self.decision_service:
-                    self.decision_service.log_decision(
-                        'time_allocated',
-                        f"Allocated {allocated_time:.1f}h to '{priority.topic.name}': "
-                        f"priority={priority.priority_score:.3f}, weight={priority.topic.weight:.2f}",
-                        priority.topic.id,
-                        {
-                            'allocated_hours': allocated_time,
-                            'skill_level': priority.topic.skill_level,
-                            'weight': priority.topic.weight
-                        }
-                    )
-        
+        allocated, decisions = allocate_time(priorities, available_hours, exam_proximity_weight)
+        self.log_decisions(decisions)
         return allocated
     
-    def calculate_expected_score(self, topics: List[Topic], courses: List[Course]) -> Dict:
-        """Estimate expected exam score based on current skills and weights."""
-        course_scores = {}
-        
-        for course in courses:
-            course_topics = [t for t in topics if t.course_id == course.id]
-            
-            if not course_topics:
-                continue
-            
-            weighted_sum = sum(t.skill_level * t.weight for t in course_topics)
-            total_weight = sum(t.weight for t in course_topics)
-            
-            if total_weight > 0:
-                base_score = (weighted_sum / total_weight)
-            else:
-                base_score = 0
-            
-            dependency_penalty = 0
-            high_risk_topics = []
-            
-            for topic in course_topics:
-                dep_status = self.dependency_service.check_dependencies_satisfied(topic.id)
-                
-                if not dep_status['all_satisfied']:
-                    penalty = topic.weight * 10
-                    dependency_penalty += penalty
-                    high_risk_topics.append({
-                        'topic': topic.name,
-                        'weight': topic.weight,
-                        'blocking_prerequisites': len(dep_status['blocking_prerequisites'])
-                    })
-                
-                if topic.skill_level < 50 and topic.weight > 0.15:
-                    high_risk_topics.append({
-                        'topic': topic.name,
-                        'weight': topic.weight,
-                        'skill_level': topic.skill_level
-                    })
-            
-            adjusted_score = max(0, base_score - dependency_penalty)
-            uncertainty = 5 if total_weight >= 0.95 else 10
-            
-            course_scores[course.id] = {
-                'course_name': course.name,
-                'estimated_score': round(adjusted_score, 1),
-                'score_range': (
-                    round(max(0, adjusted_score - uncertainty), 1),
-                    round(min(100, adjusted_score + uncertainty), 1)
-                ),
-                'dependency_penalty': round(dependency_penalty, 1),
-                'high_risk_topics': high_risk_topics,
-                'total_weight_coverage': round(total_weight, 2)
-            }
+    def log_decisions(self, decisions: List[Tuple]):
+        """Log (decision_type, explanation, topic_id, metadata) tuples produced by pure helpers."""
+        for decision in decisions:
+            self._log_decision(*decision)
+    
+    def calculate_expected_score(self, topics: List[Topic], courses: List[Course],
+                                 overlay: Optional[SkillOverlay] = None) -> Dict:
+        """
+        Estimate expected exam score based on current skills and weights.
         
-        return course_scores
+        When an overlay is given, its simulated skill levels take precedence over the
+        topics' own skill levels.
+        """
+        return estimate_course_scores(topics, courses, self.dependency_statuses(topics), overlay)
+    
+    def dependency_statuses(self, topics: List[Topic]) -> Dict[int, Dict]:
+        """check_dependencies_satisfied for each topic, keyed by topic id."""
+        return {
+            topic.id: self.dependency_service.check_dependencies_satisfied(topic.id)
+            for topic in topics
+        }
     
     def identify_risks(self, topics: List[Topic], courses: List[Course]) -> List[Dict]:
         """Identify risk factors that could threaten exam success."""
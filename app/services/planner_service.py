@@ -1,6 +1,8 @@
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional
 from datetime import datetime, timedelta
+import numpy as np
 from app.storage.storage_service import StorageService
+from app.storage.planning_snapshot import PlanningSnapshot
 from app.planner.priority_calculator import PriorityCalculator
 from app.planner.study_plan_generator import StudyPlanGenerator, StudyPlan
 from app.models.models import Course, Topic, TopicPriority
@@ -22,122 +24,73 @@ class PlannerService:
         )
         self.scenario_simulator = ScenarioSimulator(self.optimization_engine)
     
-    def calculate_all_priorities(self) -> List[TopicPriority]:
+    def calculate_all_priorities(self, snapshot: Optional[PlanningSnapshot] = None) -> List[TopicPriority]:
         """Calculate priorities for all topics across all courses."""
-        priorities = []
-        courses = self.storage.get_all_courses()
-        
-        for course in courses:
-            topics = self.storage.get_topics_by_course(course.id)
-            for topic in topics:
-                priority = self.priority_calculator.calculate_priority(topic, course)
-                priorities.append(priority)
+        if snapshot is None:
+            snapshot = self.storage.get_planning_snapshot(include_activity=False)
         
-        return self.priority_calculator.sort_by_priority(priorities)
+        course_index, weights, skills = snapshot.columns()
+        return self.priority_calculator.calculate_priorities_batch(
+            snapshot.topics, snapshot.courses, course_index, weights, skills,
+            now=snapshot.now
+        )
     
-    def calculate_adaptive_priorities(self) -> List[TopicPriority]:
+    def calculate_adaptive_priorities(self, snapshot: Optional[PlanningSnapshot] = None) -> List[TopicPriority]:
         """Calculate adaptive priorities considering skill trends and study time."""
-        from app.storage.database import SkillHistoryDB, StudySessionDB
-        
-        priorities = []
-        courses = self.storage.get_all_courses()
-        db = self.storage.db
-        session = db.get_session()
-        
-        try:
-            for course in courses:
-                topics = self.storage.get_topics_by_course(course.id)
-                for topic in topics:
-                    skill_trend = self._get_skill_trend(session, topic.id)
-                    time_spent = self._get_recent_study_time(session, topic.id)
-                    
-                    base_priority = self.priority_calculator.calculate_priority(topic, course)
-                    
-                    if skill_trend < -5:
-                        base_priority.priority_score *= 1.3
-                    elif skill_trend < 0:
-                        base_priority.priority_score *= 1.1
-                    elif skill_trend > 10:
-                        base_priority.priority_score *= 0.8
-                    
-                    if time_spent > 300:
-                        base_priority.priority_score *= 0.9
-                    elif time_spent < 60:
-                        base_priority.priority_score *= 1.2
-                    
-                    priorities.append(base_priority)
-            
-            return self.priority_calculator.sort_by_priority(priorities)
-        finally:
-            session.close()
-    
-    def _get_skill_trend(self, session, topic_id: int) -> float:
-        from app.storage.database import SkillHistoryDB
+        if snapshot is None:
+            snapshot = self.storage.get_planning_snapshot()
         
-        history = session.query(SkillHistoryDB).filter(
-            SkillHistoryDB.topic_id == topic_id
-        ).order_by(SkillHistoryDB.timestamp.desc()).limit(5).all()
-        
-        if len(history) < 2:
-            return 0
-        
-        trend = history[0].new_skill - history[-1].previous_skill
-        return trend
+        course_index, weights, skills = snapshot.columns()
+        skill_trends, time_spent = snapshot.activity_columns()
+        return self.priority_calculator.calculate_priorities_batch(
+            snapshot.topics, snapshot.courses, course_index, weights, skills,
+            multipliers=self._adaptive_multipliers(skill_trends, time_spent),
+            now=snapshot.now
+        )
     
-    def _get_recent_study_time(self, session, topic_id: int, days: int = 7) -> float:
-        from app.storage.database import StudySessionDB
-        
-        cutoff = datetime.now() - timedelta(days=days)
-        sessions = session.query(StudySessionDB).filter(
-            StudySessionDB.topic_id == topic_id,
-            StudySessionDB.start_time >= cutoff,
-            StudySessionDB.end_time.isnot(None)
-        ).all()
-        
-        return sum(s.duration_minutes for s in sessions)
+    @staticmethod
+    def _adaptive_multipliers(skill_trends: np.ndarray, time_spent: np.ndarray) -> np.ndarray:
+        """Boost declining or under-studied topics, damp improving or over-studied ones."""
+        trend_factor = np.select(
+            [skill_trends < -5, skill_trends < 0, skill_trends > 10],
+            [1.3, 1.1, 0.8],
+            default=1.0
+        )
+        time_factor = np.select(
+            [time_spent > 300, time_spent < 60],
+            [0.9, 1.2],
+            default=1.0
+        )
+        return trend_factor * time_factor
     
     def detect_weak_topics(self) -> List[Dict]:
         """Identify weakest topics based on skill level, weight, and inactivity."""
-        from app.storage.database import StudySessionDB
-        
+        snapshot = self.storage.get_planning_snapshot()
         weak_topics = []
-        courses = self.storage.get_all_courses()
-        db = self.storage.db
-        session = db.get_session()
         
-        try:
-            for course in courses:
-                topics = self.storage.get_topics_by_course(course.id)
-                
-                for topic in topics:
-                    last_session = session.query(StudySessionDB).filter(
-                        StudySessionDB.topic_id == topic.id,
-                        StudySessionDB.end_time.isnot(None)
-                    ).order_by(StudySessionDB.end_time.desc()).first()
-                    
-                    days_inactive = 0
-                    if last_session:
-                        days_inactive = (datetime.now() - last_session.end_time).days
-                    else:
-                        days_inactive = 999
-                    
-                    urgency_score = (
-                        (100 - topic.skill_level) * topic.weight * 2 +
-                        min(days_inactive, 30) * 0.5
-                    )
-                    
-                    if urgency_score > 30:
-                        weak_topics.append({
-                            'topic': topic,
-                            'course': course,
-                            'urgency_score': urgency_score,
-                            'days_inactive': days_inactive
-                        })
+        for topic, course in snapshot.iter_topics():
+            last_end = snapshot.last_session_end.get(topic.id)
             
-            weak_topics.sort(key=lambda x: x['urgency_score'], reverse=True)
-            return weak_topics
-        finally:
-            session.close()
+            if last_end:
+                days_inactive = (snapshot.now - last_end).days
+            else:
+                days_inactive = 999
+            
+            urgency_score = (
+                (100 - topic.skill_level) * topic.weight * 2 +
+                min(days_inactive, 30) * 0.5
+            )
+            
+            if urgency_score > 30:
+                weak_topics.append({
+                    'topic': topic,
+                    'course': course,
+                    'urgency_score': urgency_score,
+                    'days_inactive': days_inactive
+                })
+        
+        weak_topics.sort(key=lambda x: x['urgency_score'], reverse=True)
+        return weak_topics
     
     def generate_daily_plan(self, available_hours: float, optimize: bool = True, adaptive: bool = True) -> StudyPlan:
         """Generate a daily study plan based on current priorities."""
@@ -146,18 +99,16 @@ class PlannerService:
         else:
             priorities = self.calculate_all_priorities()
         
-        priorities = self.optimization_engine.adjust_priorities_for_dependencies(priorities)
-        
-        if optimize:
-            allocated = self.optimization_engine.optimize_time_allocation(
-                priorities, available_hours
-            )
+        # Decisions logged while planning are written in one transaction at the end
+        with self.decision_service.batch():
+            priorities = self.optimization_engine.adjust_priorities_for_dependencies(priorities)
             
-            plan = StudyPlan(daily_hours=available_hours)
-            plan.allocated_topics = allocated
-            return plan
-        else:
-            return StudyPlanGenerator.generate_daily_plan(priorities, available_hours)
+            if optimize:
+                return self.optimization_engine.optimize_time_allocation(
+                    priorities, available_hours
+                )
+            else:
+                return StudyPlanGenerator.generate_daily_plan(priorities, available_hours)
     
     def get_expected_scores(self) -> Dict:
         """Get expected exam scores for all courses."""
@@ -178,9 +129,10 @@ class PlannerService:
     
     def simulate_scenario(self, scenario_type: str, **kwargs) -> Dict:
         """Run a what-if scenario simulation."""
-        topics = self.storage.get_all_topics()
-        courses = self.storage.get_all_courses()
-        priorities = self.calculate_adaptive_priorities()
+        snapshot = self.storage.get_planning_snapshot()
+        topics = snapshot.topics
+        courses = snapshot.courses
+        priorities = self.calculate_adaptive_priorities(snapshot)
         
         if scenario_type == 'hours_change':
             return self.scenario_simulator.simulate_study_hours_change(
@@ -199,11 +151,22 @@ class PlannerService:
             )
         elif scenario_type == 'compare_strategies':
             return self.scenario_simulator.compare_strategies(
-                topics, courses, priorities, kwargs['available_hours']
+                topics, courses, priorities, kwargs['available_hours'],
+                kwargs.get('strategies')
             )
         else:
             raise ValueError(f"Unknown scenario type: {scenario_type}")
     
+    def simulate_sweep(self, hours_values: List[float], days_shifts: List[int] = (0,),
+                       course_id: Optional[int] = None) -> Dict:
+        """Evaluate a daily-hours x exam-shift grid of what-if scenarios."""
+        snapshot = self.storage.get_planning_snapshot()
+        skill_trends, time_spent = snapshot.activity_columns()
+        return self.scenario_simulator.sweep(
+            snapshot, self._adaptive_multipliers(skill_trends, time_spent),
+            hours_values, days_shifts, course_id
+        )
+    
     def validate_course_topics(self, course_id: int) -> dict:
         """Validate that topic weights sum to approximately 1.0 for a course."""
         topics = self.storage.get_topics_by_course(course_id)
@@ -1,7 +1,8 @@
 from typing import Dict, List
-from datetime import datetime, timedelta
-from app.storage.database import Database, SkillHistoryDB, StudySessionDB, TopicDB
+from datetime import date, datetime, timedelta
+from app.storage.database import Database, SkillHistoryDB, TopicDB
 from app.storage.storage_service import StorageService
+from app.storage.topic_stats import get_study_minutes
 
 
 class ProgressVisualizationService:
@@ -57,27 +58,11 @@ class ProgressVisualizationService:
             session.close()
     
     def get_daily_study_time_chart(self, days: int = 7) -> Dict[str, float]:
+        """Study minutes for each of the last `days` calendar days (including today), oldest first."""
         session = self.db.get_session()
         try:
-            cutoff = datetime.now() - timedelta(days=days)
-            
-            sessions = session.query(StudySessionDB).filter(
-                StudySessionDB.start_time >= cutoff,
-                StudySessionDB.end_time.isnot(None)
-            ).all()
-            
-            daily_totals = {}
-            
-            for i in range(days):
-                date = (datetime.now() - timedelta(days=i)).strftime('%Y-%m-%d')
-                daily_totals[date] = 0
-            
-            for s in sessions:
-                date_key = s.start_time.strftime('%Y-%m-%d')
-                if date_key in daily_totals:
-                    daily_totals[date_key] += s.duration_minutes
-            
-            return daily_totals
+            today = date.today()
+            return get_study_minutes(session, today - timedelta(days=days - 1), today)
         finally:
             session.close()
     
@@ -1,7 +1,10 @@
 from typing import List, Dict, Optional
 from datetime import datetime
-from app.models.models import Quiz, QuizQuestion, QuizAttempt
+from app.models.models import Quiz, QuizAttempt
 from app.storage.database import Database, QuizDB, QuizQuestionDB, QuizAttemptDB
+from app.storage.effective_skill import decay_policy, materialize_decay
+from app.storage.topic_stats import record_quiz_attempt, remove_quiz_attempts
+from app.storage.hydration import quiz_from_row, quiz_attempt_from_row
 
 
 class QuizService:
@@ -45,26 +48,7 @@ class QuizService:
             if not db_quiz:
                 return None
             
-            questions = []
-            for db_q in db_quiz.questions:
-                questions.append(QuizQuestion(
-                    id=db_q.id,
-                    quiz_id=db_q.quiz_id,
-                    question_text=db_q.question_text,
-                    option_a=db_q.option_a,
-                    option_b=db_q.option_b,
-                    option_c=db_q.option_c,
-                    option_d=db_q.option_d,
-                    correct_answer=db_q.correct_answer
-                ))
-            
-            return Quiz(
-                id=db_quiz.id,
-                topic_id=db_quiz.topic_id,
-                title=db_quiz.title,
-                created_at=db_quiz.created_at,
-                questions=questions
-            )
+            return quiz_from_row(db_quiz)
         finally:
             session.close()
     
@@ -72,28 +56,7 @@ class QuizService:
         session = self.db.get_session()
         try:
             db_quizzes = session.query(QuizDB).filter(QuizDB.topic_id == topic_id).all()
-            quizzes = []
-            for db_quiz in db_quizzes:
-                questions = [
-                    QuizQuestion(
-                        id=db_q.id,
-                        quiz_id=db_q.quiz_id,
-                        question_text=db_q.question_text,
-                        option_a=db_q.option_a,
-                        option_b=db_q.option_b,
-                        option_c=db_q.option_c,
-                        option_d=db_q.option_d,
-                        correct_answer=db_q.correct_answer
-                    ) for db_q in db_quiz.questions
-                ]
-                quizzes.append(Quiz(
-                    id=db_quiz.id,
-                    topic_id=db_quiz.topic_id,
-                    title=db_quiz.title,
-                    created_at=db_quiz.created_at,
-                    questions=questions
-                ))
-            return quizzes
+            return [quiz_from_row(db_quiz) for db_quiz in db_quizzes]
         finally:
             session.close()
     
@@ -114,23 +77,22 @@ class QuizService:
             
             score = (correct_count / total_questions * 100) if total_questions > 0 else 0
             
+            # An attempt counts as activity, so write out the decay accrued until now
+            attempted_at = datetime.now()
+            materialize_decay(self.db, session, decay_policy(self.db), topic_ids=[db_quiz.topic_id], now=attempted_at)
+            
             db_attempt = QuizAttemptDB(
                 quiz_id=quiz_id,
-                attempted_at=datetime.now(),
+                attempted_at=attempted_at,
                 score=score,
                 total_questions=total_questions
             )
             session.add(db_attempt)
+            record_quiz_attempt(session, db_quiz.topic_id, attempted_at, score)
             session.commit()
             session.refresh(db_attempt)
             
-            return QuizAttempt(
-                id=db_attempt.id,
-                quiz_id=db_attempt.quiz_id,
-                attempted_at=db_attempt.attempted_at,
-                score=db_attempt.score,
-                total_questions=db_attempt.total_questions
-            )
+            return quiz_attempt_from_row(db_attempt)
         finally:
             session.close()
     
@@ -142,13 +104,7 @@ class QuizService:
             ).order_by(QuizAttemptDB.attempted_at.desc()).all()
             
             return [
-                QuizAttempt(
-                    id=att.id,
-                    quiz_id=att.quiz_id,
-                    attempted_at=att.attempted_at,
-                    score=att.score,
-                    total_questions=att.total_questions
-                ) for att in db_attempts
+                quiz_attempt_from_row(att) for att in db_attempts
             ]
         finally:
             session.close()
@@ -196,17 +152,19 @@ class QuizService:
     
     def delete_quiz(self, quiz_id: int):
         """Delete a quiz and all its questions and attempts"""
-        from app.storage.database import QuizQuestionDB, QuizAttemptDB
         session = self.db.get_session()
         try:
-            # Delete attempts first
-            session.query(QuizAttemptDB).filter(QuizAttemptDB.quiz_id == quiz_id).delete()
+            db_quiz = session.query(QuizDB).filter(QuizDB.id == quiz_id).first()
+            if not db_quiz:
+                return
             
-            # Delete questions
-            session.query(QuizQuestionDB).filter(QuizQuestionDB.quiz_id == quiz_id).delete()
+            topic_id = db_quiz.topic_id
+            attempts = [(attempt.attempted_at, attempt.score) for attempt in db_quiz.attempts]
             
-            # Delete quiz
-            session.query(QuizDB).filter(QuizDB.id == quiz_id).delete()
+            # Through the ORM, so the cascade to questions and attempts publishes its row changes
+            session.delete(db_quiz)
+            session.flush()
+            remove_quiz_attempts(session, topic_id, attempts)
             
             session.commit()
         finally:
@@ -1,8 +1,11 @@
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime
-from app.storage.database import Database, TopicDB, CourseDB
+import copy
+from app.storage.database import Database, CourseDB
 from app.services.honesty_service import HonestyService
 from app.services.exam_simulation_service import ExamSimulationService
+from app.services.feature_store import TopicFeatureStore, TopicFeatureFrame
+from app.services.course_versions import CourseVersions
 
 
 class ForcedReprioritizationEngine:
@@ -20,6 +23,8 @@ class ForcedReprioritizationEngine:
         self.db = db
         self.honesty_service = HonestyService(db)
         self.exam_sim_service = ExamSimulationService(db)
+        self.feature_store = TopicFeatureStore.for_database(db)
+        self.course_versions = CourseVersions.for_database(db)
         self.imminent_exam_days = 7
         self.critical_skill_threshold = 40.0
         self.critical_weight_threshold = 0.25
@@ -28,15 +33,30 @@ class ForcedReprioritizationEngine:
         """
         Check if forced re-prioritization is needed.
         Returns override decisions and explanations.
+        
+        Results are cached per (course, state version, day), so repeated checks
+        between writes to the course do not rerun the exam simulation and honesty analysis.
         """
+        key = ('forced_reprioritization', self.imminent_exam_days,
+               self.critical_skill_threshold, self.critical_weight_threshold)
+        check = self.course_versions.memoize(
+            key, course_id, lambda: self._evaluate_forced_reprioritization(course_id)
+        )
+        # Callers may modify the result
+        return copy.deepcopy(check)
+    
+    def _evaluate_forced_reprioritization(self, course_id: int) -> Dict:
         session = self.db.get_session()
         try:
             course = session.query(CourseDB).filter(CourseDB.id == course_id).first()
             if not course:
                 return {'error': 'Course not found'}
             
-            days_until_exam = (course.exam_date - datetime.now()).days
-            topics = session.query(TopicDB).filter(TopicDB.course_id == course_id).all()
+            # One as-of time so the exam simulation and honesty analysis share a feature frame
+            as_of = datetime.now()
+            days_until_exam = (course.exam_date - as_of).days
+            frame = self.feature_store.frame(course_id, as_of)
+            topic_names = dict(zip(frame.topic_ids.tolist(), frame.names))
             
             overrides = []
             forced = False
@@ -44,7 +64,7 @@ class ForcedReprioritizationEngine:
             
             # Trigger 1: Imminent exam
             if days_until_exam <= self.imminent_exam_days:
-                exam_sim = self.exam_sim_service.simulate_exam_today(course_id)
+                exam_sim = self.exam_sim_service.simulate_exam_today(course_id, as_of)
                 
                 if not exam_sim.get('will_pass'):
                     forced = True
@@ -54,14 +74,14 @@ class ForcedReprioritizationEngine:
                         'severity': 'CRITICAL',
                         'message': f"⚠️ EXAM IN {days_until_exam} DAYS - Estimated score: {exam_sim['estimated_score']:.0f}% (Failing)",
                         'action': 'Force focus on critical gaps',
-                        'locked_topics': self._get_low_priority_topics(topics),
+                        'locked_topics': self._get_low_priority_topics(frame),
                         'mandatory_topics': [g['name'] for g in exam_sim.get('critical_gaps', [])]
                     })
             
             # Trigger 2: Critical prerequisites missing
             critical_missing = []
-            for topic in topics:
-                if topic.weight > self.critical_weight_threshold and topic.skill_level < self.critical_skill_threshold:
+            for topic, skill_level in zip(frame.topics, frame.effective_skill.tolist()):
+                if topic.weight > self.critical_weight_threshold and skill_level < self.critical_skill_threshold:
                     critical_missing.append(topic)
             
             if critical_missing:
@@ -73,11 +93,11 @@ class ForcedReprioritizationEngine:
                     'message': f"🚨 {len(critical_missing)} critical topics below {self.critical_skill_threshold}%",
                     'action': 'Block low-priority topics until critical topics reach 60%',
                     'mandatory_topics': [t.name for t in critical_missing],
-                    'locked_topics': self._get_low_priority_topics(topics)
+                    'locked_topics': self._get_low_priority_topics(frame)
                 })
             
             # Trigger 3: Repeated avoidance detected
-            avoidance_analysis = self.honesty_service.analyze_all_topics_honesty(course_id)
+            avoidance_analysis = self.honesty_service.analyze_all_topics_honesty(course_id, now=as_of)
             avoided_topics = avoidance_analysis.get('avoidance', [])
             
             high_severity_avoidance = [a for a in avoided_topics if a['avoidance_severity'] > 50]
@@ -105,7 +125,7 @@ class ForcedReprioritizationEngine:
                     'severity': 'MEDIUM',
                     'message': f"⚠️ {len(high_fake)} topics showing fake productivity patterns",
                     'action': 'Mandatory quiz or study method change required',
-                    'affected_topics': [self._get_topic_name(f['topic_id']) for f in high_fake],
+                    'affected_topics': [topic_names.get(f['topic_id'], f"Topic {f['topic_id']}") for f in high_fake],
                     'required_action': 'take_quiz_or_change_method'
                 })
             
@@ -121,21 +141,12 @@ class ForcedReprioritizationEngine:
         finally:
             session.close()
     
-    def _get_topic_name(self, topic_id: int) -> str:
-        """Get topic name by ID"""
-        session = self.db.get_session()
-        try:
-            topic = session.query(TopicDB).filter(TopicDB.id == topic_id).first()
-            return topic.name if topic else f"Topic {topic_id}"
-        finally:
-            session.close()
-    
-    def _get_low_priority_topics(self, topics: List) -> List[str]:
+    def _get_low_priority_topics(self, frame: TopicFeatureFrame) -> List[str]:
         """Identify low-priority topics that should be locked"""
         low_priority = []
-        for topic in topics:
-            # Low priority = low weight or already high skill
-            if topic.weight < 0.15 or topic.skill_level > 80:
+        for topic, skill_level in zip(frame.topics, frame.effective_skill.tolist()):
+            # Low priority = low weight or already high (effective) skill
+            if topic.weight < 0.15 or skill_level > 80:
                 low_priority.append(topic.name)
         return low_priority
     
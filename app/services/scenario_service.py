@@ -1,14 +1,40 @@
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime, timedelta
-from copy import deepcopy
+from functools import wraps
+import os
+import numpy as np
 from app.models.models import Topic, Course, TopicPriority
-from app.services.optimization_service import OptimizationEngine
+from app.planner.priority_calculator import PriorityCalculator
+from app.storage.planning_snapshot import PlanningSnapshot
+from app.services.optimization_service import OptimizationEngine, SkillOverlay
+from app.services.strategies import (
+    STRATEGIES, StrategyTopic, StrategyPool, evaluate_strategy, picklable
+)
+
+
+def _dry_run(method):
+    """Run a scenario inside the engine's dry-run context and attach the decisions it would have logged."""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.optimization_engine.dry_run() as decisions:
+            result = method(self, *args, **kwargs)
+        result['simulated_decisions'] = decisions
+        return result
+    return wrapper
 
 
 class ScenarioSimulator:
-    def __init__(self, optimization_engine: OptimizationEngine):
+    MAX_SWEEP_POINTS = 10000
+    PARALLEL_MIN_TOPICS = 2000
+    
+    def __init__(self, optimization_engine: OptimizationEngine,
+                 max_workers: Optional[int] = None, strategy_timeout: float = 30.0):
         self.optimization_engine = optimization_engine
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.strategy_timeout = strategy_timeout
+        self._strategy_pool: Optional[StrategyPool] = None
     
+    @_dry_run
     def simulate_study_hours_change(self, 
                                     current_topics: List[Topic],
                                     current_courses: List[Course],
@@ -24,8 +50,8 @@ class ScenarioSimulator:
             priorities, new_hours
         )
         
-        current_topics_covered = {item['topic'].id for item in current_allocation}
-        new_topics_covered = {item['topic'].id for item in new_allocation}
+        current_topics_covered = set(current_allocation.topics)
+        new_topics_covered = set(new_allocation.topics)
         
         topics_gained = new_topics_covered - current_topics_covered
         topics_lost = current_topics_covered - new_topics_covered
@@ -34,11 +60,9 @@ class ScenarioSimulator:
             current_topics, current_courses
         )
         
-        simulated_topics = self._apply_allocation_to_topics(
-            deepcopy(current_topics), new_allocation
-        )
+        simulated_overlay = SkillOverlay.from_allocation(new_allocation)
         simulated_score = self.optimization_engine.calculate_expected_score(
-            simulated_topics, current_courses
+            current_topics, current_courses, simulated_overlay
         )
         
         return {
@@ -55,6 +79,7 @@ class ScenarioSimulator:
                             and len(topics_gained) > 0 else 'maintain_hours'
         }
     
+    @_dry_run
     def simulate_ignore_low_weight(self,
                                    current_topics: List[Topic],
                                    current_courses: List[Course],
@@ -79,20 +104,18 @@ class ScenarioSimulator:
         ]
         
         time_saved = sum(
-            item['allocated_hours'] 
-            for item in original_allocation 
-            if item['topic'].weight < weight_threshold
+            entry.allocated_hours
+            for entry in original_allocation
+            if original_allocation.topics[entry.topic_id].weight < weight_threshold
         )
         
         original_score = self.optimization_engine.calculate_expected_score(
             current_topics, current_courses
         )
         
-        simulated_topics = self._apply_allocation_to_topics(
-            deepcopy(current_topics), filtered_allocation
-        )
+        simulated_overlay = SkillOverlay.from_allocation(filtered_allocation)
         simulated_score = self.optimization_engine.calculate_expected_score(
-            simulated_topics, current_courses
+            current_topics, current_courses, simulated_overlay
         )
         
         return {
@@ -106,6 +129,7 @@ class ScenarioSimulator:
             'recommendation': 'focus_strategy' if time_saved > 1.0 else 'cover_all'
         }
     
+    @_dry_run
     def simulate_exam_date_change(self,
                                   current_topics: List[Topic],
                                   current_courses: List[Course],
@@ -113,12 +137,11 @@ class ScenarioSimulator:
                                   course_id: int,
                                   days_shift: int) -> Dict:
         """Simulate moving exam date earlier or later."""
-        simulated_courses = deepcopy(current_courses)
-        
-        for course in simulated_courses:
-            if course.id == course_id:
-                course.exam_date = course.exam_date + timedelta(days=days_shift)
-                break
+        simulated_courses = [
+            course.model_copy(update={'exam_date': course.exam_date + timedelta(days=days_shift)})
+            if course.id == course_id else course
+            for course in current_courses
+        ]
         
         current_risks = self.optimization_engine.identify_risks(
             current_topics, current_courses
@@ -148,83 +171,64 @@ class ScenarioSimulator:
             'simulated_expected_scores': simulated_score
         }
     
+    @_dry_run
     def compare_strategies(self,
                           current_topics: List[Topic],
                           current_courses: List[Course],
                           priorities: List[TopicPriority],
-                          available_hours: float) -> Dict:
-        """Compare different study strategies."""
-        strategies = {}
-        
-        # Strategy 1: Balanced revision (normal priority)
-        balanced_allocation = self.optimization_engine.optimize_time_allocation(
-            priorities, available_hours
-        )
-        balanced_topics = self._apply_allocation_to_topics(
-            deepcopy(current_topics), balanced_allocation
-        )
-        balanced_score = self.optimization_engine.calculate_expected_score(
-            balanced_topics, current_courses
-        )
+                          available_hours: float,
+                          strategy_keys: Optional[List[str]] = None) -> Dict:
+        """
+        Compare registered study strategies (all of them unless `strategy_keys` is given).
         
-        strategies['balanced'] = {
-            'name': 'Balanced Revision',
-            'description': 'Study all topics based on normal priority',
-            'topics_covered': len(balanced_allocation),
-            'expected_scores': balanced_score,
-            'total_time': available_hours
-        }
+        Large catalogs are evaluated in parallel worker processes that each receive
+        one copy of the topics and priorities; strategies exceeding
+        `strategy_timeout` are reported with an error instead of a score.
+        """
+        selected = list(strategy_keys or STRATEGIES)
+        unknown = [key for key in selected if key not in STRATEGIES]
+        if unknown:
+            raise ValueError(f"Unknown strategies: {', '.join(unknown)}")
         
-        # Strategy 2: High-weight focus
-        high_weight_priorities = sorted(
-            priorities, 
-            key=lambda p: p.topic.weight * (100 - p.topic.skill_level), 
-            reverse=True
-        )
-        high_weight_allocation = self.optimization_engine.optimize_time_allocation(
-            high_weight_priorities, available_hours
-        )
-        high_weight_topics = self._apply_allocation_to_topics(
-            deepcopy(current_topics), high_weight_allocation
-        )
-        high_weight_score = self.optimization_engine.calculate_expected_score(
-            high_weight_topics, current_courses
-        )
-        
-        strategies['high_weight_focus'] = {
-            'name': 'High-Weight Focus',
-            'description': 'Prioritize topics with highest weights',
-            'topics_covered': len(high_weight_allocation),
-            'expected_scores': high_weight_score,
-            'total_time': available_hours
-        }
+        dependency_status = self.optimization_engine.dependency_statuses(current_topics)
+        dependency_service = self.optimization_engine.dependency_service
+        records = [
+            StrategyTopic(
+                p.topic.id, p.topic.course_id, p.topic.name, p.topic.weight, p.topic.skill_level,
+                p.priority_score, p.urgency_factor,
+                len(dependency_service.get_dependents(p.topic.id)),
+                not dependency_status.get(p.topic.id, {'all_satisfied': True})['all_satisfied']
+            ) for p in priorities
+        ]
+        snapshot = (current_topics, current_courses, priorities, records, dependency_status)
         
-        # Strategy 3: Weak-topic focus
-        weak_priorities = sorted(
-            priorities,
-            key=lambda p: p.topic.skill_level,
-            reverse=False
-        )
-        weak_allocation = self.optimization_engine.optimize_time_allocation(
-            weak_priorities, available_hours
-        )
-        weak_topics = self._apply_allocation_to_topics(
-            deepcopy(current_topics), weak_allocation
-        )
-        weak_score = self.optimization_engine.calculate_expected_score(
-            weak_topics, current_courses
-        )
+        strategies = {}
+        for key, outcome in self._run_strategies(selected, available_hours, snapshot).items():
+            strategy = STRATEGIES[key]
+            if outcome is None:
+                strategies[key] = {
+                    'name': strategy.name,
+                    'description': strategy.description,
+                    'error': f"Timed out after {self.strategy_timeout}s"
+                }
+                continue
+            
+            result, decisions = outcome
+            self.optimization_engine.log_decisions(decisions)
+            strategies[key] = {
+                'name': strategy.name,
+                'description': strategy.description,
+                'topics_covered': result['topics_covered'],
+                'expected_scores': result['expected_scores'],
+                'total_time': available_hours
+            }
         
-        strategies['weak_focus'] = {
-            'name': 'Weak Topics Focus',
-            'description': 'Focus on improving weakest topics first',
-            'topics_covered': len(weak_allocation),
-            'expected_scores': weak_score,
-            'total_time': available_hours
-        }
+        finished = [item for item in strategies.items() if 'error' not in item[1]]
+        if not finished:
+            raise ValueError("No strategy finished within the time limit")
         
         best_strategy = max(
-            strategies.items(),
+            finished,
             key=lambda x: sum(
                 s['estimated_score'] 
                 for s in x[1]['expected_scores'].values()
@@ -238,15 +242,121 @@ class ScenarioSimulator:
             'reason': f"Highest projected total score across all courses"
         }
     
-    def _apply_allocation_to_topics(self, topics: List[Topic], 
-                                   allocation: List[Dict]) -> List[Topic]:
-        """Simulate skill improvement based on time allocation."""
-        for item in allocation:
-            for topic in topics:
-                if topic.id == item['topic'].id:
-                    hours = item['allocated_hours']
-                    skill_gain = min(hours * 8, 100 - topic.skill_level)
-                    topic.skill_level = min(100, topic.skill_level + skill_gain)
-                    break
-        
-        return topics
+    def _run_strategies(self, keys: List[str], available_hours: float, snapshot: Tuple) -> Dict:
+        """Evaluate strategies, in the worker pool when it pays off; None marks a timeout."""
+        if min(self.max_workers, len(keys)) <= 1 or len(snapshot[2]) < self.PARALLEL_MIN_TOPICS:
+            return {key: evaluate_strategy(STRATEGIES[key], available_hours, *snapshot) for key in keys}
+        
+        # Sort keys that cannot be pickled (lambdas, closures) are evaluated here instead
+        remote = [STRATEGIES[key] for key in keys if picklable(STRATEGIES[key])]
+        outcomes = self._pool().run(remote, available_hours, snapshot, self.strategy_timeout)
+        for key in keys:
+            if key not in outcomes:
+                outcomes[key] = evaluate_strategy(STRATEGIES[key], available_hours, *snapshot)
+        return {key: outcomes[key] for key in keys}
+    
+    def _pool(self) -> StrategyPool:
+        """The simulator's long-lived pool, replaced if max_workers changed."""
+        if self._strategy_pool is None or self._strategy_pool.processes != self.max_workers:
+            if self._strategy_pool is not None:
+                self._strategy_pool.close()
+            self._strategy_pool = StrategyPool(self.max_workers)
+        return self._strategy_pool
+    
+    def sweep(self,
+              snapshot: PlanningSnapshot,
+              multipliers: np.ndarray,
+              hours_values: List[float],
+              days_shifts: List[int],
+              course_id: Optional[int] = None) -> Dict:
+        """
+        Evaluate a grid of daily-hours x exam-shift scenarios in one batched pass.
+        
+        Every grid point re-ranks the snapshot's priorities with the shifted exam
+        urgency, allocates time greedily (same rules as optimize_time_allocation) and
+        estimates per-course scores from the simulated skills. Shifts apply to
+        `course_id`, or to every course when it is None. Surfaces are indexed
+        [shift][hours].
+        """
+        hours = np.asarray(hours_values, dtype=np.float64)
+        shifts = np.asarray(days_shifts, dtype=np.int64)
+        
+        if hours.ndim != 1 or shifts.ndim != 1 or len(hours) == 0 or len(shifts) == 0:
+            raise ValueError("Sweep grids must be non-empty lists")
+        if len(hours) * len(shifts) > self.MAX_SWEEP_POINTS:
+            raise ValueError(f"Sweep grid too large: at most {self.MAX_SWEEP_POINTS} points")
+        if course_id is not None and course_id not in snapshot.courses_by_id:
+            raise ValueError(f"Course {course_id} not found")
+        
+        result = {
+            'scenario': 'sweep',
+            'course_id': course_id,
+            'hours': hours.tolist(),
+            'days_shifts': shifts.tolist(),
+            'expected_scores': {},
+            'total_expected_score': np.zeros((len(shifts), len(hours))).tolist(),
+            'topics_covered': np.zeros((len(shifts), len(hours)), dtype=int).tolist()
+        }
+        if not snapshot.topics:
+            return result
+        
+        course_index, weights, skills = snapshot.columns()
+        multipliers = np.asarray(multipliers, dtype=np.float64)
+        base_scores = weights * (1 - skills / 100) * multipliers
+        base_estimates = np.clip((100 - skills) / 100 * weights * 5, 0.5, 3.0)
+        
+        # Topics are grouped by course, so per-course sums are contiguous slices
+        present, starts = np.unique(course_index, return_index=True)
+        total_weight = np.add.reduceat(weights, starts)
+        penalty = np.zeros(len(present))
+        position = {course: i for i, course in enumerate(present.tolist())}
+        for row, topic in enumerate(snapshot.topics):
+            dep_status = self.optimization_engine.dependency_service.check_dependencies_satisfied(topic.id)
+            if not dep_status['all_satisfied']:
+                penalty[position[course_index[row]]] += topic.weight * 10
+        
+        exam_dates = np.asarray([c.exam_date for c in snapshot.courses], dtype='datetime64[us]')
+        shifted = np.repeat(exam_dates[None, :], len(shifts), axis=0)
+        if course_id is None:
+            shifted += shifts[:, None] * np.timedelta64(1, 'D')
+        else:
+            column = [c.id for c in snapshot.courses].index(course_id)
+            shifted[:, column] += shifts * np.timedelta64(1, 'D')
+        course_urgency = PriorityCalculator.urgency_from_days(
+            PriorityCalculator.days_until(shifted, snapshot.now)
+        )
+        
+        # Urgency only takes three values, so many shifts share one evaluation
+        patterns, inverse = np.unique(course_urgency, axis=0, return_inverse=True)
+        scores = np.empty((len(patterns), len(hours), len(present)))
+        covered = np.empty((len(patterns), len(hours)), dtype=int)
+        
+        for p, pattern in enumerate(patterns):
+            urgency = pattern[course_index]
+            order = np.argsort(-(base_scores * urgency), kind='stable')
+            estimates = (base_estimates * urgency)[order]
+            before = np.concatenate(([0.0], np.cumsum(estimates)[:-1]))
+            
+            allocation = np.clip(hours[:, None] - before[None, :], 0, estimates)
+            allocation[allocation < 0.25] = 0
+            covered[p] = np.count_nonzero(allocation, axis=1)
+            
+            simulated = np.empty_like(allocation)
+            simulated[:, order] = np.minimum(
+                100, skills[order] + allocation * SkillOverlay.SKILL_GAIN_PER_HOUR
+            )
+            weighted = np.add.reduceat(simulated * weights, starts, axis=1)
+            base = np.divide(weighted, total_weight, out=np.zeros_like(weighted), where=total_weight > 0)
+            scores[p] = np.maximum(0, base - penalty)
+        
+        surfaces = np.round(scores[inverse.reshape(-1)], 1)
+        for i, course in enumerate(present.tolist()):
+            course_obj = snapshot.courses[course]
+            result['expected_scores'][course_obj.id] = {
+                'course_name': course_obj.name,
+                'surface': surfaces[:, :, i].tolist()
+            }
+        result['total_expected_score'] = np.round(surfaces.sum(axis=2), 1).tolist()
+        result['topics_covered'] = covered[inverse.reshape(-1)].tolist()
+        
+        return result
@@ -2,6 +2,11 @@ from typing import List, Optional, Dict
 from datetime import datetime, timedelta
 from app.models.models import SkillHistory
 from app.storage.database import Database, SkillHistoryDB, TopicDB
+from app.storage.topic_stats import record_skill_changes
+from app.storage.hydration import skill_history_from_row
+from app.storage.effective_skill import (
+    DecayPolicy, decay_policy, set_decay_policy, load_skill_states, materialize_decay, effective_skills
+)
 
 
 class SkillTrackingService:
@@ -10,12 +15,47 @@ class SkillTrackingService:
         self.max_skill_increase_per_day = 15.0
         self.self_assessment_weight = 0.5
         self.quiz_weight = 1.0
-        self.decay_start_days = 7
-        self.decay_rate_per_day = 0.5
+    
+    @property
+    def decay_policy(self) -> DecayPolicy:
+        """Shared by every service on this database, so changing it here changes what they all read."""
+        return decay_policy(self.db)
+    
+    @property
+    def decay_start_days(self) -> int:
+        return self.decay_policy.start_days
+    
+    @decay_start_days.setter
+    def decay_start_days(self, days: int):
+        set_decay_policy(self.db, self.decay_policy._replace(start_days=days))
+    
+    @property
+    def decay_rate_per_day(self) -> float:
+        return self.decay_policy.rate_per_day
+    
+    @decay_rate_per_day.setter
+    def decay_rate_per_day(self, rate: float):
+        set_decay_policy(self.db, self.decay_policy._replace(rate_per_day=rate))
+    
+    def get_effective_skill(self, topic_id: int) -> Optional[float]:
+        """Stored skill minus the decay accrued since the topic's last activity"""
+        return effective_skills(self.db, self.decay_policy).get(topic_id)
+    
+    def get_effective_skills(self, topic_ids: Optional[List[int]] = None) -> Dict[int, float]:
+        session = self.db.get_session()
+        try:
+            states = load_skill_states(session, self.decay_policy, datetime.now(), topic_ids)
+            return {topic_id: state.effective_skill for topic_id, state in states.items()}
+        finally:
+            session.close()
     
     def record_skill_change(self, topic_id: int, new_skill: float, reason: str, previous_skill: Optional[float] = None) -> SkillHistory:
         session = self.db.get_session()
         try:
+            # Touching a topic materializes the decay it accrued since its last activity
+            if reason != "decay":
+                materialize_decay(self.db, session, self.decay_policy, [topic_id])
+            
             topic = session.query(TopicDB).filter(TopicDB.id == topic_id).first()
             if not topic:
                 raise ValueError("Topic not found")
@@ -52,20 +92,47 @@ class SkillTrackingService:
                 reason=reason
             )
             session.add(db_history)
+            record_skill_changes(session, [{
+                "topic_id": topic_id,
+                "timestamp": db_history.timestamp,
+                "previous_skill": previous_skill,
+                "new_skill": new_skill,
+                "reason": reason
+            }])
             
             topic.skill_level = new_skill
             
             session.commit()
             session.refresh(db_history)
             
-            return SkillHistory(
-                id=db_history.id,
-                topic_id=db_history.topic_id,
-                timestamp=db_history.timestamp,
-                previous_skill=db_history.previous_skill,
-                new_skill=db_history.new_skill,
-                reason=db_history.reason
+            return skill_history_from_row(db_history)
+        finally:
+            session.close()
+    
+    def log_skill_change(self, topic_id: int, previous_skill: float, new_skill: float, reason: str) -> SkillHistory:
+        """Record a change already written to the topic (e.g. a manual edit) as-is: no caps, no decay."""
+        session = self.db.get_session()
+        try:
+            db_history = SkillHistoryDB(
+                topic_id=topic_id,
+                timestamp=datetime.now(),
+                previous_skill=previous_skill,
+                new_skill=new_skill,
+                reason=reason
             )
+            session.add(db_history)
+            record_skill_changes(session, [{
+                "topic_id": topic_id,
+                "timestamp": db_history.timestamp,
+                "previous_skill": previous_skill,
+                "new_skill": new_skill,
+                "reason": reason
+            }])
+            
+            session.commit()
+            session.refresh(db_history)
+            
+            return skill_history_from_row(db_history)
         finally:
             session.close()
     
@@ -74,9 +141,9 @@ class SkillTrackingService:
         
         session = self.db.get_session()
         try:
-            topic = session.query(TopicDB).filter(TopicDB.id == topic_id).first()
-            if topic:
-                new_skill = min(100, max(0, topic.skill_level + skill_change))
+            states = load_skill_states(session, self.decay_policy, datetime.now(), [topic_id])
+            if topic_id in states:
+                new_skill = min(100, max(0, states[topic_id].effective_skill + skill_change))
                 self.record_skill_change(topic_id, new_skill, "quiz")
         finally:
             session.close()
@@ -94,110 +161,61 @@ class SkillTrackingService:
             db_histories = query.all()
             
             return [
-                SkillHistory(
-                    id=h.id,
-                    topic_id=h.topic_id,
-                    timestamp=h.timestamp,
-                    previous_skill=h.previous_skill,
-                    new_skill=h.new_skill,
-                    reason=h.reason
-                ) for h in db_histories
+                skill_history_from_row(h) for h in db_histories
             ]
         finally:
             session.close()
     
     def apply_skill_decay(self):
-        from app.storage.database import StudySessionDB
-        
-        session = self.db.get_session()
-        try:
-            topics = session.query(TopicDB).all()
-            cutoff_date = datetime.now() - timedelta(days=self.decay_start_days)
-            
-            for topic in topics:
-                last_session = session.query(StudySessionDB).filter(
-                    StudySessionDB.topic_id == topic.id,
-                    StudySessionDB.end_time.isnot(None)
-                ).order_by(StudySessionDB.end_time.desc()).first()
-                
-                if not last_session or last_session.end_time < cutoff_date:
-                    days_inactive = (datetime.now() - last_session.end_time).days if last_session else 30
-                    decay_days = max(0, days_inactive - self.decay_start_days)
-                    
-                    if decay_days > 0:
-                        decay_amount = min(topic.skill_level * 0.3, decay_days * self.decay_rate_per_day)
-                        new_skill = max(0, topic.skill_level - decay_amount)
-                        
-                        if abs(new_skill - topic.skill_level) > 0.1:
-                            self.record_skill_change(topic.id, new_skill, "decay")
-            
-            session.commit()
-        finally:
-            session.close()
+        self.apply_decay_to_all()
     
     def apply_decay_to_all(self) -> List[Dict]:
-        """Apply skill decay and return results"""
-        from app.storage.database import StudySessionDB
+        """
+        Compaction job: materialize pending decay for all topics in one transaction.
         
+        Readers already see decayed (effective) skills, so this only moves the
+        decay into skill_history and topics.skill_level; running it twice is a no-op.
+        """
         session = self.db.get_session()
-        results = []
         try:
-            topics = session.query(TopicDB).all()
-            cutoff_date = datetime.now() - timedelta(days=self.decay_start_days)
-            
-            for topic in topics:
-                last_session = session.query(StudySessionDB).filter(
-                    StudySessionDB.topic_id == topic.id,
-                    StudySessionDB.end_time.isnot(None)
-                ).order_by(StudySessionDB.end_time.desc()).first()
-                
-                if not last_session or last_session.end_time < cutoff_date:
-                    days_inactive = (datetime.now() - last_session.end_time).days if last_session else 30
-                    decay_days = max(0, days_inactive - self.decay_start_days)
-                    
-                    if decay_days > 0:
-                        decay_amount = min(topic.skill_level * 0.3, decay_days * self.decay_rate_per_day)
-                        new_skill = max(0, topic.skill_level - decay_amount)
-                        
-                        if abs(new_skill - topic.skill_level) > 0.1:
-                            old_skill = topic.skill_level
-                            self.record_skill_change(topic.id, new_skill, "decay", old_skill)
-                            results.append({
-                                "topic_id": topic.id,
-                                "topic_name": topic.name,
-                                "old_skill": old_skill,
-                                "new_skill": new_skill,
-                                "decay_amount": decay_amount
-                            })
-            
+            results = materialize_decay(self.db, session, self.decay_policy)
+            names = dict(session.query(TopicDB.id, TopicDB.name).filter(
+                TopicDB.id.in_([r["topic_id"] for r in results])
+            ).all()) if results else {}
             session.commit()
-            return results
+            
+            return [
+                {
+                    "topic_id": r["topic_id"],
+                    "topic_name": names.get(r["topic_id"]),
+                    "old_skill": r["old_skill"],
+                    "new_skill": r["new_skill"],
+                    "decay_amount": r["decay_amount"]
+                } for r in results
+            ]
         finally:
             session.close()
     
     def get_decay_eligible_topics(self) -> List[Dict]:
         """Get topics eligible for skill decay"""
-        from app.storage.database import StudySessionDB
-        
+        now = datetime.now()
+        cutoff_date = now - timedelta(days=self.decay_start_days)
         session = self.db.get_session()
         try:
-            topics = session.query(TopicDB).all()
-            cutoff_date = datetime.now() - timedelta(days=self.decay_start_days)
+            states = load_skill_states(session, self.decay_policy, now)
+            names = dict(session.query(TopicDB.id, TopicDB.name).all())
             eligible = []
             
-            for topic in topics:
-                last_session = session.query(StudySessionDB).filter(
-                    StudySessionDB.topic_id == topic.id,
-                    StudySessionDB.end_time.isnot(None)
-                ).order_by(StudySessionDB.end_time.desc()).first()
-                
-                days_inactive = (datetime.now() - last_session.end_time).days if last_session else 30
-                
-                if not last_session or last_session.end_time < cutoff_date:
+            for topic_id, state in sorted(states.items()):
+                last_activity = state.last_activity
+                # Topics with no recorded activity do not decay
+                if last_activity and last_activity < cutoff_date:
+                    days_inactive = (now - last_activity).days
                     eligible.append({
-                        "topic_id": topic.id,
-                        "topic_name": topic.name,
-                        "current_skill": topic.skill_level,
+                        "topic_id": topic_id,
+                        "topic_name": names.get(topic_id),
+                        "current_skill": state.stored_skill,
+                        "effective_skill": state.effective_skill,
                         "days_inactive": days_inactive,
                         "eligible_for_decay": days_inactive > self.decay_start_days
                     })
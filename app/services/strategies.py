@@ -0,0 +1,218 @@
+from typing import List, Dict, Tuple, Optional, Callable, Any, NamedTuple
+import atexit
+import itertools
+import multiprocessing
+import pickle
+import queue
+import threading
+import time
+import weakref
+from app.models.models import Topic, Course, TopicPriority
+from app.services.optimization_service import SkillOverlay, allocate_time, estimate_course_scores
+
+
+class StrategyTopic(NamedTuple):
+    """Flat, picklable view of a prioritized topic that strategy sort keys receive."""
+    topic_id: int
+    course_id: int
+    name: str
+    weight: float
+    skill_level: float
+    priority_score: float
+    urgency_factor: float
+    dependents: int
+    blocked: bool
+
+
+class Strategy(NamedTuple):
+    key: str
+    name: str
+    description: str
+    sort_key: Optional[Callable[[StrategyTopic], Any]] = None
+    reverse: bool = False
+
+
+STRATEGIES: Dict[str, Strategy] = {}
+
+
+def register_strategy(key: str, name: str, description: str,
+                      sort_key: Optional[Callable[[StrategyTopic], Any]] = None,
+                      reverse: bool = False) -> Strategy:
+    """
+    Register a study strategy for compare_strategies.
+    
+    `sort_key` reorders the priority list (None keeps priority order). Strategies run in
+    worker processes, so sort keys should be module-level functions; ones that cannot
+    be pickled are evaluated in the calling process instead.
+    """
+    strategy = Strategy(key, name, description, sort_key, reverse)
+    STRATEGIES[key] = strategy
+    return strategy
+
+
+def _high_weight_key(topic: StrategyTopic) -> float:
+    return topic.weight * (100 - topic.skill_level)
+
+
+def _weak_first_key(topic: StrategyTopic) -> float:
+    return topic.skill_level
+
+
+def _dependency_first_key(topic: StrategyTopic) -> Tuple[bool, int]:
+    return not topic.blocked, topic.dependents
+
+
+register_strategy('balanced', 'Balanced Revision',
+                  'Study all topics based on normal priority')
+register_strategy('high_weight_focus', 'High-Weight Focus',
+                  'Prioritize topics with highest weights', _high_weight_key, reverse=True)
+register_strategy('weak_focus', 'Weak Topics Focus',
+                  'Focus on improving weakest topics first', _weak_first_key)
+register_strategy('dependency_first', 'Dependency First',
+                  'Study unblocked prerequisites that unlock the most topics first',
+                  _dependency_first_key, reverse=True)
+
+
+def evaluate_strategy(strategy: Strategy, available_hours: float,
+                      topics: List[Topic], courses: List[Course],
+                      priorities: List[TopicPriority], records: List[StrategyTopic],
+                      dependency_status: Dict[int, Dict]) -> Tuple[Dict, List[Tuple]]:
+    """Allocate time in the strategy's order and estimate the resulting scores."""
+    order = range(len(priorities))
+    if strategy.sort_key is not None:
+        order = sorted(order, key=lambda i: strategy.sort_key(records[i]), reverse=strategy.reverse)
+    
+    allocated, decisions = allocate_time([priorities[i] for i in order], available_hours)
+    overlay = SkillOverlay.from_allocation(allocated)
+    
+    return {
+        'topics_covered': len(allocated),
+        'expected_scores': estimate_course_scores(topics, courses, dependency_status, overlay)
+    }, decisions
+
+
+def picklable(strategy: Strategy) -> bool:
+    """Whether the strategy can be sent to a worker process (e.g. its sort key is not a lambda)."""
+    try:
+        pickle.dumps(strategy)
+    except (pickle.PicklingError, AttributeError, TypeError):
+        return False
+    return True
+
+
+class StrategyPool:
+    """
+    Long-lived worker processes that evaluate strategies for compare_strategies.
+    
+    Started on first use and reused across calls. Each run pickles the snapshot
+    once, and each worker unpickles it once per run. Every strategy gets its own
+    `timeout`, counted from when a worker starts it. A strategy that overruns is
+    reported as None, and once the rest of the run has finished, the pool is
+    terminated (stopping the runaway workers) and restarted on next use.
+    Strategies that no worker has started by the end of the run's budget (worker
+    startup plus `timeout` per wave of strategies) are reported as timed out too,
+    so workers that fail to start cannot stall a run.
+    """
+    
+    POLL_INTERVAL = 0.05
+    STARTUP_GRACE = 60.0
+    _instances: 'weakref.WeakSet[StrategyPool]' = weakref.WeakSet()
+    
+    def __init__(self, processes: int):
+        self.processes = processes
+        self._pool = None
+        self._started = None
+        self._runs = itertools.count()
+        # Runs share the started-queue, so they take turns
+        self._lock = threading.Lock()
+        StrategyPool._instances.add(self)
+    
+    def run(self, strategies: List[Strategy], available_hours: float, snapshot: Tuple,
+            timeout: float) -> Dict[str, Optional[Tuple[Dict, List[Tuple]]]]:
+        """evaluate_strategy for each (picklable) strategy, keyed by strategy key; None marks a timeout."""
+        with self._lock:
+            if self._pool is None:
+                # Not fork: the pool starts lazily inside a threaded server, and a forked
+                # child could inherit locks held by other threads (connection pool, logging)
+                context = multiprocessing.get_context('spawn')
+                self._started = context.Queue()
+                self._pool = context.Pool(self.processes, initializer=_init_worker, initargs=(self._started,))
+            
+            run_id = next(self._runs)
+            payload = pickle.dumps(snapshot, pickle.HIGHEST_PROTOCOL)
+            pending = {
+                strategy.key: self._pool.apply_async(
+                    _evaluate_in_worker, (run_id, payload, strategy, available_hours)
+                ) for strategy in strategies
+            }
+            started: Dict[str, float] = {}
+            waves = -(-len(strategies) // self.processes)
+            run_deadline = time.monotonic() + self.STARTUP_GRACE + timeout * waves
+            outcomes = {}
+            recycle = True
+            try:
+                while pending:
+                    self._collect_started(run_id, started)
+                    now = time.monotonic()
+                    for key, result in list(pending.items()):
+                        if result.ready():
+                            # Errors raised by the strategy propagate
+                            outcomes[key] = result.get()
+                            del pending[key]
+                        elif (now - started[key] >= timeout if key in started else now >= run_deadline):
+                            outcomes[key] = None
+                            del pending[key]
+                    if pending:
+                        next(iter(pending.values())).wait(self.POLL_INTERVAL)
+                recycle = any(outcome is None for outcome in outcomes.values())
+            finally:
+                if recycle:
+                    self._terminate()
+            return outcomes
+    
+    def close(self):
+        with self._lock:
+            self._terminate()
+    
+    def _collect_started(self, run_id: int, started: Dict[str, float]):
+        while True:
+            try:
+                message_run, key = self._started.get_nowait()
+            except queue.Empty:
+                return
+            if message_run == run_id:
+                started.setdefault(key, time.monotonic())
+    
+    def _terminate(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._started.close()
+            self._pool = self._started = None
+    
+    @classmethod
+    def close_all(cls):
+        """Shutdown hook: stop every live pool's workers."""
+        for pool in list(cls._instances):
+            pool.close()
+
+
+atexit.register(StrategyPool.close_all)
+
+
+_worker_started = None
+_worker_snapshot: Tuple[Optional[int], Optional[Tuple]] = (None, None)
+
+
+def _init_worker(started):
+    global _worker_started
+    _worker_started = started
+
+
+def _evaluate_in_worker(run_id: int, payload: bytes, strategy: Strategy,
+                        available_hours: float) -> Tuple[Dict, List[Tuple]]:
+    global _worker_snapshot
+    _worker_started.put((run_id, strategy.key))
+    if _worker_snapshot[0] != run_id:
+        _worker_snapshot = (run_id, pickle.loads(payload))
+    return evaluate_strategy(strategy, available_hours, *_worker_snapshot[1])
@@ -1,7 +1,10 @@
 from typing import List, Optional, Dict
-from datetime import datetime, timedelta
+from datetime import date, datetime
 from app.models.models import StudySession
 from app.storage.database import Database, StudySessionDB
+from app.storage.effective_skill import decay_policy, materialize_decay
+from app.storage.hydration import study_session_from_row
+from app.storage.topic_stats import record_session, get_session_totals, get_daily_minutes, get_study_minutes
 
 
 class StudySessionService:
@@ -21,13 +24,7 @@ class StudySessionService:
             session.commit()
             session.refresh(db_session)
             
-            return StudySession(
-                id=db_session.id,
-                topic_id=db_session.topic_id,
-                start_time=db_session.start_time,
-                end_time=db_session.end_time,
-                duration_minutes=db_session.duration_minutes
-            )
+            return study_session_from_row(db_session)
         finally:
             session.close()
     
@@ -47,19 +44,17 @@ class StudySessionService:
             end_time = datetime.now()
             duration = (end_time - db_session.start_time).total_seconds() / 60
             
+            # Ending a session resets the topic's inactivity, so write out the decay accrued until now
+            materialize_decay(self.db, session, decay_policy(self.db), topic_ids=[db_session.topic_id], now=end_time)
+            
             db_session.end_time = end_time
             db_session.duration_minutes = duration
+            record_session(session, db_session.topic_id, db_session.start_time, end_time, duration)
             
             session.commit()
             session.refresh(db_session)
             
-            return StudySession(
-                id=db_session.id,
-                topic_id=db_session.topic_id,
-                start_time=db_session.start_time,
-                end_time=db_session.end_time,
-                duration_minutes=db_session.duration_minutes
-            )
+            return study_session_from_row(db_session)
         finally:
             session.close()
     
@@ -78,13 +73,7 @@ class StudySessionService:
             if not db_session:
                 return None
             
-            return StudySession(
-                id=db_session.id,
-                topic_id=db_session.topic_id,
-                start_time=db_session.start_time,
-                end_time=db_session.end_time,
-                duration_minutes=db_session.duration_minutes
-            )
+            return study_session_from_row(db_session)
         finally:
             session.close()
     
@@ -97,59 +86,32 @@ class StudySessionService:
             ).order_by(StudySessionDB.start_time.desc()).all()
             
             return [
-                StudySession(
-                    id=s.id,
-                    topic_id=s.topic_id,
-                    start_time=s.start_time,
-                    end_time=s.end_time,
-                    duration_minutes=s.duration_minutes
-                ) for s in db_sessions
+                study_session_from_row(s) for s in db_sessions
             ]
         finally:
             session.close()
     
     def get_daily_time_breakdown(self, days: int = 7) -> Dict[str, Dict[int, float]]:
+        """Minutes per day and topic over the last `days` calendar days (including today)."""
         session = self.db.get_session()
         try:
-            start_date = datetime.now() - timedelta(days=days)
-            
-            db_sessions = session.query(StudySessionDB).filter(
-                StudySessionDB.start_time >= start_date,
-                StudySessionDB.end_time.isnot(None)
-            ).all()
-            
-            breakdown = {}
-            
-            for db_session in db_sessions:
-                date_key = db_session.start_time.strftime('%Y-%m-%d')
-                if date_key not in breakdown:
-                    breakdown[date_key] = {}
-                
-                topic_id = db_session.topic_id
-                if topic_id not in breakdown[date_key]:
-                    breakdown[date_key][topic_id] = 0
-                
-                breakdown[date_key][topic_id] += db_session.duration_minutes
-            
-            return breakdown
+            return get_daily_minutes(session, days)
+        finally:
+            session.close()
+    
+    def get_study_time_series(self, start: date, end: date, granularity: str = 'day',
+                              topic_ids: Optional[List[int]] = None) -> Dict[str, float]:
+        """Minutes per day, week or month over [start, end] (see topic_stats.get_study_minutes)."""
+        session = self.db.get_session()
+        try:
+            return get_study_minutes(session, start, end, granularity, topic_ids)
         finally:
             session.close()
     
     def get_total_time_per_topic(self) -> Dict[int, float]:
         session = self.db.get_session()
         try:
-            db_sessions = session.query(StudySessionDB).filter(
-                StudySessionDB.end_time.isnot(None)
-            ).all()
-            
-            totals = {}
-            for db_session in db_sessions:
-                topic_id = db_session.topic_id
-                if topic_id not in totals:
-                    totals[topic_id] = 0
-                totals[topic_id] += db_session.duration_minutes
-            
-            return totals
+            return {topic_id: minutes for topic_id, (minutes, _) in get_session_totals(session).items()}
         finally:
             session.close()
     
@@ -162,13 +124,7 @@ class StudySessionService:
             ).order_by(StudySessionDB.start_time.desc()).limit(limit).all()
             
             return [
-                StudySession(
-                    id=s.id,
-                    topic_id=s.topic_id,
-                    start_time=s.start_time,
-                    end_time=s.end_time,
-                    duration_minutes=s.duration_minutes
-                ) for s in db_sessions
+                study_session_from_row(s) for s in db_sessions
             ]
         finally:
             session.close()
@@ -181,26 +137,17 @@ class StudySessionService:
         """Get overall study statistics"""
         session = self.db.get_session()
         try:
-            # Total sessions
-            total_sessions = session.query(StudySessionDB).filter(
-                StudySessionDB.end_time.isnot(None)
-            ).count()
+            # Two aggregate reads of the rollup tables, independent of the number of sessions
+            totals = get_session_totals(session)
+            daily_breakdown = get_daily_minutes(session, 7)
             
-            # Total study time
-            db_sessions = session.query(StudySessionDB).filter(
-                StudySessionDB.end_time.isnot(None)
-            ).all()
-            
-            total_minutes = sum(s.duration_minutes for s in db_sessions if s.duration_minutes)
+            total_sessions = sum(count for _, count in totals.values())
+            total_minutes = sum(minutes for minutes, _ in totals.values())
             
-            # Last 7 days
-            seven_days_ago = datetime.now() - timedelta(days=7)
-            recent_sessions = session.query(StudySessionDB).filter(
-                StudySessionDB.end_time.isnot(None),
-                StudySessionDB.start_time >= seven_days_ago
-            ).all()
-            
-            last_7_days_minutes = sum(s.duration_minutes for s in recent_sessions if s.duration_minutes)
+            # Last 7 days (calendar days, including today)
+            last_7_days_minutes = sum(
+                minutes for by_topic in daily_breakdown.values() for minutes in by_topic.values()
+            )
             
             # Average session duration
             avg_duration = total_minutes / total_sessions if total_sessions > 0 else 0
@@ -210,8 +157,8 @@ class StudySessionService:
                 "total_hours": total_minutes / 60,
                 "last_7_days_hours": last_7_days_minutes / 60,
                 "average_session_minutes": avg_duration,
-                "daily_breakdown": self.get_daily_time_breakdown(7),
-                "topic_totals": self.get_total_time_per_topic()
+                "daily_breakdown": daily_breakdown,
+                "topic_totals": {topic_id: minutes for topic_id, (minutes, _) in totals.items()}
             }
         finally:
             session.close()
@@ -0,0 +1,39 @@
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from app.storage.database import Database
+from app.storage.sqlite_profiles import pool_options
+
+
+class AsyncDatabase:
+    """
+    asyncio counterpart of Database (SQLAlchemy asyncio on aiosqlite) for the API's I/O-bound routes.
+    
+    It opens the same SQLite file as `db`, which owns schema creation and migrations,
+    and commits publish their row changes to `db`'s change listeners, so caches stay
+    current whichever engine wrote. Requires a file database: an in-memory database
+    is private to the connection that created it.
+    """
+    
+    def __init__(self, db: Database):
+        url = db.engine.url
+        if url.database in (None, '', ':memory:'):
+            raise ValueError("AsyncDatabase needs a file database, not an in-memory one")
+        self.db = db
+        self.engine = create_async_engine(
+            url.set(drivername='sqlite+aiosqlite'), **pool_options(url.database, db.profile)
+        )
+        event.listen(self.engine.sync_engine, 'connect', lambda connection, _record: db.profile.apply(connection))
+        
+        # A Session subclass per instance, so the commit hooks only see this engine's sessions
+        sync_session_class = type('AsyncDatabaseSession', (Session,), {})
+        db.track_changes(sync_session_class)
+        self.SessionLocal = async_sessionmaker(
+            self.engine, sync_session_class=sync_session_class, expire_on_commit=False
+        )
+    
+    def get_session(self) -> AsyncSession:
+        return self.SessionLocal()
+    
+    async def dispose(self):
+        await self.engine.dispose()
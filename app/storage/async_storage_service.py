@@ -0,0 +1,83 @@
+from typing import List, Optional
+from sqlalchemy import select
+from app.storage.database import CourseDB, TopicDB
+from app.storage.async_database import AsyncDatabase
+from app.storage.hydration import COURSE_COLUMNS, TOPIC_COLUMNS, course_from_row, topic_from_row
+from app.models.models import Course, Topic
+
+
+class AsyncStorageService:
+    """Async versions of StorageService's course and topic reads and writes."""
+    
+    def __init__(self, db: AsyncDatabase):
+        self.db = db
+    
+    async def create_course(self, course: Course) -> Course:
+        async with self.db.get_session() as session:
+            db_course = CourseDB(
+                name=course.name,
+                exam_date=course.exam_date
+            )
+            session.add(db_course)
+            await session.commit()
+            course.id = db_course.id
+            return course
+    
+    async def get_course(self, course_id: int) -> Optional[Course]:
+        async with self.db.get_session() as session:
+            db_course = await session.get(CourseDB, course_id)
+            if db_course:
+                return course_from_row(db_course)
+            return None
+    
+    async def get_all_courses(self) -> List[Course]:
+        async with self.db.get_session() as session:
+            rows = await session.execute(select(*COURSE_COLUMNS))
+            return [course_from_row(row) for row in rows]
+    
+    async def create_topic(self, topic: Topic) -> Topic:
+        async with self.db.get_session() as session:
+            db_topic = TopicDB(
+                course_id=topic.course_id,
+                name=topic.name,
+                weight=topic.weight,
+                skill_level=topic.skill_level
+            )
+            session.add(db_topic)
+            await session.commit()
+            topic.id = db_topic.id
+            return topic
+    
+    async def get_topic(self, topic_id: int) -> Optional[Topic]:
+        async with self.db.get_session() as session:
+            db_topic = await session.get(TopicDB, topic_id)
+            if db_topic:
+                return topic_from_row(db_topic)
+            return None
+    
+    async def get_topics_by_course(self, course_id: int) -> List[Topic]:
+        async with self.db.get_session() as session:
+            rows = await session.execute(select(*TOPIC_COLUMNS).where(TopicDB.course_id == course_id))
+            return [topic_from_row(row) for row in rows]
+    
+    async def update_course(self, course: Course) -> Course:
+        async with self.db.get_session() as session:
+            db_course = await session.get(CourseDB, course.id)
+            if db_course:
+                db_course.name = course.name
+                db_course.exam_date = course.exam_date
+                await session.commit()
+                return course_from_row(db_course)
+            raise ValueError("Course not found")
+    
+    async def update_topic(self, topic: Topic) -> Topic:
+        async with self.db.get_session() as session:
+            db_topic = await session.get(TopicDB, topic.id)
+            if db_topic:
+                db_topic.course_id = topic.course_id
+                db_topic.name = topic.name
+                db_topic.weight = topic.weight
+                db_topic.skill_level = topic.skill_level
+                await session.commit()
+                return topic_from_row(db_topic)
+            raise ValueError("Topic not found")
@@ -1,7 +1,15 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey, Text
-from sqlalchemy.orm import sessionmaker, relationship, declarative_base
+from collections import namedtuple
+from typing import Any, Callable, Dict, List, TypeVar, Union
+import threading
+import weakref
+from sqlalchemy import create_engine, event, inspect, Column, Integer, String, Float, Date, DateTime, ForeignKey, Text, Index
+from sqlalchemy.orm import sessionmaker, relationship, declarative_base, object_session
+from app.storage.migrations import run_migrations
+from app.storage.sqlite_profiles import SQLiteProfile, get_profile, pool_options
+from app.storage.unit_of_work import current_unit_of_work
 
 Base = declarative_base()
+T = TypeVar('T')
 
 
 class CourseDB(Base):
@@ -16,6 +24,9 @@ class CourseDB(Base):
 
 class TopicDB(Base):
     __tablename__ = 'topics'
+    __table_args__ = (
+        Index('ix_topics_course_id', 'course_id'),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     course_id = Column(Integer, ForeignKey('courses.id'), nullable=False)
@@ -27,10 +38,15 @@ class TopicDB(Base):
     skill_history = relationship("SkillHistoryDB", back_populates="topic", cascade="all, delete-orphan")
     study_sessions = relationship("StudySessionDB", back_populates="topic", cascade="all, delete-orphan")
     quizzes = relationship("QuizDB", back_populates="topic", cascade="all, delete-orphan")
+    stats = relationship("TopicStatsDB", uselist=False, cascade="all, delete-orphan")
+    daily_stats = relationship("TopicDailyStatsDB", cascade="all, delete-orphan")
 
 
 class SkillHistoryDB(Base):
     __tablename__ = 'skill_history'
+    __table_args__ = (
+        Index('ix_skill_history_topic_id_timestamp', 'topic_id', 'timestamp'),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     topic_id = Column(Integer, ForeignKey('topics.id'), nullable=False)
@@ -44,6 +60,11 @@ class SkillHistoryDB(Base):
 
 class StudySessionDB(Base):
     __tablename__ = 'study_sessions'
+    __table_args__ = (
+        Index('ix_study_sessions_topic_id_end_time', 'topic_id', 'end_time'),
+        Index('ix_study_sessions_topic_id_start_time', 'topic_id', 'start_time'),
+        Index('ix_study_sessions_end_time', 'end_time'),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     topic_id = Column(Integer, ForeignKey('topics.id'), nullable=False)
@@ -56,6 +77,9 @@ class StudySessionDB(Base):
 
 class QuizDB(Base):
     __tablename__ = 'quizzes'
+    __table_args__ = (
+        Index('ix_quizzes_topic_id', 'topic_id'),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     topic_id = Column(Integer, ForeignKey('topics.id'), nullable=False)
@@ -84,6 +108,9 @@ class QuizQuestionDB(Base):
 
 class QuizAttemptDB(Base):
     __tablename__ = 'quiz_attempts'
+    __table_args__ = (
+        Index('ix_quiz_attempts_quiz_id_attempted_at', 'quiz_id', 'attempted_at'),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     quiz_id = Column(Integer, ForeignKey('quizzes.id'), nullable=False)
@@ -96,6 +123,10 @@ class QuizAttemptDB(Base):
 
 class TopicDependencyDB(Base):
     __tablename__ = 'topic_dependencies'
+    __table_args__ = (
+        Index('ix_topic_dependencies_prerequisite_topic_id', 'prerequisite_topic_id'),
+        Index('ix_topic_dependencies_dependent_topic_id', 'dependent_topic_id'),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     prerequisite_topic_id = Column(Integer, ForeignKey('topics.id'), nullable=False)
@@ -103,8 +134,46 @@ class TopicDependencyDB(Base):
     min_skill_threshold = Column(Float, default=70.0)
 
 
+class TopicStatsDB(Base):
+    """Per-topic rollup of sessions, quiz attempts and skill changes, maintained on write."""
+    __tablename__ = 'topic_stats'
+    
+    topic_id = Column(Integer, ForeignKey('topics.id'), primary_key=True)
+    total_minutes = Column(Float, nullable=False, default=0.0)
+    session_count = Column(Integer, nullable=False, default=0)
+    last_session_end = Column(DateTime, nullable=True)
+    quiz_attempt_count = Column(Integer, nullable=False, default=0)
+    quiz_score_sum = Column(Float, nullable=False, default=0.0)
+    last_quiz_at = Column(DateTime, nullable=True)
+    last_quiz_score = Column(Float, nullable=True)
+    skill_change_count = Column(Integer, nullable=False, default=0)
+    # Excludes decay, which is not activity
+    last_skill_change_at = Column(DateTime, nullable=True)
+
+
+class TopicDailyStatsDB(Base):
+    """Per-topic, per-day rollup used for windowed aggregates (last 7/14/30 days)."""
+    __tablename__ = 'topic_daily_stats'
+    __table_args__ = (
+        Index('ix_topic_daily_stats_day', 'day'),
+    )
+    
+    topic_id = Column(Integer, ForeignKey('topics.id'), primary_key=True)
+    day = Column(Date, primary_key=True)
+    minutes = Column(Float, nullable=False, default=0.0)
+    session_count = Column(Integer, nullable=False, default=0)
+    quiz_attempt_count = Column(Integer, nullable=False, default=0)
+    quiz_score_sum = Column(Float, nullable=False, default=0.0)
+    skill_delta = Column(Float, nullable=False, default=0.0)
+
+
 class DecisionLogDB(Base):
     __tablename__ = 'decision_logs'
+    __table_args__ = (
+        Index('ix_decision_logs_decision_type_timestamp', 'decision_type', 'timestamp'),
+        Index('ix_decision_logs_topic_id_timestamp', 'topic_id', 'timestamp'),
+        Index('ix_decision_logs_timestamp', 'timestamp'),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     timestamp = Column(DateTime, nullable=False)
@@ -114,11 +183,105 @@ class DecisionLogDB(Base):
     meta_data = Column(Text, nullable=True)
 
 
+# A committed row change: op is 'insert', 'update' or 'delete', values holds the
+# row's loaded column values keyed by column name.
+RowChange = namedtuple('RowChange', ['op', 'table', 'values'])
+
+_PENDING_CHANGES_KEY = 'pending_row_changes'
+
+
+def _record_row_change(op: str):
+    def listener(mapper, connection, target):
+        session = object_session(target)
+        if session is None:
+            return
+        state = inspect(target)
+        values = {
+            column.key: state.dict[column.key]
+            for column in mapper.column_attrs if column.key in state.dict
+        }
+        session.info.setdefault(_PENDING_CHANGES_KEY, []).append(
+            RowChange(op, mapper.local_table.name, values)
+        )
+    return listener
+
+
+event.listen(Base, 'after_insert', _record_row_change('insert'), propagate=True)
+event.listen(Base, 'after_update', _record_row_change('update'), propagate=True)
+event.listen(Base, 'after_delete', _record_row_change('delete'), propagate=True)
+
+
 class Database:
-    def __init__(self, db_path: str = "study_planner.db"):
-        self.engine = create_engine(f'sqlite:///{db_path}')
+    def __init__(self, db_path: str = "study_planner.db", profile: Union[SQLiteProfile, str, None] = None):
+        self.profile = get_profile(profile)
+        self.engine = create_engine(f'sqlite:///{db_path}', **pool_options(db_path, self.profile))
+        event.listen(self.engine, 'connect', lambda connection, _record: self.profile.apply(connection))
         Base.metadata.create_all(self.engine)
+        run_migrations(self.engine, Base.metadata)
         self.SessionLocal = sessionmaker(bind=self.engine)
+        self._change_listeners: List[Callable[[List[RowChange]], None]] = []
+        self.track_changes(self.SessionLocal)
+        self._shared: Dict[Callable, Any] = {}
+        self._shared_lock = threading.RLock()
+    
+    def shared(self, factory: Callable[['Database'], T]) -> T:
+        """
+        The single `factory(self)` instance of this database (e.g. CourseVersions.for_database).
+        
+        Held by the database itself rather than a process-level map, so caches that
+        reference their database are collected together with it.
+        """
+        with self._shared_lock:
+            instance = self._shared.get(factory)
+            if instance is None:
+                instance = self._shared[factory] = factory(self)
+            return instance
     
     def get_session(self):
+        """A new session, or the shared session of the enclosing unit_of_work (whose commit() only flushes)."""
+        work = current_unit_of_work(self)
+        if work is not None:
+            return work.session()
         return self.SessionLocal()
+    
+    def add_change_listener(self, listener: Callable[[List[RowChange]], None]):
+        """Register a callback that receives the row changes of every committed session."""
+        self._change_listeners.append(listener)
+    
+    def track_changes(self, target):
+        """Publish the row changes of sessions made by `target` (a sessionmaker or Session subclass) on commit."""
+        # SQLAlchemy keeps session-class listeners in a process-level map; weak methods
+        # let the database be collected
+        event.listen(target, 'after_commit', _weak_listener(self._publish_changes))
+        event.listen(target, 'after_rollback', _weak_listener(self._discard_changes))
+    
+    def record_changes(self, session, changes: List[RowChange]):
+        """Queue changes made outside the ORM unit of work (bulk/core statements) for publishing on commit."""
+        session.info.setdefault(_PENDING_CHANGES_KEY, []).extend(changes)
+    
+    def take_changes(self, session) -> List[RowChange]:
+        """Remove and return the row changes `session` has recorded so far."""
+        return session.info.pop(_PENDING_CHANGES_KEY, None) or []
+    
+    def publish_changes(self, changes: List[RowChange]):
+        for listener in self._change_listeners:
+            listener(changes)
+    
+    def _publish_changes(self, session):
+        changes = self.take_changes(session)
+        if changes:
+            self.publish_changes(changes)
+    
+    def _discard_changes(self, session):
+        self.take_changes(session)
+
+
+def _weak_listener(method: Callable) -> Callable:
+    """Call the bound `method` while its instance is alive, without keeping it alive."""
+    reference = weakref.WeakMethod(method)
+    
+    def listener(*args):
+        target = reference()
+        if target is not None:
+            target(*args)
+    return listener
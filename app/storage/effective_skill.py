@@ -0,0 +1,292 @@
+from typing import Dict, Iterable, List, Optional, NamedTuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+import weakref
+from sqlalchemy import func, insert, update, or_
+from app.storage.database import Database, TopicDB, SkillHistoryDB, StudySessionDB, QuizDB, QuizAttemptDB, RowChange
+from app.storage.topic_stats import record_skill_changes
+
+
+class DecayPolicy(NamedTuple):
+    """
+    Inactivity decay: nothing for `start_days`, then `rate_per_day`, capped at `max_fraction` of the skill.
+    
+    Topics with no recorded activity (never studied, quizzed or assessed) do not
+    decay: there is no point to measure inactivity from.
+    """
+    start_days: int = 7
+    rate_per_day: float = 0.5
+    max_fraction: float = 0.3
+    
+    def amount(self, skill_level: float, last_activity: Optional[datetime], now: datetime) -> float:
+        if last_activity is None or last_activity >= now - timedelta(days=self.start_days):
+            return 0
+        
+        decay_days = (now - last_activity).days - self.start_days
+        if decay_days <= 0:
+            return 0
+        
+        return min(skill_level * self.max_fraction, decay_days * self.rate_per_day)
+
+
+_policies: 'weakref.WeakKeyDictionary[Database, DecayPolicy]' = weakref.WeakKeyDictionary()
+
+
+def decay_policy(db: Database) -> DecayPolicy:
+    """The decay policy every reader and writer of `db` applies (SkillTrackingService configures it)."""
+    return _policies.get(db, DecayPolicy())
+
+
+def set_decay_policy(db: Database, policy: DecayPolicy):
+    _policies[db] = policy
+
+
+class SkillState(NamedTuple):
+    """
+    Stored vs effective skill of a topic.
+    
+    `base_skill` is the skill at `last_activity` (stored skill plus any decay that
+    was materialized since), so materializing decay never changes the effective skill.
+    """
+    topic_id: int
+    stored_skill: float
+    base_skill: float
+    last_activity: Optional[datetime]
+    effective_skill: float
+    
+    @property
+    def pending_decay(self) -> float:
+        return self.stored_skill - self.effective_skill
+
+
+def load_skill_states(session, policy: DecayPolicy, now: datetime,
+                      topic_ids: Optional[Iterable[int]] = None) -> Dict[int, SkillState]:
+    """
+    Effective skills in one statement.
+    
+    Last activity is the latest of the last completed study session, quiz attempt and
+    non-decay skill change; decay rows written after it are added back to get the
+    base skill.
+    """
+    topic_ids = list(topic_ids) if topic_ids is not None else None
+    
+    last_session = session.query(
+        StudySessionDB.topic_id.label('topic_id'),
+        func.max(StudySessionDB.end_time).label('last_end')
+    ).filter(StudySessionDB.end_time.isnot(None))
+    last_change = session.query(
+        SkillHistoryDB.topic_id.label('topic_id'),
+        func.max(SkillHistoryDB.timestamp).label('last_change')
+    ).filter(SkillHistoryDB.reason != 'decay')
+    last_quiz = session.query(
+        QuizDB.topic_id.label('topic_id'),
+        func.max(QuizAttemptDB.attempted_at).label('last_quiz')
+    ).join(QuizAttemptDB, QuizAttemptDB.quiz_id == QuizDB.id)
+    topics = session.query(TopicDB.id, TopicDB.skill_level)
+    
+    if topic_ids is not None:
+        last_session = last_session.filter(StudySessionDB.topic_id.in_(topic_ids))
+        last_change = last_change.filter(SkillHistoryDB.topic_id.in_(topic_ids))
+        last_quiz = last_quiz.filter(QuizDB.topic_id.in_(topic_ids))
+        topics = topics.filter(TopicDB.id.in_(topic_ids))
+    
+    last_session = last_session.group_by(StudySessionDB.topic_id).subquery('last_session')
+    last_change = last_change.group_by(SkillHistoryDB.topic_id).subquery('last_change')
+    last_quiz = last_quiz.group_by(QuizDB.topic_id).subquery('last_quiz')
+    
+    decayed = session.query(
+        SkillHistoryDB.topic_id.label('topic_id'),
+        func.sum(SkillHistoryDB.previous_skill - SkillHistoryDB.new_skill).label('decayed')
+    ).outerjoin(
+        last_session, last_session.c.topic_id == SkillHistoryDB.topic_id
+    ).outerjoin(
+        last_change, last_change.c.topic_id == SkillHistoryDB.topic_id
+    ).outerjoin(
+        last_quiz, last_quiz.c.topic_id == SkillHistoryDB.topic_id
+    ).filter(
+        SkillHistoryDB.reason == 'decay',
+        or_(last_session.c.last_end.is_(None), SkillHistoryDB.timestamp > last_session.c.last_end),
+        or_(last_change.c.last_change.is_(None), SkillHistoryDB.timestamp > last_change.c.last_change),
+        or_(last_quiz.c.last_quiz.is_(None), SkillHistoryDB.timestamp > last_quiz.c.last_quiz)
+    ).group_by(SkillHistoryDB.topic_id).subquery('decayed')
+    
+    rows = topics.add_columns(
+        last_session.c.last_end, last_change.c.last_change, last_quiz.c.last_quiz, decayed.c.decayed
+    ).outerjoin(
+        last_session, last_session.c.topic_id == TopicDB.id
+    ).outerjoin(
+        last_change, last_change.c.topic_id == TopicDB.id
+    ).outerjoin(
+        last_quiz, last_quiz.c.topic_id == TopicDB.id
+    ).outerjoin(
+        decayed, decayed.c.topic_id == TopicDB.id
+    ).all()
+    
+    states = {}
+    for topic_id, stored, last_end, last_changed, last_quizzed, decayed_amount in rows:
+        anchors = [t for t in (last_end, last_changed, last_quizzed) if t is not None]
+        last_activity = max(anchors) if anchors else None
+        base = stored + (decayed_amount or 0)
+        effective = base - policy.amount(base, last_activity, now)
+        states[topic_id] = SkillState(
+            topic_id, stored, base, last_activity, max(0, min(stored, effective))
+        )
+    return states
+
+
+def materialize_decay(db: Database, session, policy: Optional[DecayPolicy] = None,
+                      topic_ids: Optional[Iterable[int]] = None,
+                      now: Optional[datetime] = None, threshold: float = 0.1) -> List[Dict]:
+    """
+    Write pending decay as 'decay' skill_history rows and topic updates in `session`.
+    
+    The caller commits. Returns one result per topic whose skill dropped by more
+    than `threshold`. `policy` defaults to the database's decay policy.
+    """
+    policy = policy or decay_policy(db)
+    now = now or datetime.now()
+    states = load_skill_states(session, policy, now, topic_ids)
+    
+    results = []
+    history_rows = []
+    topic_updates = []
+    changes = []
+    for state in states.values():
+        if state.pending_decay <= threshold:
+            continue
+        
+        history = {
+            "topic_id": state.topic_id,
+            "timestamp": now,
+            "previous_skill": state.stored_skill,
+            "new_skill": state.effective_skill,
+            "reason": "decay"
+        }
+        history_rows.append(history)
+        topic_update = {"id": state.topic_id, "skill_level": state.effective_skill}
+        topic_updates.append(topic_update)
+        changes.append(RowChange('insert', SkillHistoryDB.__tablename__, history))
+        changes.append(RowChange('update', TopicDB.__tablename__, topic_update))
+        results.append({
+            "topic_id": state.topic_id,
+            "old_skill": state.stored_skill,
+            "new_skill": state.effective_skill,
+            "decay_amount": state.pending_decay
+        })
+    
+    if results:
+        session.execute(insert(SkillHistoryDB), history_rows)
+        session.execute(update(TopicDB), topic_updates)
+        record_skill_changes(session, history_rows)
+        db.record_changes(session, changes)
+    
+    return results
+
+
+class EffectiveSkillResolver:
+    """Effective skills memoized for one request or unit of work."""
+    
+    def __init__(self, db: Database, policy: Optional[DecayPolicy] = None, now: Optional[datetime] = None):
+        self.db = db
+        self.policy = policy or decay_policy(db)
+        self.now = now or datetime.now()
+        self._states: Dict[int, SkillState] = {}
+        self._complete = False
+    
+    def state(self, topic_id: int) -> Optional[SkillState]:
+        if topic_id not in self._states and not self._complete:
+            self._load([topic_id])
+        return self._states.get(topic_id)
+    
+    def get(self, topic_id: int, default: Optional[float] = None) -> Optional[float]:
+        state = self.state(topic_id)
+        return state.effective_skill if state else default
+    
+    def get_many(self, topic_ids: Optional[Iterable[int]] = None) -> Dict[int, float]:
+        """Effective skill per topic id (all topics when None), loading only what is missing."""
+        if topic_ids is None:
+            if not self._complete:
+                self._load(None)
+                self._complete = True
+            return {topic_id: state.effective_skill for topic_id, state in self._states.items()}
+        
+        topic_ids = list(topic_ids)
+        missing = [t for t in topic_ids if t not in self._states]
+        if missing and not self._complete:
+            self._load(missing)
+        return {t: self._states[t].effective_skill for t in topic_ids if t in self._states}
+    
+    def invalidate(self, topic_ids: Optional[Iterable[int]] = None):
+        if topic_ids is None:
+            self._states.clear()
+        else:
+            for topic_id in topic_ids:
+                self._states.pop(topic_id, None)
+        self._complete = False
+    
+    def _load(self, topic_ids: Optional[List[int]]):
+        session = self.db.get_session()
+        try:
+            self._states.update(load_skill_states(session, self.policy, self.now, topic_ids))
+        finally:
+            session.close()
+
+
+_current_resolver: ContextVar[Optional[EffectiveSkillResolver]] = ContextVar('effective_skill_resolver', default=None)
+_listening = weakref.WeakSet()
+
+
+def effective_skills(db: Database, policy: Optional[DecayPolicy] = None) -> EffectiveSkillResolver:
+    """
+    The resolver of the enclosing effective_skill_scope, or a fresh one outside of a
+    scope (or when the scope applies another policy). `policy` defaults to the
+    database's decay policy.
+    """
+    policy = policy or decay_policy(db)
+    resolver = _current_resolver.get()
+    if resolver is not None and resolver.db is db and resolver.policy == policy:
+        return resolver
+    return EffectiveSkillResolver(db, policy)
+
+
+@contextmanager
+def effective_skill_scope(db: Database, policy: Optional[DecayPolicy] = None):
+    """Share one memoized resolver (e.g. per API request); writes invalidate the touched topics."""
+    policy = policy or decay_policy(db)
+    current = _current_resolver.get()
+    if current is not None and current.db is db and current.policy == policy:
+        yield current
+        return
+    
+    if db not in _listening:
+        db.add_change_listener(_invalidate_current)
+        _listening.add(db)
+    
+    resolver = EffectiveSkillResolver(db, policy)
+    token = _current_resolver.set(resolver)
+    try:
+        yield resolver
+    finally:
+        _current_resolver.reset(token)
+
+
+def _invalidate_current(changes: List[RowChange]):
+    resolver = _current_resolver.get()
+    if resolver is None:
+        return
+    
+    topic_ids = set()
+    for change in changes:
+        if change.table == TopicDB.__tablename__:
+            topic_ids.add(change.values.get('id'))
+        elif change.table in (SkillHistoryDB.__tablename__, StudySessionDB.__tablename__):
+            topic_ids.add(change.values.get('topic_id'))
+        elif change.table == QuizAttemptDB.__tablename__:
+            # Attempts reference quizzes, not topics
+            topic_ids.add(None)
+    
+    if None in topic_ids:
+        resolver.invalidate()
+    elif topic_ids:
+        resolver.invalidate(topic_ids)
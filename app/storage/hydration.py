@@ -0,0 +1,92 @@
+"""
+Trusted hydration: build API models from database rows without running validators.
+
+Rows written by this application were validated on the way in, so reads build
+models with ``model_construct``. Stored data then loads even when a validator
+depends on the clock (a course whose exam date has passed is still a valid row).
+``model_construct`` is not cheaper per row than validating; the list reads gain
+from selecting columns instead of ORM entities. Validation stays where input
+arrives: the API request models and the service write paths.
+
+Each function accepts an ORM instance or a column-level ``Row`` with the same
+attribute names.
+"""
+
+from app.models.models import (
+    Course, Topic, SkillHistory, StudySession, QuizQuestion, Quiz, QuizAttempt
+)
+from app.storage.database import CourseDB, TopicDB
+
+# Column-level selects for list reads: Row tuples skip the ORM identity map
+COURSE_COLUMNS = (CourseDB.id, CourseDB.name, CourseDB.exam_date)
+TOPIC_COLUMNS = (TopicDB.id, TopicDB.course_id, TopicDB.name, TopicDB.weight, TopicDB.skill_level)
+
+
+def course_from_row(row) -> Course:
+    return Course.model_construct(id=row.id, name=row.name, exam_date=row.exam_date)
+
+
+def topic_from_row(row, skill_level=None) -> Topic:
+    """`skill_level` overrides the stored value (e.g. with the effective, decayed skill)."""
+    return Topic.model_construct(
+        id=row.id,
+        course_id=row.course_id,
+        name=row.name,
+        weight=row.weight,
+        skill_level=row.skill_level if skill_level is None else skill_level
+    )
+
+
+def skill_history_from_row(row) -> SkillHistory:
+    return SkillHistory.model_construct(
+        id=row.id,
+        topic_id=row.topic_id,
+        timestamp=row.timestamp,
+        previous_skill=row.previous_skill,
+        new_skill=row.new_skill,
+        reason=row.reason
+    )
+
+
+def study_session_from_row(row) -> StudySession:
+    return StudySession.model_construct(
+        id=row.id,
+        topic_id=row.topic_id,
+        start_time=row.start_time,
+        end_time=row.end_time,
+        duration_minutes=row.duration_minutes
+    )
+
+
+def quiz_question_from_row(row) -> QuizQuestion:
+    return QuizQuestion.model_construct(
+        id=row.id,
+        quiz_id=row.quiz_id,
+        question_text=row.question_text,
+        option_a=row.option_a,
+        option_b=row.option_b,
+        option_c=row.option_c,
+        option_d=row.option_d,
+        correct_answer=row.correct_answer
+    )
+
+
+def quiz_from_row(row) -> Quiz:
+    """Hydrates the quiz and its `questions` relationship."""
+    return Quiz.model_construct(
+        id=row.id,
+        topic_id=row.topic_id,
+        title=row.title,
+        created_at=row.created_at,
+        questions=[quiz_question_from_row(question) for question in row.questions]
+    )
+
+
+def quiz_attempt_from_row(row) -> QuizAttempt:
+    return QuizAttempt.model_construct(
+        id=row.id,
+        quiz_id=row.quiz_id,
+        attempted_at=row.attempted_at,
+        score=row.score,
+        total_questions=row.total_questions
+    )
@@ -0,0 +1,71 @@
+"""
+Versioned schema migrations for existing SQLite databases.
+
+``Base.metadata.create_all`` only creates missing tables, so anything added to
+a table that already exists (indexes, new columns, backfills) has to be applied
+here. The schema version is stored in SQLite's ``PRAGMA user_version``.
+
+To add a migration, append a ``(version, description, function)`` entry to
+``MIGRATIONS``. Each function receives an open connection inside a transaction
+plus the ORM metadata, and must be safe to run on a freshly created database.
+"""
+
+from typing import Callable, List, Tuple
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import MetaData
+
+
+def _create_missing_indexes(conn: Connection, metadata: MetaData):
+    """Create every index declared on the ORM tables that does not exist yet."""
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+def _add_secondary_indexes(conn: Connection, metadata: MetaData):
+    """v1: foreign-key and timestamp indexes for the planner's hot queries."""
+    _create_missing_indexes(conn, metadata)
+    conn.execute(text("ANALYZE"))
+
+
+def _backfill_topic_stats(conn: Connection, metadata: MetaData):
+    """v2: fill the topic_stats / topic_daily_stats rollups from existing rows."""
+    # Imported here because topic_stats imports the ORM models, which import this module
+    from app.storage.topic_stats import rebuild
+    rebuild(conn)
+
+
+def _split_daily_minutes(conn: Connection, metadata: MetaData):
+    """v3: rebuild the rollups so sessions that cross midnight are split across days."""
+    from app.storage.topic_stats import rebuild
+    rebuild(conn)
+
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection, MetaData], None]]] = [
+    (1, "add secondary indexes", _add_secondary_indexes),
+    (2, "backfill topic rollup tables", _backfill_topic_stats),
+    (3, "split daily study minutes at midnight", _split_daily_minutes),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn: Connection) -> int:
+    return conn.execute(text("PRAGMA user_version")).scalar() or 0
+
+
+def run_migrations(engine: Engine, metadata: MetaData) -> int:
+    """Upgrade the database to the latest schema version. Returns the new version."""
+    with engine.begin() as conn:
+        current = get_schema_version(conn)
+        
+        for version, _description, migrate in MIGRATIONS:
+            if version <= current:
+                continue
+            migrate(conn, metadata)
+            # PRAGMA does not accept bound parameters
+            conn.execute(text(f"PRAGMA user_version = {int(version)}"))
+            current = version
+        
+        return current
@@ -0,0 +1,136 @@
+from typing import List, Dict, Optional, Iterator, Tuple
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import func
+from app.storage.database import Database, CourseDB, TopicDB, SkillHistoryDB, StudySessionDB, TopicStatsDB
+from app.storage.effective_skill import decay_policy, effective_skills
+from app.storage.hydration import COURSE_COLUMNS, TOPIC_COLUMNS, course_from_row, topic_from_row
+from app.models.models import Course, Topic
+
+
+class PlanningSnapshot:
+    """
+    Everything the planner needs to score topics, loaded in a constant number of queries.
+
+    Topics are kept in the same order the per-course loaders produced (courses in
+    table order, topics in table order within each course) so ties sort the same way.
+    """
+
+    def __init__(self, now: datetime, courses: List[Course], topics: List[Topic]):
+        self.now = now
+        self.courses = courses
+        self.topics = topics
+        self.courses_by_id: Dict[int, Course] = {course.id: course for course in courses}
+        self.skill_trends: Dict[int, float] = {}
+        self.recent_study_minutes: Dict[int, float] = {}
+        self.last_session_end: Dict[int, datetime] = {}
+        self._columns = None
+
+    def iter_topics(self) -> Iterator[Tuple[Topic, Course]]:
+        for topic in self.topics:
+            yield topic, self.courses_by_id[topic.course_id]
+
+    def columns(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Per-topic (course_index, weights, skills) arrays aligned with `topics`."""
+        if self._columns is None:
+            course_order = {course.id: index for index, course in enumerate(self.courses)}
+            self._columns = (
+                np.fromiter((course_order[t.course_id] for t in self.topics), dtype=np.intp, count=len(self.topics)),
+                np.fromiter((t.weight for t in self.topics), dtype=np.float64, count=len(self.topics)),
+                np.fromiter((t.skill_level for t in self.topics), dtype=np.float64, count=len(self.topics))
+            )
+        return self._columns
+
+    def activity_columns(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Per-topic (skill_trend, recent_study_minutes) arrays aligned with `topics`."""
+        count = len(self.topics)
+        trends = np.fromiter((self.get_skill_trend(t.id) for t in self.topics), dtype=np.float64, count=count)
+        minutes = np.fromiter((self.get_recent_study_time(t.id) for t in self.topics), dtype=np.float64, count=count)
+        return trends, minutes
+
+    def get_skill_trend(self, topic_id: int) -> float:
+        return self.skill_trends.get(topic_id, 0)
+
+    def get_recent_study_time(self, topic_id: int) -> float:
+        return self.recent_study_minutes.get(topic_id, 0)
+
+
+def load_planning_snapshot(db: Database, include_activity: bool = True,
+                           recent_days: int = 7, trend_window: int = 5,
+                           now: Optional[datetime] = None,
+                           effective: bool = True) -> PlanningSnapshot:
+    """
+    Load courses, topics and (optionally) per-topic activity aggregates.
+
+    With `effective`, topic skill levels include the decay accrued since each
+    topic's last activity, whether or not it has been written yet.
+
+    Activity is loaded with one windowed query for the last `trend_window` skill
+    changes per topic and two grouped queries over study sessions, so the number of
+    round trips does not depend on the number of topics.
+    """
+    now = now or datetime.now()
+    session = db.get_session()
+    try:
+        courses = [
+            course_from_row(row) for row in session.query(*COURSE_COLUMNS).order_by(CourseDB.id)
+        ]
+
+        course_order = {course.id: index for index, course in enumerate(courses)}
+        rows = session.query(*TOPIC_COLUMNS).order_by(TopicDB.id).all()
+        rows = [row for row in rows if row.course_id in course_order]
+        rows.sort(key=lambda row: course_order[row.course_id])
+        skills = effective_skills(db, decay_policy(db)).get_many() if effective else {}
+        topics = [topic_from_row(row, skills.get(row.id)) for row in rows]
+
+        snapshot = PlanningSnapshot(now, courses, topics)
+
+        if include_activity:
+            _load_skill_trends(session, snapshot, trend_window)
+            _load_study_activity(session, snapshot, now - timedelta(days=recent_days))
+
+        return snapshot
+    finally:
+        session.close()
+
+
+def _load_skill_trends(session, snapshot: PlanningSnapshot, trend_window: int):
+    """Skill trend = newest skill minus the skill before the oldest of the last N changes."""
+    ranked = session.query(
+        SkillHistoryDB.topic_id.label('topic_id'),
+        SkillHistoryDB.previous_skill.label('previous_skill'),
+        SkillHistoryDB.new_skill.label('new_skill'),
+        func.row_number().over(
+            partition_by=SkillHistoryDB.topic_id,
+            order_by=(SkillHistoryDB.timestamp.desc(), SkillHistoryDB.id.desc())
+        ).label('rn')
+    ).subquery()
+
+    rows = session.query(
+        ranked.c.topic_id, ranked.c.previous_skill, ranked.c.new_skill, ranked.c.rn
+    ).filter(ranked.c.rn <= trend_window).order_by(ranked.c.topic_id, ranked.c.rn).all()
+
+    history: Dict[int, List] = {}
+    for row in rows:
+        history.setdefault(row.topic_id, []).append(row)
+
+    for topic_id, entries in history.items():
+        if len(entries) >= 2:
+            snapshot.skill_trends[topic_id] = entries[0].new_skill - entries[-1].previous_skill
+
+
+def _load_study_activity(session, snapshot: PlanningSnapshot, cutoff: datetime):
+    recent = session.query(
+        StudySessionDB.topic_id, func.sum(StudySessionDB.duration_minutes)
+    ).filter(
+        StudySessionDB.start_time >= cutoff,
+        StudySessionDB.end_time.isnot(None)
+    ).group_by(StudySessionDB.topic_id).all()
+
+    snapshot.recent_study_minutes = {topic_id: minutes or 0 for topic_id, minutes in recent}
+
+    last_ends = session.query(TopicStatsDB.topic_id, TopicStatsDB.last_session_end).filter(
+        TopicStatsDB.last_session_end.isnot(None)
+    ).all()
+
+    snapshot.last_session_end = {topic_id: end_time for topic_id, end_time in last_ends}
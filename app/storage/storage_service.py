@@ -1,6 +1,8 @@
 from typing import List, Optional
 from datetime import datetime
 from app.storage.database import Database, CourseDB, TopicDB
+from app.storage.planning_snapshot import PlanningSnapshot, load_planning_snapshot
+from app.storage.hydration import COURSE_COLUMNS, TOPIC_COLUMNS, course_from_row, topic_from_row
 from app.models.models import Course, Topic
 
 
@@ -28,11 +30,7 @@ class StorageService:
         try:
             db_course = session.query(CourseDB).filter(CourseDB.id == course_id).first()
             if db_course:
-                return Course(
-                    id=db_course.id,
-                    name=db_course.name,
-                    exam_date=db_course.exam_date
-                )
+                return course_from_row(db_course)
             return None
         finally:
             session.close()
@@ -40,14 +38,8 @@ class StorageService:
     def get_all_courses(self) -> List[Course]:
         session = self.db.get_session()
         try:
-            db_courses = session.query(CourseDB).all()
-            return [
-                Course(
-                    id=db_course.id,
-                    name=db_course.name,
-                    exam_date=db_course.exam_date
-                ) for db_course in db_courses
-            ]
+            rows = session.query(*COURSE_COLUMNS).all()
+            return [course_from_row(row) for row in rows]
         finally:
             session.close()
     
@@ -73,13 +65,7 @@ class StorageService:
         try:
             db_topic = session.query(TopicDB).filter(TopicDB.id == topic_id).first()
             if db_topic:
-                return Topic(
-                    id=db_topic.id,
-                    course_id=db_topic.course_id,
-                    name=db_topic.name,
-                    weight=db_topic.weight,
-                    skill_level=db_topic.skill_level
-                )
+                return topic_from_row(db_topic)
             return None
         finally:
             session.close()
@@ -87,35 +73,23 @@ class StorageService:
     def get_topics_by_course(self, course_id: int) -> List[Topic]:
         session = self.db.get_session()
         try:
-            db_topics = session.query(TopicDB).filter(TopicDB.course_id == course_id).all()
-            return [
-                Topic(
-                    id=db_topic.id,
-                    course_id=db_topic.course_id,
-                    name=db_topic.name,
-                    weight=db_topic.weight,
-                    skill_level=db_topic.skill_level
-                ) for db_topic in db_topics
-            ]
+            rows = session.query(*TOPIC_COLUMNS).filter(TopicDB.course_id == course_id).all()
+            return [topic_from_row(row) for row in rows]
         finally:
             session.close()
     
     def get_all_topics(self) -> List[Topic]:
         session = self.db.get_session()
         try:
-            db_topics = session.query(TopicDB).all()
-            return [
-                Topic(
-                    id=db_topic.id,
-                    course_id=db_topic.course_id,
-                    name=db_topic.name,
-                    weight=db_topic.weight,
-                    skill_level=db_topic.skill_level
-                ) for db_topic in db_topics
-            ]
+            rows = session.query(*TOPIC_COLUMNS).all()
+            return [topic_from_row(row) for row in rows]
         finally:
             session.close()
     
+    def get_planning_snapshot(self, include_activity: bool = True) -> PlanningSnapshot:
+        """Load courses, topics and per-topic activity in a constant number of queries."""
+        return load_planning_snapshot(self.db, include_activity=include_activity)
+    
     def update_topic_skill(self, topic_id: int, new_skill_level: float) -> bool:
         session = self.db.get_session()
         try:
@@ -137,11 +111,7 @@ class StorageService:
                 db_course.exam_date = course.exam_date
                 session.commit()
                 session.refresh(db_course)
-                return Course(
-                    id=db_course.id,
-                    name=db_course.name,
-                    exam_date=db_course.exam_date
-                )
+                return course_from_row(db_course)
             raise ValueError("Course not found")
         finally:
             session.close()
@@ -157,13 +127,7 @@ class StorageService:
                 db_topic.skill_level = topic.skill_level
                 session.commit()
                 session.refresh(db_topic)
-                return Topic(
-                    id=db_topic.id,
-                    course_id=db_topic.course_id,
-                    name=db_topic.name,
-                    weight=db_topic.weight,
-                    skill_level=db_topic.skill_level
-                )
+                return topic_from_row(db_topic)
             raise ValueError("Topic not found")
         finally:
             session.close()
@@ -0,0 +1,441 @@
+"""
+Incremental per-topic rollups (``topic_stats`` and ``topic_daily_stats``).
+
+Writers that end study sessions, submit quiz attempts or record skill changes call
+the ``record_*`` functions inside their own transaction, so the rollups commit (or
+roll back) together with the raw rows. Windowed aggregates are read from the daily
+table, which holds at most one row per topic per day. A session's minutes are split
+across the days it spans; its count goes to the day it started.
+
+``rebuild`` recomputes both tables from the raw rows (used by the schema migration
+for backfill) and ``check`` reports topics whose rollup differs from the raw rows:
+    
+    python -m app.storage.topic_stats check --db study_planner.db
+    python -m app.storage.topic_stats rebuild --db study_planner.db
+"""
+
+import argparse
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import func, delete, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.engine import Connection
+from app.storage.database import (
+    Database, TopicDB, StudySessionDB, SkillHistoryDB, QuizDB, QuizAttemptDB,
+    TopicStatsDB, TopicDailyStatsDB
+)
+
+STATS_COLUMNS = [
+    'total_minutes', 'session_count', 'last_session_end', 'quiz_attempt_count',
+    'quiz_score_sum', 'last_quiz_at', 'last_quiz_score', 'skill_change_count',
+    'last_skill_change_at'
+]
+DAILY_COLUMNS = ['minutes', 'session_count', 'quiz_attempt_count', 'quiz_score_sum', 'skill_delta']
+GRANULARITIES = ('day', 'week', 'month')
+
+
+def _later(column, value):
+    """SQL for max(column, value) treating NULL as 'no value yet'."""
+    return func.max(func.coalesce(column, value), value)
+
+
+def _upsert_stats(session, rows: List[Dict], increments: List[str], latest: Dict[str, str] = None):
+    """
+    Add `increments` and keep the newest `latest` timestamps in topic_stats.
+    
+    `latest` maps a timestamp column to a column that is replaced together with it
+    (or to None), e.g. last_quiz_at -> last_quiz_score.
+    """
+    if not rows:
+        return
+    latest = latest or {}
+    table = TopicStatsDB.__table__
+    stmt = insert(table)
+    excluded = stmt.excluded
+    
+    set_ = {name: table.c[name] + excluded[name] for name in increments}
+    for timestamp, companion in latest.items():
+        set_[timestamp] = _later(table.c[timestamp], excluded[timestamp])
+        if companion:
+            set_[companion] = func.iif(
+                func.coalesce(table.c[timestamp], excluded[timestamp]) <= excluded[timestamp],
+                excluded[companion], table.c[companion]
+            )
+    session.execute(stmt.on_conflict_do_update(index_elements=[table.c.topic_id], set_=set_), rows)
+
+
+def _upsert_daily(session, rows: List[Dict], increments: List[str]):
+    if not rows:
+        return
+    table = TopicDailyStatsDB.__table__
+    stmt = insert(table)
+    set_ = {name: table.c[name] + stmt.excluded[name] for name in increments}
+    session.execute(
+        stmt.on_conflict_do_update(index_elements=[table.c.topic_id, table.c.day], set_=set_), rows
+    )
+
+
+def _stats_row(topic_id: int, **values) -> Dict:
+    row = {name: None for name in STATS_COLUMNS}
+    row.update(total_minutes=0.0, session_count=0, quiz_attempt_count=0,
+               quiz_score_sum=0.0, skill_change_count=0)
+    row.update(values, topic_id=topic_id)
+    return row
+
+
+def _daily_row(topic_id: int, day: date, **values) -> Dict:
+    row = {name: 0 for name in DAILY_COLUMNS}
+    row.update(values, topic_id=topic_id, day=day)
+    return row
+
+
+def split_by_day(start_time: datetime, end_time: datetime, minutes: float) -> List[Tuple[date, float]]:
+    """Spread `minutes` over the calendar days [start_time, end_time] touches, in proportion to the time spent in each."""
+    span = (end_time - start_time).total_seconds()
+    if span <= 0 or start_time.date() == end_time.date():
+        return [(start_time.date(), minutes)]
+    
+    parts = []
+    cursor = start_time
+    while cursor < end_time:
+        boundary = min(datetime.combine(cursor.date() + timedelta(days=1), time()), end_time)
+        parts.append((cursor.date(), minutes * (boundary - cursor).total_seconds() / span))
+        cursor = boundary
+    return parts
+
+
+def record_session(session, topic_id: int, start_time: datetime, end_time: datetime, minutes: float):
+    """Roll up a completed study session (minutes split across days, counted on the day it started)."""
+    minutes = minutes or 0.0
+    _upsert_stats(
+        session,
+        [_stats_row(topic_id, total_minutes=minutes, session_count=1, last_session_end=end_time)],
+        ['total_minutes', 'session_count'], {'last_session_end': None}
+    )
+    _upsert_daily(
+        session,
+        [
+            _daily_row(topic_id, day, minutes=part, session_count=int(index == 0))
+            for index, (day, part) in enumerate(split_by_day(start_time, end_time, minutes))
+        ],
+        ['minutes', 'session_count']
+    )
+
+
+def record_quiz_attempt(session, topic_id: int, attempted_at: datetime, score: float):
+    _upsert_stats(
+        session,
+        [_stats_row(topic_id, quiz_attempt_count=1, quiz_score_sum=score,
+                    last_quiz_at=attempted_at, last_quiz_score=score)],
+        ['quiz_attempt_count', 'quiz_score_sum'], {'last_quiz_at': 'last_quiz_score'}
+    )
+    _upsert_daily(
+        session, [_daily_row(topic_id, attempted_at.date(), quiz_attempt_count=1, quiz_score_sum=score)],
+        ['quiz_attempt_count', 'quiz_score_sum']
+    )
+
+
+def remove_quiz_attempts(session, topic_id: int, attempts: Iterable[Tuple[datetime, float]]):
+    """
+    Undo record_quiz_attempt for deleted (attempted_at, score) attempts of a topic.
+    
+    Call after the attempts are deleted (flushed): the latest remaining attempt
+    becomes the topic's last quiz.
+    """
+    attempts = list(attempts)
+    if not attempts:
+        return
+    _upsert_daily(
+        session,
+        [_daily_row(topic_id, attempted_at.date(), quiz_attempt_count=-1, quiz_score_sum=-score)
+         for attempted_at, score in attempts],
+        ['quiz_attempt_count', 'quiz_score_sum']
+    )
+    latest = session.execute(
+        select(QuizAttemptDB.attempted_at, QuizAttemptDB.score)
+        .join(QuizDB, QuizAttemptDB.quiz_id == QuizDB.id).where(QuizDB.topic_id == topic_id)
+        .order_by(QuizAttemptDB.attempted_at.desc(), QuizAttemptDB.id.desc()).limit(1)
+    ).first()
+    table = TopicStatsDB.__table__
+    session.execute(
+        update(table).where(table.c.topic_id == topic_id).values(
+            quiz_attempt_count=table.c.quiz_attempt_count - len(attempts),
+            quiz_score_sum=table.c.quiz_score_sum - sum(score for _, score in attempts),
+            last_quiz_at=latest.attempted_at if latest else None,
+            last_quiz_score=latest.score if latest else None
+        )
+    )
+
+
+def record_skill_changes(session, changes: Iterable[Dict]):
+    """Roll up skill_history rows (dicts with topic_id, timestamp, previous_skill, new_skill, reason)."""
+    stats_rows = []
+    daily_rows = []
+    for change in changes:
+        daily_rows.append(_daily_row(
+            change['topic_id'], change['timestamp'].date(),
+            skill_delta=change['new_skill'] - change['previous_skill']
+        ))
+        if change['reason'] != 'decay':
+            stats_rows.append(_stats_row(
+                change['topic_id'], skill_change_count=1, last_skill_change_at=change['timestamp']
+            ))
+    _upsert_stats(session, stats_rows, ['skill_change_count'], {'last_skill_change_at': None})
+    _upsert_daily(session, daily_rows, ['skill_delta'])
+
+
+def get_topic_stats(session, topic_ids: Optional[Iterable[int]] = None) -> Dict[int, TopicStatsDB]:
+    query = session.query(TopicStatsDB)
+    if topic_ids is not None:
+        query = query.filter(TopicStatsDB.topic_id.in_(list(topic_ids)))
+    return {stats.topic_id: stats for stats in query.all()}
+
+
+def get_window_totals(session, days: int, now: Optional[datetime] = None,
+                      topic_ids: Optional[Iterable[int]] = None) -> Dict[int, Dict[str, float]]:
+    """Daily rollups summed per topic over the last `days` calendar days (including today)."""
+    first_day = (now or datetime.now()).date() - timedelta(days=days - 1)
+    query = session.query(
+        TopicDailyStatsDB.topic_id,
+        *[func.sum(getattr(TopicDailyStatsDB, name)).label(name) for name in DAILY_COLUMNS]
+    ).filter(TopicDailyStatsDB.day >= first_day)
+    if topic_ids is not None:
+        query = query.filter(TopicDailyStatsDB.topic_id.in_(list(topic_ids)))
+    return {
+        row.topic_id: {name: getattr(row, name) for name in DAILY_COLUMNS}
+        for row in query.group_by(TopicDailyStatsDB.topic_id).all()
+    }
+
+
+def get_session_totals(session) -> Dict[int, Tuple[float, int]]:
+    """(total minutes, session count) per topic with at least one completed session."""
+    return {
+        topic_id: (minutes, count)
+        for topic_id, minutes, count in session.query(
+            TopicStatsDB.topic_id, TopicStatsDB.total_minutes, TopicStatsDB.session_count
+        ).filter(TopicStatsDB.session_count > 0)
+    }
+
+
+def get_daily_minutes(session, days: int, now: Optional[datetime] = None,
+                      topic_ids: Optional[Iterable[int]] = None) -> Dict[str, Dict[int, float]]:
+    """Study minutes per day ('YYYY-MM-DD') and topic over the last `days` calendar days (including today)."""
+    first_day = (now or datetime.now()).date() - timedelta(days=days - 1)
+    query = session.query(
+        TopicDailyStatsDB.day, TopicDailyStatsDB.topic_id, TopicDailyStatsDB.minutes
+    ).filter(TopicDailyStatsDB.day >= first_day, TopicDailyStatsDB.minutes > 0)
+    if topic_ids is not None:
+        query = query.filter(TopicDailyStatsDB.topic_id.in_(list(topic_ids)))
+    
+    breakdown: Dict[str, Dict[int, float]] = {}
+    for day, topic_id, minutes in query.order_by(TopicDailyStatsDB.day, TopicDailyStatsDB.topic_id):
+        breakdown.setdefault(day.isoformat(), {})[topic_id] = minutes
+    return breakdown
+
+
+def get_study_minutes(session, start: date, end: date, granularity: str = 'day',
+                      topic_ids: Optional[Iterable[int]] = None) -> Dict[str, float]:
+    """
+    Study minutes per day, week or month bucket over the calendar days [start, end], oldest first.
+    
+    Every bucket overlapping the range is present (0 without study time); the first and
+    last buckets only count days inside the range. Buckets are labelled by their first
+    day ('YYYY-MM-DD', weeks start on Monday), months as 'YYYY-MM'.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown granularity '{granularity}', expected one of {', '.join(GRANULARITIES)}")
+    if start > end:
+        raise ValueError("Range start must not be after its end")
+    
+    day = TopicDailyStatsDB.day
+    bucket = {
+        'day': func.date(day),
+        'week': func.date(day, '-6 days', 'weekday 1'),
+        'month': func.strftime('%Y-%m', day),
+    }[granularity]
+    query = session.query(bucket, func.sum(TopicDailyStatsDB.minutes)).filter(day.between(start, end))
+    if topic_ids is not None:
+        query = query.filter(TopicDailyStatsDB.topic_id.in_(list(topic_ids)))
+    totals = dict(query.group_by(bucket).all())
+    
+    series: Dict[str, float] = {}
+    current = start
+    while current <= end:
+        label = _bucket_label(current, granularity)
+        if label not in series:
+            series[label] = totals.get(label) or 0.0
+        current += timedelta(days=1)
+    return series
+
+
+def _bucket_label(day: date, granularity: str) -> str:
+    if granularity == 'week':
+        return (day - timedelta(days=day.weekday())).isoformat()
+    if granularity == 'month':
+        return day.strftime('%Y-%m')
+    return day.isoformat()
+
+
+def compute_rollups(conn: Connection):
+    """Recompute (topic_stats rows, topic_daily_stats rows) from the raw tables."""
+    stats: Dict[int, Dict] = {}
+    daily: Dict[tuple, Dict] = {}
+    
+    def stats_for(topic_id):
+        if topic_id not in stats:
+            stats[topic_id] = _stats_row(topic_id)
+        return stats[topic_id]
+    
+    def daily_for(topic_id, day):
+        day = date.fromisoformat(day)
+        if (topic_id, day) not in daily:
+            daily[(topic_id, day)] = _daily_row(topic_id, day)
+        return daily[(topic_id, day)]
+    
+    completed = StudySessionDB.end_time.isnot(None)
+    minutes = func.coalesce(StudySessionDB.duration_minutes, 0)
+    for topic_id, total, count, last_end in conn.execute(
+        select(StudySessionDB.topic_id, func.sum(minutes), func.count(), func.max(StudySessionDB.end_time))
+        .where(completed).group_by(StudySessionDB.topic_id)
+    ):
+        stats_for(topic_id).update(total_minutes=total, session_count=count, last_session_end=last_end)
+    same_day = func.date(StudySessionDB.start_time) == func.date(StudySessionDB.end_time)
+    for topic_id, day, total, count in conn.execute(
+        select(StudySessionDB.topic_id, func.date(StudySessionDB.start_time), func.sum(minutes), func.count())
+        .where(completed, same_day).group_by(StudySessionDB.topic_id, func.date(StudySessionDB.start_time))
+    ):
+        daily_for(topic_id, day).update(minutes=total, session_count=count)
+    # Sessions that cross midnight are split in Python, as record_session does
+    for topic_id, start_time, end_time, total in conn.execute(
+        select(StudySessionDB.topic_id, StudySessionDB.start_time, StudySessionDB.end_time, minutes)
+        .where(completed, ~same_day)
+    ):
+        for index, (day, part) in enumerate(split_by_day(start_time, end_time, total)):
+            row = daily_for(topic_id, day.isoformat())
+            row['minutes'] += part
+            row['session_count'] += int(index == 0)
+    
+    latest_attempt = select(
+        QuizDB.topic_id.label('topic_id'), QuizAttemptDB.score.label('score'),
+        QuizAttemptDB.attempted_at.label('attempted_at'),
+        func.row_number().over(
+            partition_by=QuizDB.topic_id,
+            order_by=(QuizAttemptDB.attempted_at.desc(), QuizAttemptDB.id.desc())
+        ).label('rn')
+    ).join(QuizAttemptDB, QuizAttemptDB.quiz_id == QuizDB.id).subquery()
+    for topic_id, score, attempted_at in conn.execute(
+        select(latest_attempt.c.topic_id, latest_attempt.c.score, latest_attempt.c.attempted_at)
+        .where(latest_attempt.c.rn == 1)
+    ):
+        stats_for(topic_id).update(last_quiz_score=score, last_quiz_at=attempted_at)
+    for topic_id, count, total in conn.execute(
+        select(QuizDB.topic_id, func.count(), func.sum(QuizAttemptDB.score))
+        .join(QuizAttemptDB, QuizAttemptDB.quiz_id == QuizDB.id).group_by(QuizDB.topic_id)
+    ):
+        stats_for(topic_id).update(quiz_attempt_count=count, quiz_score_sum=total)
+    for topic_id, day, count, total in conn.execute(
+        select(QuizDB.topic_id, func.date(QuizAttemptDB.attempted_at), func.count(), func.sum(QuizAttemptDB.score))
+        .join(QuizAttemptDB, QuizAttemptDB.quiz_id == QuizDB.id)
+        .group_by(QuizDB.topic_id, func.date(QuizAttemptDB.attempted_at))
+    ):
+        daily_for(topic_id, day).update(quiz_attempt_count=count, quiz_score_sum=total)
+    
+    for topic_id, count, last_change in conn.execute(
+        select(SkillHistoryDB.topic_id, func.count(), func.max(SkillHistoryDB.timestamp))
+        .where(SkillHistoryDB.reason != 'decay').group_by(SkillHistoryDB.topic_id)
+    ):
+        stats_for(topic_id).update(skill_change_count=count, last_skill_change_at=last_change)
+    for topic_id, day, delta in conn.execute(
+        select(SkillHistoryDB.topic_id, func.date(SkillHistoryDB.timestamp),
+               func.sum(SkillHistoryDB.new_skill - SkillHistoryDB.previous_skill))
+        .group_by(SkillHistoryDB.topic_id, func.date(SkillHistoryDB.timestamp))
+    ):
+        daily_for(topic_id, day).update(skill_delta=delta)
+    
+    # Rows for deleted topics would violate the foreign key
+    topic_ids = {row[0] for row in conn.execute(select(TopicDB.id))}
+    return (
+        [row for topic_id, row in stats.items() if topic_id in topic_ids],
+        [row for key, row in daily.items() if key[0] in topic_ids]
+    )
+
+
+def rebuild(conn: Connection) -> int:
+    """Replace both rollup tables with values recomputed from the raw rows. Returns the topic count."""
+    stats_rows, daily_rows = compute_rollups(conn)
+    conn.execute(delete(TopicStatsDB.__table__))
+    conn.execute(delete(TopicDailyStatsDB.__table__))
+    if stats_rows:
+        conn.execute(TopicStatsDB.__table__.insert(), stats_rows)
+    if daily_rows:
+        conn.execute(TopicDailyStatsDB.__table__.insert(), daily_rows)
+    return len(stats_rows)
+
+
+def check(conn: Connection, tolerance: float = 1e-6) -> List[Dict]:
+    """Topics (and days) whose stored rollup differs from the raw rows."""
+    stats_rows, daily_rows = compute_rollups(conn)
+    mismatches = []
+    
+    stored = {row.topic_id: row._asdict() for row in conn.execute(select(TopicStatsDB.__table__))}
+    for expected in stats_rows:
+        actual = stored.pop(expected['topic_id'], None) or _stats_row(expected['topic_id'])
+        diff = _diff(expected, actual, STATS_COLUMNS, tolerance)
+        if diff:
+            mismatches.append({'topic_id': expected['topic_id'], 'day': None, 'columns': diff})
+    for topic_id, actual in stored.items():
+        diff = _diff(_stats_row(topic_id), actual, STATS_COLUMNS, tolerance)
+        if diff:
+            mismatches.append({'topic_id': topic_id, 'day': None, 'columns': diff})
+    
+    stored_daily = {
+        (row.topic_id, row.day): row._asdict() for row in conn.execute(select(TopicDailyStatsDB.__table__))
+    }
+    for expected in daily_rows:
+        key = (expected['topic_id'], expected['day'])
+        actual = stored_daily.pop(key, None) or _daily_row(*key)
+        diff = _diff(expected, actual, DAILY_COLUMNS, tolerance)
+        if diff:
+            mismatches.append({'topic_id': key[0], 'day': key[1], 'columns': diff})
+    for (topic_id, day), actual in stored_daily.items():
+        diff = _diff(_daily_row(topic_id, day), actual, DAILY_COLUMNS, tolerance)
+        if diff:
+            mismatches.append({'topic_id': topic_id, 'day': day, 'columns': diff})
+    
+    return mismatches
+
+
+def _diff(expected: Dict, actual: Dict, columns: List[str], tolerance: float) -> Dict:
+    diff = {}
+    for name in columns:
+        a, b = expected.get(name), actual.get(name)
+        if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+            if abs(a - b) > tolerance:
+                diff[name] = (a, b)
+        elif a != b:
+            diff[name] = (a, b)
+    return diff
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Rebuild or check the per-topic rollup tables.")
+    parser.add_argument('command', choices=['rebuild', 'check'])
+    parser.add_argument('--db', default='study_planner.db', help="SQLite database path")
+    args = parser.parse_args(argv)
+    
+    db = Database(args.db)
+    with db.engine.begin() as conn:
+        if args.command == 'rebuild':
+            print(f"Rebuilt rollups for {rebuild(conn)} topics")
+            return 0
+        
+        mismatches = check(conn)
+        for mismatch in mismatches:
+            day = f" on {mismatch['day']}" if mismatch['day'] else ""
+            print(f"Topic {mismatch['topic_id']}{day}: {mismatch['columns']}")
+        print(f"{len(mismatches)} mismatches")
+        return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,120 @@
+"""
+Request-scoped unit of work: one session, one connection checkout and one commit.
+
+Inside ``with unit_of_work(db):`` every ``db.get_session()`` returns the same shared
+session, so storage and service calls reuse its connection, transaction and identity
+map. Their ``commit()`` calls become flush points and ``close()`` does nothing; the
+transaction commits once when the block exits (or rolls back on an exception, or
+when ``rollback()`` is called).
+
+Change listeners are notified at every flush point, so process-level caches never
+serve data from before a write in the same request. On rollback the changes are
+published again, because anything cached in between may have read uncommitted rows.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional
+
+
+class UnitOfWork:
+    def __init__(self, db):
+        self.db = db
+        self._session = None
+        self._published: List = []
+    
+    @property
+    def active(self) -> bool:
+        return self._session is not None
+    
+    def session(self) -> 'SharedSession':
+        """The shared session, opened on first use (requests that never touch the database do no checkout)."""
+        if self._session is None:
+            self._session = self.db.SessionLocal()
+        return SharedSession(self)
+    
+    def flush(self):
+        """What a service's commit() does: write pending changes and notify listeners, without committing."""
+        session = self._session
+        session.flush()
+        changes = self.db.take_changes(session)
+        if changes:
+            self._published.extend(changes)
+            self.db.publish_changes(changes)
+        # Matches a real commit: bulk statements may have changed rows already in the identity map
+        session.expire_all()
+    
+    def commit(self):
+        if self._session is None:
+            return
+        self._session.commit()
+        self._published = []
+    
+    def rollback(self):
+        if self._session is None:
+            return
+        changes = self._published + self.db.take_changes(self._session)
+        self._session.rollback()
+        self._published = []
+        if changes:
+            self.db.publish_changes(changes)
+    
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+
+class SharedSession:
+    """The unit of work's session as handed to storage and service code."""
+    
+    def __init__(self, work: UnitOfWork):
+        self._work = work
+    
+    def __getattr__(self, name):
+        return getattr(self._work._session, name)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        return False
+    
+    def commit(self):
+        self._work.flush()
+    
+    def rollback(self):
+        # A failed step fails the whole unit of work
+        self._work.rollback()
+    
+    def close(self):
+        pass
+
+
+_current: ContextVar[Optional[UnitOfWork]] = ContextVar('unit_of_work', default=None)
+
+
+def current_unit_of_work(db) -> Optional[UnitOfWork]:
+    work = _current.get()
+    return work if work is not None and work.db is db else None
+
+
+@contextmanager
+def unit_of_work(db):
+    """Share one session across every db.get_session() in the block; commit once at the end."""
+    current = current_unit_of_work(db)
+    if current is not None:
+        yield current
+        return
+    
+    work = UnitOfWork(db)
+    token = _current.set(work)
+    try:
+        yield work
+        work.commit()
+    except BaseException:
+        work.rollback()
+        raise
+    finally:
+        work.close()
+        _current.reset(token)
@@ -0,0 +1,91 @@
+"""
+Benchmark: latency of cheap API reads, idle vs while heavy analytics requests run.
+
+Run with:
+    python -m benchmarks.bench_api_latency
+"""
+
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+COURSES = 10
+TOPICS_PER_COURSE = 30
+READS = 300
+HEAVY_CLIENTS = 8
+
+
+async def measure_reads(client, count: int):
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        response = await client.get("/courses")
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200
+    return latencies
+
+
+async def heavy_load(client, stop: asyncio.Event, course_ids):
+    completed = 0
+    while not stop.is_set():
+        for course_id in course_ids:
+            await client.get(f"/analytics/exam-simulation/{course_id}", params={"samples": 200_000})
+            completed += 1
+            if stop.is_set():
+                break
+    return completed
+
+
+def percentile(values, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def report(label: str, latencies):
+    print(f"{label:<22} p50 {statistics.median(latencies):7.2f} ms   p99 {percentile(latencies, 0.99):7.2f} ms")
+
+
+async def run(server):
+    import httpx
+    
+    course_ids = []
+    for i in range(COURSES):
+        course = server.storage.create_course(server.Course(
+            name=f"Course {i}", exam_date=datetime.now() + timedelta(days=30 + i)
+        ))
+        course_ids.append(course.id)
+        for j in range(TOPICS_PER_COURSE):
+            server.storage.create_topic(server.Topic(
+                course_id=course.id, name=f"Topic {j}", weight=1 / TOPICS_PER_COURSE, skill_level=(j * 7) % 100
+            ))
+    
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await measure_reads(client, 20)
+        report("/courses idle", await measure_reads(client, READS))
+        
+        stop = asyncio.Event()
+        heavy = [asyncio.create_task(heavy_load(client, stop, course_ids)) for _ in range(HEAVY_CLIENTS)]
+        await asyncio.sleep(0.5)
+        report(f"/courses + {HEAVY_CLIENTS} heavy", await measure_reads(client, READS))
+        stop.set()
+        completed = sum(await asyncio.gather(*heavy))
+        print(f"heavy simulations completed: {completed}")
+    
+    await server.async_storage.db.dispose()
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        # The server module opens study_planner.db in the working directory on import
+        from app.api import server
+        asyncio.run(run(server))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark: cost of turning topic rows into API models, validated vs trusted hydration.
+
+"hydrate" times only the model construction over rows already fetched; "read" times
+the whole list read, comparing the previous path (ORM entities + validating
+constructor) with StorageService.get_all_topics (column rows + model_construct).
+
+Run with:
+    python -m benchmarks.bench_hydration
+"""
+
+import time
+from datetime import datetime, timedelta
+from app.models.models import Topic
+from app.storage.database import CourseDB, TopicDB
+from app.storage.hydration import TOPIC_COLUMNS, topic_from_row
+from app.storage.storage_service import StorageService
+
+
+SIZES = [10_000, 50_000]
+COURSES = 20
+REPEATS = 3
+
+
+def seed(storage: StorageService, size: int):
+    session = storage.db.get_session()
+    try:
+        courses = [
+            CourseDB(name=f"Course {i}", exam_date=datetime.now() + timedelta(days=30 + i))
+            for i in range(COURSES)
+        ]
+        session.add_all(courses)
+        session.flush()
+        session.bulk_insert_mappings(TopicDB, [
+            {
+                'course_id': courses[i % COURSES].id,
+                'name': f"Topic {i}",
+                'weight': (i % 10) / 10,
+                'skill_level': float(i % 100)
+            } for i in range(size)
+        ])
+        session.commit()
+    finally:
+        session.close()
+
+
+def validated(row) -> Topic:
+    return Topic(
+        id=row.id,
+        course_id=row.course_id,
+        name=row.name,
+        weight=row.weight,
+        skill_level=row.skill_level
+    )
+
+
+def legacy_read(storage: StorageService):
+    session = storage.db.get_session()
+    try:
+        return [validated(db_topic) for db_topic in session.query(TopicDB).all()]
+    finally:
+        session.close()
+
+
+def best_of(func, *args) -> float:
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    print(f"{'topics':>8} {'hydrate validated':>18} {'hydrate trusted':>16} {'read legacy':>12} {'read current':>13}")
+    for size in SIZES:
+        storage = StorageService(":memory:")
+        seed(storage, size)
+        session = storage.db.get_session()
+        try:
+            rows = session.query(*TOPIC_COLUMNS).all()
+        finally:
+            session.close()
+        
+        per_row = lambda seconds: f"{seconds / size * 1e6:.2f} us/row"
+        hydrate_validated = best_of(lambda: [validated(row) for row in rows])
+        hydrate_trusted = best_of(lambda: [topic_from_row(row) for row in rows])
+        read_legacy = best_of(legacy_read, storage)
+        read_current = best_of(storage.get_all_topics)
+        
+        print(f"{size:>8} {per_row(hydrate_validated):>18} {per_row(hydrate_trusted):>16} "
+              f"{read_legacy * 1000:>9.1f} ms {read_current * 1000:>10.1f} ms")
+        storage.db.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
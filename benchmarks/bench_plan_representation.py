@@ -0,0 +1,121 @@
+"""
+Benchmark: memory and JSON response time of a study plan, dict entries vs StudyPlan.
+
+"legacy" is the previous representation (a dict per allocated topic holding the
+Topic and Course models) returned from a route with response_model=StudyPlanResponse,
+so FastAPI validates and serializes it. "compact" is StudyPlan (slotted entries plus
+topic/course lookups) returned as StudyPlan.to_json(). Both routes run in-process
+through httpx's ASGI transport. Memory counts only what the plan owns: the Topic
+and Course models are shared with the caller either way.
+
+Run with:
+    python -m benchmarks.bench_plan_representation
+"""
+
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta
+import httpx
+from fastapi import FastAPI, Response
+from app.api.server import StudyPlanResponse
+from app.models.models import Course, Topic, TopicPriority
+from app.planner.study_plan_generator import StudyPlan
+
+
+SIZES = [50, 500, 5_000]
+COURSES = 10
+REPEATS = 5
+
+
+def build_priorities(size: int):
+    now = datetime.now()
+    courses = [
+        Course(id=i + 1, name=f"Course {i}", exam_date=now + timedelta(days=10 + i))
+        for i in range(COURSES)
+    ]
+    return [
+        TopicPriority(
+            topic=Topic(id=i + 1, course_id=i % COURSES + 1, name=f"Topic {i}",
+                        weight=(i % 10) / 10, skill_level=float(i % 100)),
+            course=courses[i % COURSES],
+            priority_score=1 / (i + 1),
+            urgency_factor=1.0 + (i % 3) / 2
+        ) for i in range(size)
+    ]
+
+
+def legacy_plan(priorities):
+    return [
+        {
+            'topic': p.topic,
+            'course': p.course,
+            'priority_score': p.priority_score,
+            'urgency_factor': p.urgency_factor,
+            'allocated_hours': round(0.5 + (i % 7) / 4, 2)
+        } for i, p in enumerate(priorities)
+    ]
+
+
+def compact_plan(priorities):
+    plan = StudyPlan(len(priorities))
+    for i, p in enumerate(priorities):
+        plan.add_topic(p, round(0.5 + (i % 7) / 4, 2))
+    return plan
+
+
+def legacy_bytes(plan) -> int:
+    return sys.getsizeof(plan) + sum(
+        sys.getsizeof(item) + sys.getsizeof(item['allocated_hours']) for item in plan
+    )
+
+
+def compact_bytes(plan: StudyPlan) -> int:
+    return (
+        sys.getsizeof(plan) + sys.getsizeof(plan.__dict__) + sys.getsizeof(plan.entries)
+        + sys.getsizeof(plan.topics) + sys.getsizeof(plan.courses)
+        + sum(sys.getsizeof(entry) + sys.getsizeof(entry.allocated_hours) for entry in plan.entries)
+    )
+
+
+async def best_of(client, path: str) -> float:
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        response = await client.get(path)
+        timings.append(time.perf_counter() - start)
+        assert response.status_code == 200
+    return min(timings)
+
+
+async def run():
+    plans = {}
+    app = FastAPI()
+    
+    @app.get("/legacy/{size}", response_model=StudyPlanResponse)
+    def legacy_route(size: int):
+        return {"daily_hours": plans[size][1].daily_hours, "allocated_topics": plans[size][0]}
+    
+    @app.get("/compact/{size}", response_model=StudyPlanResponse)
+    def compact_route(size: int):
+        return Response(content=plans[size][1].to_json(), media_type="application/json")
+    
+    print(f"{'entries':>8} {'legacy bytes':>13} {'compact bytes':>14} {'legacy /plan':>13} {'compact /plan':>14}")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for size in SIZES:
+            priorities = build_priorities(size)
+            legacy, compact = plans[size] = legacy_plan(priorities), compact_plan(priorities)
+            legacy_time = await best_of(client, f"/legacy/{size}")
+            compact_time = await best_of(client, f"/compact/{size}")
+            
+            print(f"{size:>8} {legacy_bytes(legacy):>13,} {compact_bytes(compact):>14,} "
+                  f"{legacy_time * 1000:>10.2f} ms {compact_time * 1000:>11.2f} ms")
+
+
+def main():
+    asyncio.run(run())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark: mixed read/write throughput of a file database under each SQLite profile.
+
+First single-row commits from one thread (dominated by journal writes and fsyncs), then
+a mixed load: writer threads start and end study sessions (two commits each, including
+the rollup upserts) while reader threads load the planning snapshot and the study
+statistics. Each profile runs ROUNDS times, alternating, after a warm-up round.
+
+Run with:
+    python -m benchmarks.bench_sqlite_profiles
+"""
+
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy.exc import OperationalError
+from app.storage.database import Database, CourseDB, TopicDB, DecisionLogDB
+from app.storage.planning_snapshot import load_planning_snapshot
+from app.storage.sqlite_profiles import PROFILES
+from app.services.study_session_service import StudySessionService
+
+
+TOPICS = 200
+WRITERS = 2
+READERS = 4
+DURATION = 3.0
+COMMITS = 200
+ROUNDS = 2
+
+
+def seed(db: Database):
+    session = db.get_session()
+    try:
+        course = CourseDB(name="Benchmark", exam_date=datetime.now() + timedelta(days=30))
+        session.add(course)
+        session.flush()
+        session.add_all([
+            TopicDB(course_id=course.id, name=f"Topic {i}", weight=1 / TOPICS, skill_level=i % 100)
+            for i in range(TOPICS)
+        ])
+        session.commit()
+    finally:
+        session.close()
+
+
+def commits_per_second(db: Database) -> float:
+    start = time.perf_counter()
+    for i in range(COMMITS):
+        session = db.get_session()
+        try:
+            session.add(DecisionLogDB(timestamp=datetime.now(), decision_type='benchmark', explanation=str(i)))
+            session.commit()
+        finally:
+            session.close()
+    return COMMITS / (time.perf_counter() - start)
+
+
+def run_profile(name: str, path: str) -> dict:
+    db = Database(path, profile=name)
+    seed(db)
+    sessions = StudySessionService(db)
+    commit_rate = commits_per_second(db)
+    
+    counts = {'writes': 0, 'reads': 0, 'locked': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + DURATION
+    
+    def count(key: str):
+        with lock:
+            counts[key] += 1
+    
+    def writer(offset: int):
+        topic_id = offset + 1
+        while time.perf_counter() < deadline:
+            try:
+                sessions.end_session(sessions.start_session(topic_id).id)
+                count('writes')
+            except OperationalError:
+                count('locked')
+            topic_id = topic_id % TOPICS + 1
+    
+    def reader():
+        while time.perf_counter() < deadline:
+            try:
+                load_planning_snapshot(db)
+                sessions.get_statistics()
+                count('reads')
+            except OperationalError:
+                count('locked')
+    
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(WRITERS)]
+    threads += [threading.Thread(target=reader) for _ in range(READERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    db.engine.dispose()
+    
+    return {
+        'commits': commit_rate,
+        'writes': counts['writes'] / DURATION,
+        'reads': counts['reads'] / DURATION,
+        'locked': counts['locked'],
+    }
+
+
+def main():
+    print(f"{COMMITS} single-row commits, then {WRITERS} writers + {READERS} readers for {DURATION:.0f}s, "
+          f"{TOPICS} topics, best of {ROUNDS} rounds")
+    results = {name: [] for name in PROFILES}
+    with tempfile.TemporaryDirectory() as directory:
+        run_profile('legacy', os.path.join(directory, "warmup.db"))
+        for round_number in range(ROUNDS):
+            for name in PROFILES:
+                results[name].append(run_profile(name, os.path.join(directory, f"{name}-{round_number}.db")))
+    
+    for name, runs in results.items():
+        print(f"{name:<8} commits/s {max(r['commits'] for r in runs):8.1f}"
+              f"   mixed writes/s {max(r['writes'] for r in runs):6.1f}"
+              f"   mixed reads/s {max(r['reads'] for r in runs):6.1f}"
+              f"   locked errors {sum(r['locked'] for r in runs)}")
+
+
+if __name__ == '__main__':
+    main()
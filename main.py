@@ -1,6 +1,7 @@
 import sys
 from datetime import datetime
 from app.storage.storage_service import StorageService
+from app.storage.unit_of_work import unit_of_work
 from app.services.planner_service import PlannerService
 from app.services.quiz_service import QuizService
 from app.services.skill_tracking_service import SkillTrackingService
@@ -222,7 +223,7 @@ class CLI:
         
         plan = self.planner.generate_daily_plan(hours, adaptive=use_adaptive)
         
-        if not plan.allocated_topics:
+        if not plan.entries:
             print("\n⚠ No topics to study. Add courses and topics first!")
             return
         
@@ -232,12 +233,13 @@ class CLI:
         print(f"\nTotal Available Hours: {plan.daily_hours:.1f}h")
         print(f"Total Allocated Hours: {plan.get_total_allocated_hours():.1f}h\n")
         
-        for i, item in enumerate(plan.allocated_topics, 1):
-            print(f"{i}. {item['topic'].name} ({item['course'].name})")
-            print(f"   Priority Score: {item['priority_score']:.3f}")
-            print(f"   Urgency Factor: {item['urgency_factor']:.1f}x")
-            print(f"   Current Skill: {item['topic'].skill_level}%")
-            print(f"   ⏱ Study Time: {item['allocated_hours']:.1f} hours")
+        for i, entry in enumerate(plan, 1):
+            topic = plan.topics[entry.topic_id]
+            print(f"{i}. {topic.name} ({plan.courses[entry.course_id].name})")
+            print(f"   Priority Score: {entry.priority_score:.3f}")
+            print(f"   Urgency Factor: {entry.urgency_factor:.1f}x")
+            print(f"   Current Skill: {topic.skill_level}%")
+            print(f"   ⏱ Study Time: {entry.allocated_hours:.1f} hours")
             print()
     
     def view_weak_topics(self):
@@ -1054,6 +1056,13 @@ class CLI:
         print(f"🎯 Passing Threshold: {simulation['passing_threshold']:.1f}%")
         print(f"📈 Pass Probability: {simulation['pass_probability']}%")
         
+        distribution = self.exam_sim_service.simulate_exam_distribution(course_id)
+        if 'error' not in distribution:
+            percentiles = distribution['percentiles']
+            print(f"🎲 Monte Carlo ({distribution['samples']:,} samples): "
+                  f"{distribution['pass_probability']:.1f}% pass, "
+                  f"90% of outcomes between {percentiles[5]:.1f}% and {percentiles[95]:.1f}%")
+        
         if simulation['will_pass']:
             print(f"\n✅ PROJECTION: PASS")
         else:
@@ -1341,75 +1350,77 @@ class CLI:
             self.display_menu()
             choice = input("Select an option (1-33): ").strip()
             
-            if choice == '1':
-                self.add_course()
-            elif choice == '2':
-                self.add_topic()
-            elif choice == '3':
-                self.view_courses()
-            elif choice == '4':
-                self.view_topics()
-            elif choice == '5':
-                self.generate_plan()
-            elif choice == '6':
-                self.view_weak_topics()
-            elif choice == '7':
-                self.start_study_session()
-            elif choice == '8':
-                self.end_study_session()
-            elif choice == '9':
-                self.view_study_statistics()
-            elif choice == '10':
-                self.manual_self_assessment()
-            elif choice == '11':
-                self.view_skill_history()
-            elif choice == '12':
-                self.create_quiz()
-            elif choice == '13':
-                self.take_quiz()
-            elif choice == '14':
-                self.view_quiz_results()
-            elif choice == '15':
-                self.view_progress_charts()
-            elif choice == '16':
-                self.view_weakest_topics_summary()
-            elif choice == '17':
-                self.manage_dependencies()
-            elif choice == '18':
-                self.view_expected_scores()
-            elif choice == '19':
-                self.view_risk_analysis()
-            elif choice == '20':
-                self.simulate_scenario()
-            elif choice == '21':
-                self.compare_strategies()
-            elif choice == '22':
-                self.view_skip_suggestions()
-            elif choice == '23':
-                self.view_decision_log()
-            elif choice == '24':
-                self.apply_skill_decay()
-            elif choice == '25':
-                print("\n👋 Goodbye! Happy studying!")
-                sys.exit(0)
-            elif choice == '26':
-                self.simulate_exam_today()
-            elif choice == '27':
-                self.show_reality_dashboard()
-            elif choice == '28':
-                self.detect_fake_productivity_ui()
-            elif choice == '29':
-                self.check_avoidance_patterns_ui()
-            elif choice == '30':
-                self.detect_overconfidence_ui()
-            elif choice == '31':
-                self.view_all_honesty_warnings()
-            elif choice == '32':
-                self.toggle_brutal_honesty()
-            elif choice == '33':
-                self.check_forced_reprioritization_ui()
-            else:
-                print("\n✗ Invalid option. Please try again.")
+            # Each menu action shares one session and commits once
+            with unit_of_work(self.storage.db):
+                if choice == '1':
+                    self.add_course()
+                elif choice == '2':
+                    self.add_topic()
+                elif choice == '3':
+                    self.view_courses()
+                elif choice == '4':
+                    self.view_topics()
+                elif choice == '5':
+                    self.generate_plan()
+                elif choice == '6':
+                    self.view_weak_topics()
+                elif choice == '7':
+                    self.start_study_session()
+                elif choice == '8':
+                    self.end_study_session()
+                elif choice == '9':
+                    self.view_study_statistics()
+                elif choice == '10':
+                    self.manual_self_assessment()
+                elif choice == '11':
+                    self.view_skill_history()
+                elif choice == '12':
+                    self.create_quiz()
+                elif choice == '13':
+                    self.take_quiz()
+                elif choice == '14':
+                    self.view_quiz_results()
+                elif choice == '15':
+                    self.view_progress_charts()
+                elif choice == '16':
+                    self.view_weakest_topics_summary()
+                elif choice == '17':
+                    self.manage_dependencies()
+                elif choice == '18':
+                    self.view_expected_scores()
+                elif choice == '19':
+                    self.view_risk_analysis()
+                elif choice == '20':
+                    self.simulate_scenario()
+                elif choice == '21':
+                    self.compare_strategies()
+                elif choice == '22':
+                    self.view_skip_suggestions()
+                elif choice == '23':
+                    self.view_decision_log()
+                elif choice == '24':
+                    self.apply_skill_decay()
+                elif choice == '25':
+                    print("\n👋 Goodbye! Happy studying!")
+                    sys.exit(0)
+                elif choice == '26':
+                    self.simulate_exam_today()
+                elif choice == '27':
+                    self.show_reality_dashboard()
+                elif choice == '28':
+                    self.detect_fake_productivity_ui()
+                elif choice == '29':
+                    self.check_avoidance_patterns_ui()
+                elif choice == '30':
+                    self.detect_overconfidence_ui()
+                elif choice == '31':
+                    self.view_all_honesty_warnings()
+                elif choice == '32':
+                    self.toggle_brutal_honesty()
+                elif choice == '33':
+                    self.check_forced_reprioritization_ui()
+                else:
+                    print("\n✗ Invalid option. Please try again.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,112 @@
+"""
+Unit tests for topic dependencies and the in-memory dependency graph
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from app.storage.storage_service import StorageService
+from app.services.dependency_service import DependencyService
+from app.services.skill_tracking_service import SkillTrackingService
+from app.models.models import Course, Topic
+
+
+@pytest.fixture
+def storage():
+    return StorageService(":memory:")
+
+
+@pytest.fixture
+def dependency_service(storage):
+    return DependencyService(storage.db)
+
+
+@pytest.fixture
+def topics(storage):
+    course = storage.create_course(Course(name="Algorithms", exam_date=datetime.now() + timedelta(days=20)))
+    return [
+        storage.create_topic(Topic(course_id=course.id, name=name, weight=0.25, skill_level=skill))
+        for name, skill in [("Arrays", 80.0), ("Sorting", 40.0), ("Graphs", 20.0), ("Dynamic Programming", 10.0)]
+    ]
+
+
+def _count_queries(db, fn):
+    statements = []
+    
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    event.listen(db.engine, "before_cursor_execute", before_execute)
+    try:
+        fn()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", before_execute)
+    return len(statements)
+
+
+class TestDependencyGraph:
+    def test_cycle_detection(self, dependency_service, topics):
+        arrays, sorting, graphs, dp = topics
+        dependency_service.add_dependency(arrays.id, sorting.id)
+        dependency_service.add_dependency(sorting.id, graphs.id)
+        
+        with pytest.raises(ValueError, match="circular"):
+            dependency_service.add_dependency(graphs.id, arrays.id)
+        with pytest.raises(ValueError, match="already exists"):
+            dependency_service.add_dependency(arrays.id, sorting.id)
+    
+    def test_satisfaction_follows_skill_writes(self, storage, dependency_service, topics):
+        arrays, sorting, graphs, dp = topics
+        dependency_service.add_dependency(sorting.id, graphs.id, min_skill_threshold=50.0)
+        
+        status = dependency_service.check_dependencies_satisfied(graphs.id)
+        assert status['all_satisfied'] is False
+        assert status['blocking_prerequisites'][0]['prerequisite_id'] == sorting.id
+        
+        storage.update_topic_skill(sorting.id, 55.0)
+        assert dependency_service.check_dependencies_satisfied(graphs.id)['all_satisfied'] is True
+        
+        SkillTrackingService(storage.db).record_skill_change(sorting.id, 45.0, "quiz")
+        status = dependency_service.check_dependencies_satisfied(graphs.id)
+        assert status['blocking_prerequisites'][0]['current_skill'] == 45.0
+    
+    def test_edge_removal_is_visible(self, dependency_service, topics):
+        arrays, sorting, graphs, dp = topics
+        dependency = dependency_service.add_dependency(graphs.id, dp.id)
+        assert len(dependency_service.get_prerequisites(dp.id)) == 1
+        assert dependency_service.get_dependents(graphs.id)[0]['dependent_id'] == dp.id
+        
+        dependency_service.remove_dependency(dependency.id)
+        
+        assert dependency_service.get_prerequisites(dp.id) == []
+        assert dependency_service.check_dependencies_satisfied(dp.id)['all_satisfied'] is True
+    
+    def test_learning_path_lists_prerequisites_first(self, dependency_service, topics):
+        arrays, sorting, graphs, dp = topics
+        dependency_service.add_dependency(arrays.id, sorting.id)
+        dependency_service.add_dependency(sorting.id, dp.id)
+        dependency_service.add_dependency(graphs.id, dp.id)
+        dependency_service.add_dependency(arrays.id, graphs.id)
+        
+        assert dependency_service.get_learning_path(dp.id) == [arrays.id, sorting.id, graphs.id, dp.id]
+    
+    def test_graph_is_shared_and_lookups_are_in_memory(self, storage, dependency_service, topics):
+        arrays, sorting, graphs, dp = topics
+        dependency_service.add_dependency(arrays.id, sorting.id)
+        other = DependencyService(storage.db)
+        assert other.graph is dependency_service.graph
+        
+        other.check_dependencies_satisfied(sorting.id)
+        queries = _count_queries(storage.db, lambda: [
+            other.check_dependencies_satisfied(topic.id) for topic in topics
+        ] + [other.get_learning_path(dp.id), other._would_create_cycle(dp.id, arrays.id)])
+        assert queries == 0
+    
+    def test_deleted_topic_is_dropped_from_graph(self, storage, dependency_service, topics):
+        arrays, sorting, graphs, dp = topics
+        dependency_service.add_dependency(arrays.id, sorting.id)
+        
+        storage.delete_topic(arrays.id)
+        
+        assert dependency_service.get_prerequisites(sorting.id) == []
+        assert arrays.id not in {node['id'] for node in dependency_service.get_dependency_graph()['nodes']}
@@ -381,6 +381,230 @@ class TestBrutalHonestyMode:
             assert normal_warnings[0] != brutal_warnings[0]
 
 
+class TestBatchHonestyAnalysis:
+    """The batched course analysis must match the per-topic detectors"""
+    
+    @pytest.fixture
+    def busy_course(self, db):
+        import random
+        from app.storage.database import CourseDB, TopicDB, StudySessionDB, SkillHistoryDB, QuizDB, QuizAttemptDB
+        
+        rng = random.Random(7)
+        now = datetime.now()
+        session = db.get_session()
+        try:
+            course = CourseDB(name="Busy Course", exam_date=now + timedelta(days=10))
+            other = CourseDB(name="Other Course", exam_date=now + timedelta(days=20))
+            session.add_all([course, other])
+            session.flush()
+            
+            for i in range(40):
+                topic = TopicDB(course_id=course.id if i < 30 else other.id, name=f"Topic {i}",
+                                weight=rng.choice([0.1, 0.2, 0.35, 0.5]), skill_level=rng.uniform(10, 95))
+                session.add(topic)
+                session.flush()
+                
+                for _ in range(rng.randint(0, 7)):
+                    start = now - timedelta(days=rng.uniform(0, 30))
+                    minutes = rng.choice([20.0, 45.0, 90.0])
+                    session.add(StudySessionDB(topic_id=topic.id, start_time=start,
+                                               end_time=start + timedelta(minutes=minutes),
+                                               duration_minutes=minutes))
+                for _ in range(rng.randint(0, 4)):
+                    previous = rng.uniform(10, 80)
+                    session.add(SkillHistoryDB(
+                        topic_id=topic.id, timestamp=now - timedelta(days=rng.uniform(0, 40)),
+                        previous_skill=previous, new_skill=previous + rng.uniform(-5, 25),
+                        reason=rng.choice(['self-assessment', 'quiz', 'manual'])
+                    ))
+                if rng.random() < 0.6:
+                    quiz = QuizDB(topic_id=topic.id, title=f"Quiz {i}", created_at=now - timedelta(days=40))
+                    session.add(quiz)
+                    session.flush()
+                    for _ in range(rng.randint(1, 5)):
+                        session.add(QuizAttemptDB(quiz_id=quiz.id, attempted_at=now - timedelta(days=rng.uniform(0, 30)),
+                                                  score=rng.uniform(20, 100), total_questions=10))
+            session.commit()
+            return course.id
+        finally:
+            session.close()
+    
+    def test_batch_matches_per_topic_detectors(self, db, honesty_service, busy_course):
+        from app.storage.database import TopicDB
+        
+        now = datetime.now()
+        batch = honesty_service.analyze_all_topics_honesty(busy_course, now=now)
+        
+        session = db.get_session()
+        try:
+            topic_ids = [t.id for t in session.query(TopicDB).filter(TopicDB.course_id == busy_course).order_by(TopicDB.id)]
+        finally:
+            session.close()
+        
+        fake = [honesty_service.detect_fake_productivity(t, now=now) for t in topic_ids]
+        avoidance = [honesty_service.detect_avoidance_patterns(t, now=now) for t in topic_ids]
+        overconfidence = [honesty_service.detect_overconfidence(t) for t in topic_ids]
+        
+        assert batch['fake_productivity'] == [r for r in fake if r['suspicious']]
+        assert batch['avoidance'] == [r for r in avoidance if r['avoided']]
+        assert batch['overconfidence'] == [r for r in overconfidence if r['overconfident']]
+        assert batch['fake_productivity'] and batch['avoidance'] and batch['overconfidence']
+    
+    def test_batch_query_count_is_constant(self, db, honesty_service, busy_course):
+        from sqlalchemy import event
+        from app.services.course_versions import CourseVersions
+        
+        # The feature store's version check loads the topic/quiz maps once per database
+        CourseVersions.for_database(db).version(None)
+        statements = []
+        
+        def before_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        
+        event.listen(db.engine, "before_cursor_execute", before_execute)
+        try:
+            honesty_service.analyze_all_topics_honesty(busy_course)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", before_execute)
+        
+        # topics, sessions, skill history, quiz attempts, effective skills
+        assert len(statements) == 5
+
+
+class TestTopicFeatureStore:
+    """Shared per-course feature frames"""
+    
+    def test_reprioritization_check_builds_one_frame(self, db, reprioritization_engine, sample_topics, monkeypatch):
+        from app.services.feature_store import TopicFeatureStore
+        
+        store = TopicFeatureStore.for_database(db)
+        assert reprioritization_engine.exam_sim_service.feature_store is store
+        assert reprioritization_engine.honesty_service.feature_store is store
+        
+        builds = []
+        build = store._build
+        monkeypatch.setattr(store, '_build', lambda *args: builds.append(args) or build(*args))
+        reprioritization_engine.check_forced_reprioritization(sample_topics[0].course_id)
+        
+        assert len(builds) == 1
+    
+    def test_writes_invalidate_frames(self, db, sample_topics):
+        from app.services.feature_store import TopicFeatureStore
+        from app.services.study_session_service import StudySessionService
+        
+        store = TopicFeatureStore.for_database(db)
+        course_id = sample_topics[0].course_id
+        as_of = datetime.now() + timedelta(hours=1)
+        
+        frame = store.frame(course_id, as_of)
+        assert store.frame(course_id, as_of) is frame
+        assert frame.study_minutes(7).tolist() == [0, 0, 0]
+        
+        sessions = StudySessionService(db)
+        sessions.end_session(sessions.start_session(sample_topics[1].id).id)
+        
+        refreshed = store.frame(course_id, as_of)
+        assert refreshed is not frame
+        assert refreshed.session_counts(7).tolist() == [0, 1, 0]
+        with pytest.raises(ValueError):
+            refreshed.study_minutes(60)
+    
+    
+    def test_frames_are_reused_only_near_their_as_of(self, db, sample_topics):
+        from app.services.feature_store import TopicFeatureStore
+        
+        store = TopicFeatureStore.for_database(db)
+        course_id = sample_topics[0].course_id
+        as_of = datetime.now()
+        
+        frame = store.frame(course_id, as_of)
+        assert store.frame(course_id, as_of + timedelta(seconds=30)) is frame
+        
+        later = store.frame(course_id, as_of + timedelta(hours=9))
+        assert later is not frame
+        assert later.as_of == as_of + timedelta(hours=9)
+    
+    def test_frame_built_during_a_write_is_not_cached(self, db, sample_topics, monkeypatch):
+        from app.services.feature_store import TopicFeatureStore
+        from app.services.study_session_service import StudySessionService
+        
+        store = TopicFeatureStore.for_database(db)
+        course_id = sample_topics[0].course_id
+        sessions = StudySessionService(db)
+        as_of = datetime.now() + timedelta(minutes=5)
+        build = store._build
+        
+        def build_racing_a_write(*args):
+            frame = build(*args)
+            sessions.end_session(sessions.start_session(sample_topics[1].id).id)
+            return frame
+        
+        monkeypatch.setattr(store, '_build', build_racing_a_write)
+        stale = store.frame(course_id, as_of)
+        monkeypatch.setattr(store, '_build', build)
+        
+        assert stale.session_counts(7).tolist() == [0, 0, 0]
+        assert store.frame(course_id, as_of).session_counts(7).tolist() == [0, 1, 0]
+
+
+class TestReprioritizationCache:
+    """Reprioritization results are cached per course state version"""
+    
+    def test_repeated_checks_reuse_result_until_course_changes(self, db, consequence_engine, sample_topics, monkeypatch):
+        from app.storage.database import CourseDB, TopicDB
+        from app.services.study_session_service import StudySessionService
+        
+        engine = consequence_engine.reprioritization
+        evaluations = []
+        evaluate = engine._evaluate_forced_reprioritization
+        monkeypatch.setattr(engine, '_evaluate_forced_reprioritization',
+                            lambda course_id: evaluations.append(course_id) or evaluate(course_id))
+        
+        course_id = sample_topics[0].course_id
+        consequence_engine.check_lockouts(course_id, 'study_easy_topic')
+        consequence_engine.get_active_consequences(course_id)
+        engine.check_forced_reprioritization(course_id)['overrides'].clear()
+        assert evaluations == [course_id]
+        assert engine.check_forced_reprioritization(course_id)['overrides']
+        
+        # Writes to another course leave the cached result alone
+        session = db.get_session()
+        try:
+            other = CourseDB(name="Other", exam_date=datetime.now() + timedelta(days=50))
+            session.add(other)
+            session.flush()
+            session.add(TopicDB(course_id=other.id, name="Elsewhere", weight=0.5, skill_level=50.0))
+            session.commit()
+        finally:
+            session.close()
+        engine.check_forced_reprioritization(course_id)
+        assert evaluations == [course_id]
+        
+        sessions = StudySessionService(db)
+        sessions.start_session(sample_topics[2].id)
+        engine.check_forced_reprioritization(course_id)
+        assert evaluations == [course_id, course_id]
+    
+    def test_quiz_attempts_bump_their_course(self, db, sample_topics):
+        from app.services.course_versions import CourseVersions
+        from app.services.quiz_service import QuizService
+        from app.models.models import Quiz, QuizQuestion
+        
+        versions = CourseVersions.for_database(db)
+        course_id = sample_topics[0].course_id
+        quizzes = QuizService(db)
+        quiz = quizzes.create_quiz(Quiz(
+            topic_id=sample_topics[0].id, title="Check", created_at=datetime.now(),
+            questions=[QuizQuestion(question_text="Q", option_a="1", option_b="2",
+                                    option_c="3", option_d="4", correct_answer="A")]
+        ))
+        
+        before = versions.version(course_id)
+        quizzes.submit_quiz_attempt(quiz.id, {})
+        
+        assert versions.version(course_id) > before
+
+
 class TestForcedReprioritization:
     """Tests for TICKET-405: Forced Re-Prioritization Engine"""
     
@@ -450,6 +674,37 @@ class TestForcedReprioritization:
         # Check that critical_prerequisites trigger is present
         triggers = [o['trigger'] for o in result['overrides']]
         assert 'critical_prerequisites' in triggers
+    
+    
+    def test_triggers_read_effective_skill(self, db, reprioritization_engine):
+        from app.storage.database import CourseDB, TopicDB, StudySessionDB
+        
+        now = datetime.now()
+        session = db.get_session()
+        try:
+            course = CourseDB(name="Decayed Course", exam_date=now + timedelta(days=20))
+            session.add(course)
+            session.flush()
+            # Stored skills clear both thresholds; 40 idle days decay them below
+            topics = [
+                TopicDB(course_id=course.id, name="Faded Prerequisite", weight=0.4, skill_level=50.0),
+                TopicDB(course_id=course.id, name="Faded Strength", weight=0.3, skill_level=85.0),
+            ]
+            session.add_all(topics)
+            session.flush()
+            for topic in topics:
+                session.add(StudySessionDB(topic_id=topic.id, start_time=now - timedelta(days=40, hours=1),
+                                           end_time=now - timedelta(days=40), duration_minutes=60.0))
+            session.commit()
+            session.refresh(course)
+        finally:
+            session.close()
+        
+        result = reprioritization_engine.check_forced_reprioritization(course.id)
+        
+        override = next(o for o in result['overrides'] if o['trigger'] == 'critical_prerequisites')
+        assert override['mandatory_topics'] == ["Faded Prerequisite"]
+        assert "Faded Strength" not in override['locked_topics']
 
 
 class TestExamSimulation:
@@ -496,6 +751,219 @@ class TestExamSimulation:
         
         # Score should be influenced by quiz
         assert result['estimated_score'] > 0
+    
+    def test_monte_carlo_distribution(self, db, exam_sim_service, sample_course, sample_topics):
+        """Monte Carlo simulation is centered on the point estimate and reproducible with a seed"""
+        point = exam_sim_service.simulate_exam_today(sample_course.id)
+        result = exam_sim_service.simulate_exam_distribution(sample_course.id, samples=50_000, seed=3)
+        
+        assert result == exam_sim_service.simulate_exam_distribution(sample_course.id, samples=50_000, seed=3)
+        assert result['samples'] == 50_000
+        percentiles = list(result['percentiles'].values())
+        assert percentiles == sorted(percentiles)
+        # Untested topics are wide but clipped at 0, which lifts the mean above the point estimate
+        from app.services.exam_simulation_service import clipped_normal_moments
+        frame = exam_sim_service.feature_store.frame(sample_course.id)
+        expected = sum(
+            weight * clipped_normal_moments(skill * 0.6, exam_sim_service.untested_score_std)[0]
+            for weight, skill in zip(frame.weights, frame.effective_skill)
+        ) / frame.weights.sum()
+        assert result['mean_score'] == pytest.approx(expected, abs=0.2)
+        assert result['mean_score'] > point['estimated_score']
+        assert 0 <= result['pass_probability'] <= 100
+        
+        sensitivity = result['topic_sensitivity']
+        assert {t['topic_id'] for t in sensitivity} == {t.id for t in sample_topics}
+        assert sum(t['variance_share'] for t in sensitivity) == pytest.approx(1.0)
+        assert all(t['score_std'] == exam_sim_service.untested_score_std for t in sensitivity)
+    
+    def test_monte_carlo_matches_clipped_normal_moments(self):
+        import numpy as np
+        from app.services.exam_simulation_service import sample_exam_scores, clipped_normal_moments
+        
+        result = sample_exam_scores(np.array([10.0]), np.array([20.0]), np.array([1.0]),
+                                    threshold=20.0, samples=200_000, rng=np.random.default_rng(0))
+        mean, variance = clipped_normal_moments(10.0, 20.0)
+        
+        assert result['mean_score'] == pytest.approx(mean, abs=0.1)
+        assert result['std_score'] == pytest.approx(variance ** 0.5, abs=0.1)
+        # P(X >= 20) for N(10, 20) and +10 points makes every sample above 10 pass
+        assert result['pass_probability'] == pytest.approx(30.85, abs=0.5)
+        assert result['pass_probability_gain'][0] == pytest.approx(50.0 - 30.85, abs=0.5)
+    
+    def test_all_exams_match_single_course_simulation(self, db, exam_sim_service, sample_course, sample_topics):
+        from sqlalchemy import event
+        from app.storage.database import CourseDB, QuizDB, QuizAttemptDB
+        
+        now = datetime.now()
+        session = db.get_session()
+        try:
+            session.add(CourseDB(name="Empty", exam_date=now + timedelta(days=10)))
+            quiz = QuizDB(topic_id=sample_topics[0].id, title="Quiz", created_at=now - timedelta(days=9))
+            session.add(quiz)
+            session.flush()
+            for days_ago, score in [(8, 20.0), (6, 90.0), (4, 70.0), (2, 40.0)]:
+                session.add(QuizAttemptDB(quiz_id=quiz.id, attempted_at=now - timedelta(days=days_ago),
+                                          score=score, total_questions=10))
+            session.commit()
+        finally:
+            session.close()
+        
+        statements = []
+        
+        def before_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        
+        event.listen(db.engine, "before_cursor_execute", before_execute)
+        try:
+            results = exam_sim_service.simulate_all_exams(as_of=now)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", before_execute)
+        
+        # courses, topics, effective skills, latest attempts per topic
+        assert len(statements) == 4
+        assert results[0] == exam_sim_service.simulate_exam_today(sample_course.id, as_of=now)
+        assert results[1]['error'] == 'No topics found'
+    
+    def test_all_exams_cached_until_next_quiz_attempt_or_skill_change(self, db, exam_sim_service, sample_topics, monkeypatch):
+        from app.services.skill_tracking_service import SkillTrackingService
+        from app.storage.database import QuizDB, QuizAttemptDB
+        
+        loads = []
+        simulate = exam_sim_service._simulate_all_exams
+        monkeypatch.setattr(exam_sim_service, '_simulate_all_exams',
+                            lambda as_of: loads.append(as_of) or simulate(as_of))
+        
+        first = exam_sim_service.simulate_all_exams()
+        first[0]['weakest_topics'].clear()
+        assert exam_sim_service.simulate_all_exams()[0]['weakest_topics']
+        assert len(loads) == 1
+        
+        session = db.get_session()
+        try:
+            quiz = QuizDB(topic_id=sample_topics[1].id, title="Quiz", created_at=datetime.now())
+            session.add(quiz)
+            session.flush()
+            session.add(QuizAttemptDB(quiz_id=quiz.id, attempted_at=datetime.now(), score=95.0, total_questions=10))
+            session.commit()
+        finally:
+            session.close()
+        exam_sim_service.simulate_all_exams()
+        assert len(loads) == 2
+        
+        SkillTrackingService(db).record_skill_change(sample_topics[2].id, 90.0, "quiz")
+        assert exam_sim_service.simulate_all_exams()[0]['estimated_score'] > first[0]['estimated_score']
+        assert len(loads) == 3
+    
+    def test_all_exams_cache_invalidated_by_quiz_deletion(self, db, exam_sim_service, sample_topics):
+        from app.services.quiz_service import QuizService
+        from app.models.models import Quiz, QuizQuestion
+        
+        before = exam_sim_service.simulate_all_exams()[0]['estimated_score']
+        quizzes = QuizService(db)
+        question = QuizQuestion(question_text="Q", option_a="1", option_b="2",
+                                option_c="3", option_d="4", correct_answer="A")
+        quiz = quizzes.get_quiz(quizzes.create_quiz(Quiz(
+            topic_id=sample_topics[0].id, title="Quiz", created_at=datetime.now(), questions=[question]
+        )).id)
+        quizzes.submit_quiz_attempt(quiz.id, {quiz.questions[0].id: "A"})
+        assert exam_sim_service.simulate_all_exams()[0]['estimated_score'] != before
+        
+        quizzes.delete_quiz(quiz.id)
+        assert exam_sim_service.simulate_all_exams()[0]['estimated_score'] == before
+
+
+class TestRealityDashboard:
+    """Tests for TICKET-407: Motivation vs Reality Dashboard"""
+    
+    @pytest.fixture
+    def activity(self, db, sample_topics):
+        from app.storage.database import StudySessionDB, SkillHistoryDB, QuizDB, QuizAttemptDB
+        
+        now = datetime.now()
+        session = db.get_session()
+        try:
+            for days_ago, minutes in [(2, 90.0), (5, 60.0), (10, 120.0)]:
+                start = now - timedelta(days=days_ago)
+                session.add(StudySessionDB(topic_id=sample_topics[0].id, start_time=start,
+                                           end_time=start + timedelta(minutes=minutes), duration_minutes=minutes))
+            session.add(StudySessionDB(topic_id=sample_topics[1].id, start_time=now - timedelta(days=1)))
+            for days_ago, previous, new in [(9, 20.0, 25.0), (4, 25.0, 28.0), (1, 28.0, 30.0)]:
+                session.add(SkillHistoryDB(topic_id=sample_topics[0].id, timestamp=now - timedelta(days=days_ago),
+                                           previous_skill=previous, new_skill=new, reason="study"))
+            quiz = QuizDB(topic_id=sample_topics[0].id, title="Quiz", created_at=now - timedelta(days=12))
+            session.add(quiz)
+            session.flush()
+            for days_ago, score in [(11, 10.0), (3, 40.0), (2, 50.0)]:
+                session.add(QuizAttemptDB(quiz_id=quiz.id, attempted_at=now - timedelta(days=days_ago),
+                                          score=score, total_questions=10))
+            session.commit()
+        finally:
+            session.close()
+        return now
+    
+    def test_dashboard_aggregates_course_in_four_statements(self, db, exam_sim_service, sample_course, activity):
+        from sqlalchemy import event
+        
+        statements = []
+        
+        def before_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        
+        event.listen(db.engine, "before_cursor_execute", before_execute)
+        try:
+            dashboard = exam_sim_service.get_motivation_vs_reality_dashboard(sample_course.id, as_of=activity)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", before_execute)
+        
+        # course, topic aggregates, skill history window, effective skills
+        assert len(statements) == 4
+        topics = {t['topic_name']: t for t in dashboard['topics']}
+        assert topics["Topic A"]['time_spent_hours'] == 4.5
+        assert topics["Topic A"]['skill_gain'] == 10.0
+        assert topics["Topic A"]['avg_quiz_score'] == pytest.approx(33.33)
+        # Unfinished sessions do not count
+        assert topics["Topic B"]['time_spent_hours'] == 0
+        assert topics["Topic B"]['avg_quiz_score'] is None
+        assert dashboard['total_time_hours'] == 4.5
+    
+    def test_dashboard_over_arbitrary_window(self, exam_sim_service, sample_course, activity):
+        dashboard = exam_sim_service.get_motivation_vs_reality_dashboard(
+            sample_course.id, start=activity - timedelta(days=7), as_of=activity - timedelta(days=1, hours=12)
+        )
+        
+        assert dashboard['days_analyzed'] == 5
+        topic = next(t for t in dashboard['topics'] if t['topic_name'] == "Topic A")
+        assert topic['time_spent_hours'] == 2.5
+        assert topic['skill_gain'] == 3.0
+        assert topic['avg_quiz_score'] == 45.0
+        
+        with pytest.raises(ValueError):
+            exam_sim_service.get_motivation_vs_reality_dashboard(
+                sample_course.id, start=activity, as_of=activity - timedelta(days=1)
+            )
+    
+    def test_dashboard_reads_effective_skill(self, db, exam_sim_service, sample_course, sample_topics):
+        from app.storage.database import QuizDB, QuizAttemptDB
+        
+        now = datetime.now()
+        session = db.get_session()
+        try:
+            quiz = QuizDB(topic_id=sample_topics[2].id, title="Quiz", created_at=now - timedelta(days=21))
+            session.add(quiz)
+            session.flush()
+            session.add(QuizAttemptDB(quiz_id=quiz.id, attempted_at=now - timedelta(days=20),
+                                      score=30.0, total_questions=10))
+            session.commit()
+        finally:
+            session.close()
+        
+        dashboard = exam_sim_service.get_motivation_vs_reality_dashboard(sample_course.id)
+        
+        # 20 days since the attempt -> 13 decay days at 0.5
+        topic = next(t for t in dashboard['topics'] if t['topic_name'] == "Topic C")
+        assert topic['current_skill'] == pytest.approx(43.5)
+        assert topic['reality_gap'] == pytest.approx(13.5)
 
 
 class TestConsequenceEngine:
@@ -0,0 +1,409 @@
+"""
+Unit tests for the planner: snapshot loading and priority calculation
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from app.storage.storage_service import StorageService
+from app.storage.database import CourseDB, TopicDB, SkillHistoryDB, StudySessionDB
+from app.storage.topic_stats import rebuild as rebuild_topic_stats
+from app.services.planner_service import PlannerService
+
+
+@pytest.fixture
+def storage():
+    return StorageService(":memory:")
+
+
+@pytest.fixture
+def planner(storage):
+    return PlannerService(storage)
+
+
+def _seed(storage, courses=2, topics_per_course=5):
+    session = storage.db.get_session()
+    try:
+        now = datetime.now()
+        for c in range(courses):
+            course = CourseDB(name=f"Course {c}", exam_date=now + timedelta(days=10 + c * 30))
+            session.add(course)
+            session.flush()
+            for t in range(topics_per_course):
+                topic = TopicDB(course_id=course.id, name=f"Topic {c}.{t}",
+                                weight=0.1 + 0.05 * (t % 5), skill_level=20.0 + 7 * (t % 10))
+                session.add(topic)
+                session.flush()
+                for h in range(t + 1):
+                    session.add(SkillHistoryDB(
+                        topic_id=topic.id,
+                        timestamp=now - timedelta(days=10 - h),
+                        previous_skill=40.0 + h,
+                        new_skill=40.0 + h + (3 if t % 2 else -4),
+                        reason="quiz"
+                    ))
+                session.add(StudySessionDB(
+                    topic_id=topic.id,
+                    start_time=now - timedelta(days=2),
+                    end_time=now - timedelta(days=2) + timedelta(minutes=30 * t),
+                    duration_minutes=30.0 * t
+                ))
+        session.commit()
+        # Raw inserts bypass the services that maintain the rollups
+        rebuild_topic_stats(session.connection())
+        session.commit()
+    finally:
+        session.close()
+
+
+def _count_queries(storage, fn):
+    statements = []
+    
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    event.listen(storage.db.engine, "before_cursor_execute", before_execute)
+    try:
+        fn()
+    finally:
+        event.remove(storage.db.engine, "before_cursor_execute", before_execute)
+    return len(statements)
+
+
+class TestPlanningSnapshot:
+    def test_snapshot_aggregates(self, storage):
+        _seed(storage, courses=1, topics_per_course=3)
+        snapshot = storage.get_planning_snapshot()
+        
+        assert len(snapshot.courses) == 1
+        assert [t.name for t in snapshot.topics] == ["Topic 0.0", "Topic 0.1", "Topic 0.2"]
+        
+        first, second, third = snapshot.topics
+        # A single history entry is not enough for a trend
+        assert snapshot.get_skill_trend(first.id) == 0
+        # Newest new_skill minus oldest previous_skill over the last five entries
+        assert snapshot.get_skill_trend(second.id) == pytest.approx(44.0 - 40.0)
+        assert snapshot.get_skill_trend(third.id) == pytest.approx(38.0 - 40.0)
+        assert snapshot.get_recent_study_time(third.id) == pytest.approx(60.0)
+        assert first.id in snapshot.last_session_end
+    
+    def test_query_count_does_not_grow_with_topics(self, storage, planner):
+        _seed(storage, courses=1, topics_per_course=2)
+        small = _count_queries(storage, planner.calculate_adaptive_priorities)
+        
+        _seed(storage, courses=4, topics_per_course=10)
+        large = _count_queries(storage, planner.calculate_adaptive_priorities)
+        
+        assert small == large
+    
+    def test_adaptive_priorities_apply_trend_and_time(self, storage, planner):
+        _seed(storage, courses=1, topics_per_course=3)
+        base = {p.topic.id: p.priority_score for p in planner.calculate_all_priorities()}
+        adaptive = {p.topic.id: p.priority_score for p in planner.calculate_adaptive_priorities()}
+        
+        snapshot = storage.get_planning_snapshot()
+        trends, minutes = snapshot.activity_columns()
+        multipliers = planner._adaptive_multipliers(trends, minutes)
+        for topic, multiplier in zip(snapshot.topics, multipliers):
+            assert adaptive[topic.id] == pytest.approx(base[topic.id] * multiplier)
+    
+    def test_priorities_sorted_descending(self, storage, planner):
+        _seed(storage)
+        scores = [p.priority_score for p in planner.calculate_adaptive_priorities()]
+        assert scores == sorted(scores, reverse=True)
+
+
+class TestBatchPriorities:
+    def test_batch_matches_per_topic_calculation(self, storage, planner):
+        _seed(storage, courses=3, topics_per_course=6)
+        snapshot = storage.get_planning_snapshot(include_activity=False)
+        
+        expected = planner.priority_calculator.sort_by_priority([
+            planner.priority_calculator.calculate_priority(topic, course)
+            for topic, course in snapshot.iter_topics()
+        ])
+        actual = planner.calculate_all_priorities(snapshot)
+        
+        assert [p.topic.id for p in actual] == [p.topic.id for p in expected]
+        for a, e in zip(actual, expected):
+            assert a.priority_score == pytest.approx(e.priority_score)
+            assert a.urgency_factor == e.urgency_factor
+            assert a.course.id == e.course.id
+    
+    def test_top_k_returns_highest_scores_in_order(self, storage, planner):
+        _seed(storage, courses=2, topics_per_course=8)
+        snapshot = storage.get_planning_snapshot(include_activity=False)
+        course_index, weights, skills = snapshot.columns()
+        
+        full = planner.priority_calculator.calculate_priorities_batch(
+            snapshot.topics, snapshot.courses, course_index, weights, skills
+        )
+        top = planner.priority_calculator.calculate_priorities_batch(
+            snapshot.topics, snapshot.courses, course_index, weights, skills, top_k=5
+        )
+        
+        assert [p.topic.id for p in top] == [p.topic.id for p in full[:5]]
+    
+    def test_urgency_from_days_matches_scalar_rules(self):
+        from app.planner.priority_calculator import PriorityCalculator
+        
+        days = [-3, 0, 6, 7, 30, 31, 90]
+        expected = [3.0, 3.0, 3.0, 2.0, 2.0, 1.0, 1.0]
+        assert PriorityCalculator.urgency_from_days(days).tolist() == expected
+
+
+class TestDecisionLogSink:
+    def test_plan_decisions_are_written_in_one_transaction(self, storage, planner):
+        _seed(storage, courses=2, topics_per_course=5)
+        commits = []
+        event.listen(storage.db.engine, "commit", lambda conn: commits.append(conn))
+        
+        plan = planner.generate_daily_plan(3.0)
+        
+        decisions = planner.decision_service.get_recent_decisions(limit=100)
+        assert len(decisions) >= len(plan.allocated_topics)
+        assert len(commits) == 1
+        assert planner.decision_service.sink.stats()['pending'] == 0
+    
+    def test_metadata_round_trips(self, storage, planner):
+        planner.decision_service.log_decision('time_allocated', 'Allocated 1.0h', None, {'allocated_hours': 1.0})
+        
+        decision = planner.decision_service.get_recent_decisions(limit=1)[0]
+        assert decision['metadata'] == {'allocated_hours': 1.0}
+    
+    def test_size_threshold_and_bounded_queue(self, storage):
+        from app.services.decision_service import DecisionLogSink
+        
+        sink = DecisionLogSink(storage.db, flush_size=3, flush_interval=3600, max_queue=4)
+        row = {'timestamp': datetime.now(), 'decision_type': 'test', 'topic_id': None,
+               'explanation': 'x', 'meta_data': None}
+        
+        for _ in range(2):
+            sink.add(dict(row))
+        assert sink.stats() == {'pending': 2, 'flushed': 0, 'dropped': 0}
+        
+        sink.add(dict(row))
+        assert sink.stats() == {'pending': 0, 'flushed': 3, 'dropped': 0}
+        
+        sink.flush_size = 100
+        results = [sink.add(dict(row)) for _ in range(6)]
+        assert results.count(False) == 2
+        assert sink.stats()['dropped'] == 2
+        assert sink.flush() == 4
+    
+    def test_quiet_buffer_is_flushed_after_the_interval(self, tmp_path):
+        import time
+        from app.services.decision_service import DecisionLogSink
+        
+        storage = StorageService(str(tmp_path / "planner.db"))
+        sink = DecisionLogSink(storage.db, flush_size=100, flush_interval=0.2)
+        sink.add({'timestamp': datetime.now(), 'decision_type': 'test', 'topic_id': None,
+                  'explanation': 'x', 'meta_data': None})
+        
+        deadline = time.monotonic() + 5
+        while not sink.stats()['flushed'] and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert sink.stats() == {'pending': 0, 'flushed': 1, 'dropped': 0}
+    
+    def test_flush_is_not_rolled_back_with_the_unit_of_work(self, tmp_path):
+        from app.services.decision_service import DecisionService
+        from app.storage.unit_of_work import unit_of_work
+        
+        storage = StorageService(str(tmp_path / "planner.db"))
+        service = DecisionService(storage.db)
+        # Buffered by another request, flushed by this one
+        service.sink.add({'timestamp': datetime.now(), 'decision_type': 'other', 'topic_id': None,
+                          'explanation': 'x', 'meta_data': None})
+        
+        with unit_of_work(storage.db) as work:
+            with service.batch():
+                service.log_decision('time_allocated', 'Allocated 1.0h')
+            work.rollback()
+        
+        assert service.sink.stats()['pending'] == 0
+        assert len(service.get_recent_decisions(limit=10)) == 2
+    
+    def test_failed_flush_at_batch_exit_keeps_rows_queued(self, storage, caplog):
+        from app.services.decision_service import DecisionService
+        
+        service = DecisionService(storage.db)
+        
+        def fail_decision_inserts(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith("INSERT INTO decision_logs"):
+                raise RuntimeError("disk full")
+        
+        event.listen(storage.db.engine, "before_cursor_execute", fail_decision_inserts)
+        try:
+            with service.batch():
+                service.log_decision('time_allocated', 'Allocated 1.0h')
+        finally:
+            event.remove(storage.db.engine, "before_cursor_execute", fail_decision_inserts)
+        
+        assert "Flushing decision logs failed" in caplog.text
+        assert service.sink.stats()['pending'] == 1
+        assert service.sink.flush() == 1
+
+
+class TestScenarioSimulation:
+    def test_scenarios_do_not_write_decision_logs(self, storage, planner):
+        _seed(storage, courses=2, topics_per_course=5)
+        
+        comparison = planner.simulate_scenario('compare_strategies', available_hours=3.0)
+        hours = planner.simulate_scenario('hours_change', current_hours=2.0, new_hours=4.0)
+        
+        assert planner.decision_service.get_recent_decisions(limit=100) == []
+        assert comparison['simulated_decisions']
+        assert {d['decision_type'] for d in hours['simulated_decisions']} <= {
+            'time_allocated', 'topic_dropped', 'dependency_block', 'prerequisite_boost'
+        }
+    
+    def test_dry_run_is_scoped_to_the_block(self, storage, planner):
+        _seed(storage, courses=1, topics_per_course=3)
+        engine = planner.optimization_engine
+        priorities = planner.calculate_all_priorities()
+        
+        with engine.dry_run() as decisions:
+            engine.optimize_time_allocation(priorities, 2.0)
+        engine.optimize_time_allocation(priorities, 2.0)
+        
+        logged = planner.decision_service.get_recent_decisions(limit=100)
+        assert len(decisions) == len(logged) > 0
+    
+    def test_skill_overlay_matches_copied_topics(self, storage, planner):
+        from app.services.optimization_service import SkillOverlay
+        
+        _seed(storage, courses=2, topics_per_course=5)
+        snapshot = storage.get_planning_snapshot()
+        priorities = planner.calculate_all_priorities(snapshot)
+        engine = planner.optimization_engine
+        with engine.dry_run():
+            allocation = engine.optimize_time_allocation(priorities, 3.0)
+        
+        overlay = SkillOverlay.from_allocation(allocation)
+        copied = [t.model_copy() for t in snapshot.topics]
+        for topic in copied:
+            if topic.id in overlay:
+                topic.skill_level = overlay.skill_of(topic)
+        
+        assert len(overlay) == len(allocation)
+        assert engine.calculate_expected_score(snapshot.topics, snapshot.courses, overlay) == \
+            engine.calculate_expected_score(copied, snapshot.courses)
+        assert [t.skill_level for t in snapshot.topics] == [t.skill_level for t in storage.get_planning_snapshot().topics]
+    
+    def test_sweep_matches_individual_scenarios(self, storage, planner):
+        from app.planner.priority_calculator import PriorityCalculator
+        
+        _seed(storage, courses=2, topics_per_course=6)
+        hours = [0.5, 2.0, 3.5, 8.0]
+        shifts = [-35, -10, 0, 25]
+        snapshot = storage.get_planning_snapshot()
+        course_id = snapshot.courses[1].id
+        
+        result = planner.simulate_sweep(hours, shifts, course_id)
+        
+        course_index, weights, skills = snapshot.columns()
+        multipliers = planner._adaptive_multipliers(*snapshot.activity_columns())
+        for i, shift in enumerate(shifts):
+            courses = [
+                c.model_copy(update={'exam_date': c.exam_date + timedelta(days=shift)}) if c.id == course_id else c
+                for c in snapshot.courses
+            ]
+            priorities = PriorityCalculator.calculate_priorities_batch(
+                snapshot.topics, courses, course_index, weights, skills, multipliers, now=snapshot.now
+            )
+            for j, h in enumerate(hours):
+                expected = planner.scenario_simulator.simulate_study_hours_change(
+                    snapshot.topics, courses, priorities, h, h
+                )
+                for cid, score in expected['simulated_expected_scores'].items():
+                    assert result['expected_scores'][cid]['surface'][i][j] == pytest.approx(score['estimated_score'], abs=0.11)
+                assert result['topics_covered'][i][j] == expected['new_topics_covered']
+    
+    def test_sweep_rejects_oversized_grid(self, storage, planner):
+        _seed(storage, courses=1, topics_per_course=2)
+        
+        with pytest.raises(ValueError):
+            planner.simulate_sweep([1.0] * 200, list(range(100)))
+    
+    def test_parallel_strategies_match_serial(self, storage, planner):
+        import multiprocessing
+        from app.services.strategies import STRATEGIES, register_strategy
+        
+        _seed(storage, courses=2, topics_per_course=6)
+        register_strategy('heaviest_first', 'Heaviest First', 'Largest weight first',
+                          _heaviest_first, reverse=True)
+        register_strategy('lightest_first', 'Lightest First', 'Smallest weight first',
+                          lambda t: t.weight)
+        simulator = planner.scenario_simulator
+        try:
+            serial = planner.simulate_scenario('compare_strategies', available_hours=4.0)
+            simulator.max_workers = 2
+            simulator.PARALLEL_MIN_TOPICS = 0
+            before = {p.pid for p in multiprocessing.active_children()}
+            parallel = planner.simulate_scenario('compare_strategies', available_hours=4.0)
+            workers = {p.pid for p in multiprocessing.active_children()} - before
+            again = planner.simulate_scenario('compare_strategies', available_hours=4.0)
+            workers_again = {p.pid for p in multiprocessing.active_children()} - before
+        finally:
+            del STRATEGIES['heaviest_first']
+            del STRATEGIES['lightest_first']
+            simulator._strategy_pool.close()
+        
+        assert set(parallel['strategies']) >= {'balanced', 'high_weight_focus', 'weak_focus',
+                                               'dependency_first', 'heaviest_first', 'lightest_first'}
+        assert parallel['strategies'] == serial['strategies'] == again['strategies']
+        assert parallel['simulated_decisions'] == serial['simulated_decisions']
+        assert parallel['best_strategy'] == serial['best_strategy']
+        # One long-lived pool serves both calls
+        assert len(workers) == 2
+        assert workers_again == workers
+    
+    def test_strategy_timeout_terminates_its_worker(self, storage, planner):
+        import multiprocessing
+        from app.services.strategies import STRATEGIES, register_strategy
+        
+        _seed(storage, courses=1, topics_per_course=3)
+        register_strategy('stalled', 'Stalled', 'Never finishes', _stall)
+        simulator = planner.scenario_simulator
+        simulator.max_workers = 2
+        simulator.PARALLEL_MIN_TOPICS = 0
+        simulator.strategy_timeout = 1.0
+        before = {p.pid for p in multiprocessing.active_children()}
+        try:
+            result = planner.simulate_scenario('compare_strategies', available_hours=4.0)
+        finally:
+            del STRATEGIES['stalled']
+        
+        assert result['strategies']['stalled']['error'] == "Timed out after 1.0s"
+        assert 'error' not in result['strategies']['balanced']
+        assert {p.pid for p in multiprocessing.active_children()} <= before
+
+
+def _heaviest_first(topic):
+    return topic.weight
+
+
+def _stall(topic):
+    import time
+    time.sleep(60)
+    return 0
+
+
+class TestStudyPlan:
+    def test_json_matches_response_model(self, storage, planner):
+        import json
+        from app.api.server import StudyPlanResponse
+        from app.planner.study_plan_generator import StudyPlanGenerator
+        
+        _seed(storage, courses=2, topics_per_course=5)
+        plan = planner.generate_daily_plan(6.0)
+        assert len(plan) > 1
+        assert set(plan.topics) == {entry.topic_id for entry in plan}
+        assert set(plan.courses) == {entry.course_id for entry in plan}
+        
+        expected = StudyPlanResponse(daily_hours=plan.daily_hours, allocated_topics=plan.allocated_topics)
+        assert json.loads(plan.to_json()) == expected.model_dump(mode='json')
+        
+        # The non-optimized generator builds the same structure
+        unoptimized = StudyPlanGenerator.generate_daily_plan(planner.calculate_all_priorities(), 6.0)
+        assert json.loads(unoptimized.to_json())['allocated_topics'][0]['topic']['id'] in unoptimized.topics
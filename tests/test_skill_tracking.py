@@ -0,0 +1,167 @@
+"""
+Unit tests for skill tracking and skill decay
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from app.storage.storage_service import StorageService
+from app.storage.database import StudySessionDB
+from app.services.skill_tracking_service import SkillTrackingService
+from app.services.dependency_service import DependencyService
+from app.models.models import Course, Topic
+
+
+@pytest.fixture
+def storage():
+    return StorageService(":memory:")
+
+
+@pytest.fixture
+def skill_tracking(storage):
+    return SkillTrackingService(storage.db)
+
+
+@pytest.fixture
+def topics(storage):
+    course = storage.create_course(Course(name="Statistics", exam_date=datetime.now() + timedelta(days=30)))
+    topics = [
+        storage.create_topic(Topic(course_id=course.id, name=name, weight=0.2, skill_level=skill))
+        for name, skill in [("Recent", 60.0), ("Stale", 60.0), ("Never Studied", 50.0),
+                            ("Barely Stale", 60.0), ("Zero Skill", 0.0)]
+    ]
+    
+    now = datetime.now()
+    session = storage.db.get_session()
+    try:
+        for topic, days_ago in [(topics[0], 2), (topics[1], 20), (topics[1], 40), (topics[3], 7.5)]:
+            session.add(StudySessionDB(
+                topic_id=topic.id,
+                start_time=now - timedelta(days=days_ago, hours=1),
+                end_time=now - timedelta(days=days_ago),
+                duration_minutes=60.0
+            ))
+        session.commit()
+    finally:
+        session.close()
+    return topics
+
+
+class TestSkillDecay:
+    def test_bulk_decay_results(self, storage, skill_tracking, topics):
+        results = {r["topic_id"]: r for r in skill_tracking.apply_decay_to_all()}
+        
+        # 20 days inactive -> 13 decay days; never studied -> no decay
+        assert set(results) == {topics[1].id}
+        assert results[topics[1].id]["decay_amount"] == pytest.approx(6.5)
+        assert results[topics[1].id]["new_skill"] == pytest.approx(53.5)
+        
+        assert storage.get_topic(topics[1].id).skill_level == pytest.approx(53.5)
+        assert storage.get_topic(topics[0].id).skill_level == 60.0
+        assert storage.get_topic(topics[2].id).skill_level == 50.0
+        assert skill_tracking.get_skill_history(topics[2].id) == []
+    
+    def test_decay_runs_in_one_transaction(self, storage, skill_tracking, topics):
+        statements = []
+        
+        def before_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        
+        event.listen(storage.db.engine, "before_cursor_execute", before_execute)
+        try:
+            skill_tracking.apply_decay_to_all()
+        finally:
+            event.remove(storage.db.engine, "before_cursor_execute", before_execute)
+        
+        # select states, insert history, update topics, upsert daily rollups, select names
+        assert len(statements) == 5
+    
+    def test_decay_keeps_dependency_graph_current(self, storage, skill_tracking, topics):
+        dependency_service = DependencyService(storage.db)
+        dependency_service.add_dependency(topics[1].id, topics[0].id, min_skill_threshold=55.0)
+        assert dependency_service.get_prerequisites(topics[0].id)[0]["is_satisfied"]
+        
+        skill_tracking.apply_decay_to_all()
+        
+        prerequisite = dependency_service.get_prerequisites(topics[0].id)[0]
+        assert prerequisite["current_skill"] == pytest.approx(53.5)
+        assert not prerequisite["is_satisfied"]
+    
+    def test_eligible_topics(self, skill_tracking, topics):
+        eligible = {e["topic_id"]: e for e in skill_tracking.get_decay_eligible_topics()}
+        
+        assert set(eligible) == {topics[1].id, topics[3].id}
+        assert eligible[topics[1].id]["days_inactive"] == 20
+        assert not eligible[topics[3].id]["eligible_for_decay"]
+
+
+class TestEffectiveSkill:
+    def test_readers_see_decay_before_it_is_written(self, storage, skill_tracking, topics):
+        snapshot = storage.get_planning_snapshot()
+        skills = {t.id: t.skill_level for t in snapshot.topics}
+        
+        assert skills[topics[1].id] == pytest.approx(53.5)
+        assert skills[topics[0].id] == 60.0
+        assert storage.get_topic(topics[1].id).skill_level == 60.0
+        assert skill_tracking.get_skill_history(topics[1].id) == []
+    
+    def test_compaction_is_idempotent(self, storage, skill_tracking, topics):
+        before = skill_tracking.get_effective_skills()
+        
+        assert len(skill_tracking.apply_decay_to_all()) == 1
+        assert skill_tracking.apply_decay_to_all() == []
+        assert skill_tracking.get_effective_skills() == pytest.approx(before)
+    
+    def test_touching_a_topic_materializes_its_decay(self, storage, skill_tracking, topics):
+        skill_tracking.record_skill_change(topics[1].id, 58.5, "quiz")
+        
+        history = skill_tracking.get_skill_history(topics[1].id)
+        assert sorted((h.reason, h.previous_skill, h.new_skill) for h in history) == [
+            ("decay", 60.0, pytest.approx(53.5)), ("quiz", pytest.approx(53.5), 58.5)
+        ]
+        assert skill_tracking.get_effective_skill(topics[1].id) == 58.5
+    
+    def test_every_reader_and_writer_applies_the_configured_policy(self, storage, skill_tracking, topics):
+        from app.services.study_session_service import StudySessionService
+        
+        # 13 decay days at 1.0 per day
+        skill_tracking.decay_rate_per_day = 1.0
+        snapshot = storage.get_planning_snapshot()
+        assert {t.id: t.skill_level for t in snapshot.topics}[topics[1].id] == pytest.approx(47.0)
+        
+        sessions = StudySessionService(storage.db)
+        sessions.end_session(sessions.start_session(topics[1].id).id)
+        assert storage.get_topic(topics[1].id).skill_level == pytest.approx(47.0)
+    
+    def test_first_session_of_a_new_topic_writes_no_decay(self, storage, skill_tracking, topics):
+        from app.services.study_session_service import StudySessionService
+        
+        assert skill_tracking.get_effective_skill(topics[2].id) == 50.0
+        
+        sessions = StudySessionService(storage.db)
+        sessions.end_session(sessions.start_session(topics[2].id).id)
+        
+        assert storage.get_topic(topics[2].id).skill_level == 50.0
+        assert skill_tracking.get_skill_history(topics[2].id) == []
+    
+    def test_ending_a_session_keeps_accrued_decay(self, storage, skill_tracking, topics):
+        from app.services.study_session_service import StudySessionService
+        
+        sessions = StudySessionService(storage.db)
+        sessions.end_session(sessions.start_session(topics[1].id).id)
+        
+        assert storage.get_topic(topics[1].id).skill_level == pytest.approx(53.5)
+        assert skill_tracking.get_effective_skill(topics[1].id) == pytest.approx(53.5)
+
+
+class TestManualSkillChange:
+    def test_manual_edit_is_logged_as_requested(self, storage, skill_tracking, topics):
+        topic = topics[2]
+        topic.skill_level = 90.0
+        storage.update_topic(topic)
+        skill_tracking.log_skill_change(topic.id, 50.0, 90.0, "Manual update")
+        
+        # No daily cap, no decay for a topic that was never studied
+        assert storage.get_topic(topic.id).skill_level == 90.0
+        history = skill_tracking.get_skill_history(topic.id)
+        assert [(h.previous_skill, h.new_skill, h.reason) for h in history] == [(50.0, 90.0, "Manual update")]
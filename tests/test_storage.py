@@ -0,0 +1,469 @@
+"""
+Unit tests for the storage layer: schema migrations, indexes and rollups
+"""
+
+import sqlite3
+import pytest
+from datetime import datetime, timedelta
+from app.storage.database import Database, Base, TopicDB
+from app.storage.migrations import LATEST_VERSION
+from app.storage import topic_stats
+
+
+EXPECTED_INDEXES = {
+    'ix_topics_course_id',
+    'ix_skill_history_topic_id_timestamp',
+    'ix_study_sessions_topic_id_end_time',
+    'ix_study_sessions_topic_id_start_time',
+    'ix_study_sessions_end_time',
+    'ix_quizzes_topic_id',
+    'ix_quiz_attempts_quiz_id_attempted_at',
+    'ix_topic_dependencies_prerequisite_topic_id',
+    'ix_topic_dependencies_dependent_topic_id',
+    'ix_decision_logs_decision_type_timestamp',
+    'ix_decision_logs_topic_id_timestamp',
+    'ix_decision_logs_timestamp',
+    'ix_topic_daily_stats_day',
+}
+
+
+def _index_names(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'").fetchall()
+        return {row[0] for row in rows}
+    finally:
+        conn.close()
+
+
+def _user_version(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def legacy_db_path(tmp_path):
+    """A database created before indexes were declared (tables only, version 0)"""
+    db_path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executescript("""
+            CREATE TABLE courses (id INTEGER PRIMARY KEY AUTOINCREMENT, name VARCHAR NOT NULL, exam_date DATETIME NOT NULL);
+            CREATE TABLE topics (id INTEGER PRIMARY KEY AUTOINCREMENT, course_id INTEGER NOT NULL REFERENCES courses(id),
+                name VARCHAR NOT NULL, weight FLOAT NOT NULL, skill_level FLOAT NOT NULL);
+            CREATE TABLE study_sessions (id INTEGER PRIMARY KEY AUTOINCREMENT, topic_id INTEGER NOT NULL REFERENCES topics(id),
+                start_time DATETIME NOT NULL, end_time DATETIME, duration_minutes FLOAT);
+            INSERT INTO courses (name, exam_date) VALUES ('Legacy Course', '2030-01-01 00:00:00.000000');
+        """)
+        conn.commit()
+    finally:
+        conn.close()
+    return db_path
+
+
+class TestMigrations:
+    def test_new_database_is_at_latest_version(self, tmp_path):
+        db_path = str(tmp_path / "new.db")
+        Database(db_path)
+        
+        assert _user_version(db_path) == LATEST_VERSION
+        assert EXPECTED_INDEXES <= _index_names(db_path)
+    
+    def test_legacy_database_is_upgraded_in_place(self, legacy_db_path):
+        assert not EXPECTED_INDEXES & _index_names(legacy_db_path)
+        
+        db = Database(legacy_db_path)
+        
+        assert _user_version(legacy_db_path) == LATEST_VERSION
+        assert EXPECTED_INDEXES <= _index_names(legacy_db_path)
+        
+        # Existing rows survive the upgrade
+        from app.storage.database import CourseDB
+        session = db.get_session()
+        try:
+            assert session.query(CourseDB).count() == 1
+        finally:
+            session.close()
+    
+    def test_migrations_are_idempotent(self, legacy_db_path):
+        Database(legacy_db_path)
+        Database(legacy_db_path)
+        
+        assert _user_version(legacy_db_path) == LATEST_VERSION
+    
+    def test_declared_indexes_match_expected(self):
+        declared = {index.name for table in Base.metadata.sorted_tables for index in table.indexes}
+        assert EXPECTED_INDEXES <= declared
+    
+    def test_weak_topic_lookup_uses_index(self, tmp_path):
+        db_path = str(tmp_path / "plan.db")
+        Database(db_path)
+        conn = sqlite3.connect(db_path)
+        try:
+            plan = conn.execute(
+                "EXPLAIN QUERY PLAN SELECT * FROM study_sessions "
+                "WHERE topic_id = 1 AND end_time IS NOT NULL ORDER BY end_time DESC LIMIT 1"
+            ).fetchall()
+        finally:
+            conn.close()
+        
+        assert any('ix_study_sessions_topic_id_end_time' in str(row) for row in plan)
+
+
+@pytest.fixture
+def study_db():
+    from app.storage.storage_service import StorageService
+    from app.models.models import Course, Topic
+    
+    storage = StorageService(":memory:")
+    course = storage.create_course(Course(name="Algebra", exam_date=datetime.now() + timedelta(days=20)))
+    topics = [
+        storage.create_topic(Topic(course_id=course.id, name=name, weight=0.5, skill_level=40.0))
+        for name in ("Groups", "Rings")
+    ]
+    return storage.db, topics
+
+
+class TestTopicStats:
+    def _write_activity(self, db, topics):
+        from app.services.study_session_service import StudySessionService
+        from app.services.skill_tracking_service import SkillTrackingService
+        from app.services.quiz_service import QuizService
+        from app.models.models import Quiz, QuizQuestion
+        
+        sessions = StudySessionService(db)
+        for topic in topics + topics[:1]:
+            sessions.end_session(sessions.start_session(topic.id).id)
+        
+        skills = SkillTrackingService(db)
+        skills.record_skill_change(topics[0].id, 45.0, "quiz")
+        skills.record_skill_change(topics[1].id, 38.0, "manual")
+        
+        quizzes = QuizService(db)
+        questions = [
+            QuizQuestion(question_text=f"Question {i}", option_a="1", option_b="2",
+                         option_c="3", option_d="4", correct_answer="A")
+            for i in range(2)
+        ]
+        quiz = quizzes.get_quiz(quizzes.create_quiz(Quiz(
+            topic_id=topics[0].id, title="Groups quiz", created_at=datetime.now(), questions=questions
+        )).id)
+        first, second = [q.id for q in quiz.questions]
+        quizzes.submit_quiz_attempt(quiz.id, {first: "A", second: "B"})
+        quizzes.submit_quiz_attempt(quiz.id, {first: "A", second: "A"})
+    
+    def test_writes_update_rollups_incrementally(self, study_db):
+        db, topics = study_db
+        self._write_activity(db, topics)
+        
+        session = db.get_session()
+        try:
+            stats = topic_stats.get_topic_stats(session)
+            window = topic_stats.get_window_totals(session, 7)
+        finally:
+            session.close()
+        
+        groups = stats[topics[0].id]
+        assert groups.session_count == 2
+        assert groups.skill_change_count == 1
+        assert groups.quiz_attempt_count == 2
+        assert groups.quiz_score_sum == pytest.approx(150.0)
+        assert groups.last_quiz_score == pytest.approx(100.0)
+        assert stats[topics[1].id].session_count == 1
+        assert window[topics[1].id]["skill_delta"] == pytest.approx(-2.0)
+    
+    def test_statistics_from_two_aggregate_reads(self, study_db):
+        from sqlalchemy import event
+        from app.services.study_session_service import StudySessionService
+        
+        db, topics = study_db
+        self._write_activity(db, topics)
+        sessions = StudySessionService(db)
+        sessions.start_session(topics[1].id)
+        
+        statements = []
+        
+        def before_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        
+        event.listen(db.engine, "before_cursor_execute", before_execute)
+        try:
+            statistics = sessions.get_statistics()
+        finally:
+            event.remove(db.engine, "before_cursor_execute", before_execute)
+        
+        assert len(statements) == 2
+        assert statistics["total_sessions"] == 3
+        assert set(statistics["topic_totals"]) == {topics[0].id, topics[1].id}
+        today = datetime.now().date().isoformat()
+        assert set(statistics["daily_breakdown"][today]) == {topics[0].id, topics[1].id}
+        assert statistics["daily_breakdown"] == sessions.get_daily_time_breakdown(7)
+        assert statistics["topic_totals"] == sessions.get_total_time_per_topic()
+    
+    def test_incremental_rollups_match_rebuild(self, study_db):
+        db, topics = study_db
+        self._write_activity(db, topics)
+        
+        with db.engine.begin() as conn:
+            assert topic_stats.check(conn) == []
+            conn.execute(topic_stats.TopicStatsDB.__table__.update().values(session_count=0))
+            assert {m["topic_id"] for m in topic_stats.check(conn)} == {topics[0].id, topics[1].id}
+            
+            topic_stats.rebuild(conn)
+            assert topic_stats.check(conn) == []
+    
+    def test_deleting_a_quiz_removes_its_attempts_from_the_rollups(self, study_db):
+        from app.services.quiz_service import QuizService
+        from app.models.models import Quiz, QuizQuestion
+        
+        db, topics = study_db
+        self._write_activity(db, topics)
+        quizzes = QuizService(db)
+        question = QuizQuestion(question_text="Q", option_a="1", option_b="2",
+                                option_c="3", option_d="4", correct_answer="A")
+        quiz = quizzes.get_quiz(quizzes.create_quiz(Quiz(
+            topic_id=topics[0].id, title="Retake", created_at=datetime.now(), questions=[question]
+        )).id)
+        quizzes.submit_quiz_attempt(quiz.id, {quiz.questions[0].id: "B"})
+        published = []
+        db.add_change_listener(published.append)
+        
+        quizzes.delete_quiz(quiz.id)
+        
+        deleted = {c.table for changes in published for c in changes if c.op == 'delete'}
+        assert deleted == {'quizzes', 'quiz_questions', 'quiz_attempts'}
+        with db.engine.begin() as conn:
+            assert topic_stats.check(conn) == []
+        session = db.get_session()
+        try:
+            groups = topic_stats.get_topic_stats(session)[topics[0].id]
+        finally:
+            session.close()
+        assert groups.quiz_attempt_count == 2
+        assert groups.last_quiz_score == pytest.approx(100.0)
+    
+    def test_sessions_split_at_midnight_and_bucket_by_granularity(self, study_db):
+        from datetime import date
+        from app.storage.database import StudySessionDB
+        
+        db, topics = study_db
+        session = db.get_session()
+        try:
+            for start, end in [(datetime(2024, 3, 31, 23, 0), datetime(2024, 4, 1, 1, 0)),
+                               (datetime(2024, 4, 3, 10, 0), datetime(2024, 4, 3, 10, 30))]:
+                minutes = (end - start).total_seconds() / 60
+                session.add(StudySessionDB(topic_id=topics[0].id, start_time=start, end_time=end,
+                                           duration_minutes=minutes))
+                topic_stats.record_session(session, topics[0].id, start, end, minutes)
+            session.commit()
+            
+            first, last = date(2024, 3, 31), date(2024, 4, 3)
+            assert topic_stats.get_study_minutes(session, first, last) == {
+                '2024-03-31': 60.0, '2024-04-01': 60.0, '2024-04-02': 0.0, '2024-04-03': 30.0
+            }
+            assert topic_stats.get_study_minutes(session, first, last, 'week') == {
+                '2024-03-25': 60.0, '2024-04-01': 90.0
+            }
+            assert topic_stats.get_study_minutes(session, first, last, 'month') == {'2024-03': 60.0, '2024-04': 90.0}
+            assert topic_stats.get_study_minutes(session, first, last, 'day', [topics[1].id])['2024-04-01'] == 0.0
+            with pytest.raises(ValueError):
+                topic_stats.get_study_minutes(session, first, last, 'year')
+        finally:
+            session.close()
+        
+        with db.engine.begin() as conn:
+            assert topic_stats.check(conn) == []
+    
+    def test_migration_backfills_existing_rows(self, legacy_db_path):
+        conn = sqlite3.connect(legacy_db_path)
+        try:
+            conn.executescript("""
+                INSERT INTO topics (course_id, name, weight, skill_level) VALUES (1, 'Legacy Topic', 0.5, 50.0);
+                INSERT INTO study_sessions (topic_id, start_time, end_time, duration_minutes)
+                    VALUES (1, '2024-03-01 10:00:00.000000', '2024-03-01 10:45:00.000000', 45.0);
+            """)
+            conn.commit()
+        finally:
+            conn.close()
+        
+        db = Database(legacy_db_path)
+        
+        session = db.get_session()
+        try:
+            stats = topic_stats.get_topic_stats(session)[1]
+            assert stats.total_minutes == 45.0
+            assert stats.last_session_end == datetime(2024, 3, 1, 10, 45)
+        finally:
+            session.close()
+
+
+class TestAsyncStorage:
+    def test_async_writes_are_visible_and_published(self, tmp_path):
+        import asyncio
+        from app.storage.storage_service import StorageService
+        from app.storage.async_database import AsyncDatabase
+        from app.storage.async_storage_service import AsyncStorageService
+        from app.models.models import Course, Topic
+        
+        storage = StorageService(str(tmp_path / "planner.db"))
+        async_storage = AsyncStorageService(AsyncDatabase(storage.db))
+        published = []
+        storage.db.add_change_listener(published.extend)
+        
+        async def scenario():
+            course = await async_storage.create_course(Course(name="Logic", exam_date=datetime(2030, 1, 1)))
+            topic = await async_storage.create_topic(Topic(course_id=course.id, name="Proofs", weight=1.0, skill_level=20.0))
+            topic.skill_level = 35.0
+            await async_storage.update_topic(topic)
+            listed = await async_storage.get_topics_by_course(course.id)
+            missing = await async_storage.get_topic(topic.id + 1)
+            await async_storage.db.dispose()
+            return course, listed, missing
+        
+        course, listed, missing = asyncio.run(scenario())
+        
+        assert [t.skill_level for t in listed] == [35.0]
+        assert missing is None
+        assert storage.get_topic(listed[0].id).skill_level == 35.0
+        assert [(c.op, c.table) for c in published] == [
+            ('insert', 'courses'), ('insert', 'topics'), ('update', 'topics')
+        ]
+    
+    def test_in_memory_database_is_rejected(self):
+        from app.storage.async_database import AsyncDatabase
+        
+        with pytest.raises(ValueError):
+            AsyncDatabase(Database(":memory:"))
+
+
+class TestSQLiteProfiles:
+    def test_profile_pragmas_applied_to_every_connection(self, tmp_path, monkeypatch):
+        from sqlalchemy import text
+        from app.storage.sqlite_profiles import PROFILE_ENV_VAR
+        
+        def pragmas(db):
+            with db.engine.connect() as conn:
+                return [conn.execute(text(f"PRAGMA {name}")).scalar()
+                        for name in ('journal_mode', 'synchronous', 'busy_timeout', 'temp_store')]
+        
+        assert pragmas(Database(str(tmp_path / "tuned.db"))) == ['wal', 1, 5000, 2]
+        
+        monkeypatch.setenv(PROFILE_ENV_VAR, "legacy")
+        legacy = Database(str(tmp_path / "legacy.db"))
+        assert legacy.profile.journal_mode is None
+        assert pragmas(legacy) == ['delete', 2, 5000, 0]
+    
+    def test_unknown_profile_is_rejected(self, monkeypatch):
+        from app.storage.sqlite_profiles import PROFILE_ENV_VAR
+        
+        monkeypatch.setenv(PROFILE_ENV_VAR, "fastest")
+        with pytest.raises(ValueError):
+            Database(":memory:")
+
+
+class TestUnitOfWork:
+    def test_services_share_one_checkout_and_commit(self, tmp_path):
+        from sqlalchemy import event
+        from app.storage.storage_service import StorageService
+        from app.storage.unit_of_work import unit_of_work
+        from app.services.skill_tracking_service import SkillTrackingService
+        from app.models.models import Course, Topic
+        
+        storage = StorageService(str(tmp_path / "planner.db"))
+        course = storage.create_course(Course(name="Algebra", exam_date=datetime.now() + timedelta(days=20)))
+        topic = storage.create_topic(Topic(course_id=course.id, name="Groups", weight=1.0, skill_level=40.0))
+        skills = SkillTrackingService(storage.db)
+        published = []
+        storage.db.add_change_listener(published.append)
+        
+        checkouts = []
+        commits = []
+        event.listen(storage.db.engine, "checkout", lambda *args: checkouts.append(1))
+        event.listen(storage.db.engine, "commit", lambda conn: commits.append(1))
+        
+        with unit_of_work(storage.db):
+            assert storage.get_topic(topic.id).skill_level == 40.0
+            skills.record_skill_change(topic.id, 25.0, "manual")
+            # Listeners hear about the write before the transaction commits
+            assert {c.table for c in published[0]} == {'skill_history', 'topics'}
+            assert storage.get_topic(topic.id).skill_level == 25.0
+            
+            first, second = storage.db.get_session(), storage.db.get_session()
+            assert first.get(TopicDB, topic.id) is second.get(TopicDB, topic.id)
+        
+        assert len(checkouts) == 1
+        assert len(commits) == 1
+        assert storage.get_topic(topic.id).skill_level == 25.0
+    
+    def test_rollback_discards_writes_and_invalidates(self, study_db):
+        from app.storage.unit_of_work import unit_of_work
+        from app.services.skill_tracking_service import SkillTrackingService
+        
+        db, topics = study_db
+        published = []
+        db.add_change_listener(published.append)
+        
+        with pytest.raises(RuntimeError):
+            with unit_of_work(db):
+                SkillTrackingService(db).record_skill_change(topics[0].id, 25.0, "manual")
+                raise RuntimeError("request failed")
+        
+        session = db.get_session()
+        try:
+            assert session.get(TopicDB, topics[0].id).skill_level == 40.0
+        finally:
+            session.close()
+        # Published once at the flush point and again on rollback
+        assert len(published) == 2 and published[0] == published[1]
+
+
+
+class TestHydration:
+    def test_reads_load_rows_that_input_validation_would_reject(self):
+        from app.storage.storage_service import StorageService
+        from app.storage.database import CourseDB
+        from app.models.models import Course, Topic
+        
+        storage = StorageService(":memory:")
+        course = storage.create_course(Course(name="Algebra", exam_date=datetime.now() + timedelta(days=20)))
+        topic = storage.create_topic(Topic(course_id=course.id, name="Groups", weight=0.5, skill_level=40.0))
+        assert storage.get_topic(topic.id) == topic
+        assert storage.get_topic(topic.id).model_dump_json() == topic.model_dump_json()
+        
+        session = storage.db.get_session()
+        try:
+            session.get(CourseDB, course.id).exam_date = datetime.now() - timedelta(days=3)
+            session.commit()
+        finally:
+            session.close()
+        
+        # An exam that has already happened is stored data, not invalid input
+        loaded = storage.get_course(course.id)
+        assert loaded.exam_date < datetime.now()
+        assert [c.id for c in storage.get_all_courses()] == [course.id]
+        assert [t.name for t in storage.get_topics_by_course(course.id)] == ["Groups"]
+        assert storage.get_planning_snapshot(include_activity=False).courses[0].exam_date == loaded.exam_date
+        with pytest.raises(ValueError):
+            Course(name="Algebra", exam_date=loaded.exam_date)
+
+
+class TestSharedInstances:
+    def test_per_database_caches_do_not_keep_it_alive(self):
+        import gc
+        import weakref
+        from app.services.course_versions import CourseVersions
+        from app.services.dependency_graph import DependencyGraph
+        from app.services.feature_store import TopicFeatureStore
+        
+        db = Database(":memory:")
+        store = TopicFeatureStore.for_database(db)
+        assert store.course_versions is CourseVersions.for_database(db)
+        assert DependencyGraph.for_database(db) is DependencyGraph.for_database(db)
+        
+        collected = weakref.ref(db)
+        del db, store
+        gc.collect()
+        assert collected() is None